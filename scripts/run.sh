@@ -44,6 +44,11 @@ while [[ $# -gt 0 ]]; do
             shift
             shift
             ;;
+        --bench_server)
+            bench_server="$2"
+            shift
+            shift
+            ;;
         *)
             shift
             ;;
@@ -75,14 +80,16 @@ exec_cmds["smac"]="python -m src.smac"
 exec_cmds["random"]="python -m src.random"
 exec_cmds["tpe"]="python -m src.tpe"
 exec_cmds["hyperband"]="python -m src.hyperband"
-exec_cmds["neps"]="./src/neps.sh"
+exec_cmds["neps"]="python -m src.neps"
 
 exec_cmd=${exec_cmds[$opt_name]}
 fixed_cmd="${exec_cmd} --n_workers ${n_workers} --tmp_dir ${tmp_dir} --bench_name ${bench_name}"
-for seed in `seq ${seed_start} ${seed_end}`
-do
-    subcmd="${fixed_cmd} --seed ${seed}"
-    run_bench "$subcmd"
-done
+if [[ -n "$bench_server" ]]
+then
+    fixed_cmd="${fixed_cmd} --bench_server ${bench_server}"
+fi
+# The driver loads the benchmark once and runs every seed in the same process.
+fixed_cmd="python -m src.driver --opt_names ${opt_name} ${fixed_cmd#${exec_cmd} }"
+run_bench "${fixed_cmd} --seed ${seed_start} --seed_end ${seed_end}"
 
 echo "Finished run.sh with opt_name=${opt_name}!!"
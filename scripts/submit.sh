@@ -6,27 +6,19 @@ echo "Remove failed files"
 echo $cmd
 $cmd
 
-declare -A rsrc
-rsrc["bohb"]="walltime=4:00:00"
-rsrc["dehb"]="walltime=4:00:00"
-rsrc["smac"]="walltime=4:00:00"
-rsrc["random"]="walltime=4:00:00"
-rsrc["tpe"]="walltime=4:00:00"
-rsrc["hyperband"]="walltime=12:00:00"
-rsrc["neps"]="walltime=20:00:00"
+# One line of "<opt_name> <n_workers> walltime=...,mem=..." per job, the longest first.
+# The requests are predicted from the finished runs by `python -m src.cost_model fit`.
+# Without the measurements, they fall back to the fixed walltimes and memory limits used so far.
+requests=$(singularity exec mfhpo-simulator.sif python -m src.cost_model requests)
 
 for seed in `seq 0 29`
 do
-    for n_workers in 1 2 4 8
+    while read opt_name n_workers rsrc
     do
-        vars_to_use="-v SEED_START=${seed},SEED_END=${seed},N_WORKERS=${n_workers}"
-        for opt_name in random tpe hyperband bohb dehb neps smac
-        do
-            memlimit=$(($n_workers * 15))
-            resource="-l nodes=1:ppn=${n_workers},${rsrc[$opt_name]},mem=${memlimit}gb"
-            cmd="msub ${vars_to_use},OPT_NAME=${opt_name} ${resource} scripts/run.moab"
-            echo $cmd
-            $cmd
-        done
-    done
+        vars_to_use="-v SEED_START=${seed},SEED_END=${seed},N_WORKERS=${n_workers},OPT_NAME=${opt_name}"
+        resource="-l nodes=1:ppn=${n_workers},${rsrc}"
+        cmd="msub ${vars_to_use} ${resource} scripts/run.moab"
+        echo $cmd
+        $cmd
+    done <<< "$requests"
 done
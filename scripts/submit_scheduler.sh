@@ -0,0 +1,22 @@
+#!/bin/bash -l
+
+n_nodes=${1:-10}
+
+module load tools/singularity/3.11
+cmd="singularity exec mfhpo-simulator.sif python -m src.remove_files"
+echo "Remove failed files"
+echo $cmd
+$cmd
+
+resource="-l nodes=1:ppn=20,walltime=96:00:00,mem=120gb"
+for num in `seq 1 ${n_nodes}`
+do
+    cmd="msub -v OPT_NAMES=random:tpe:hyperband:bohb:dehb:neps ${resource} scripts/schedule.moab"
+    echo $cmd
+    $cmd
+done
+
+# SMAC needs its own image.
+cmd="msub -v IMAGE=mfhpo-simulator-for-smac.sif,OPT_NAMES=smac ${resource} scripts/schedule.moab"
+echo $cmd
+$cmd
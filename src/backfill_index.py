@@ -0,0 +1,11 @@
+from argparse import ArgumentParser
+
+from src.info_tree import INFO_DIR
+from src.utils import backfill_index
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--prefix", type=str, default=INFO_DIR, help="INFO_DIR or the tmp_dir copied to INFO_DIR")
+    args = parser.parse_args()
+    print(f"Recorded {backfill_index(prefix=args.prefix)} completed runs in the index")
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+from typing import Any
+
+from benchmark_apis import HPOBench, HPOLib, LCBench, MFBranin, MFHartmann
+from benchmark_apis.hpo.hpobench import _KEY_ORDER as HPOBENCH_KEY_ORDER
+from benchmark_apis.hpo.hpolib import _KEY_ORDER as HPOLIB_KEY_ORDER
+
+import numpy as np
+
+from src.shared_bench import _LazySurrogate, _MemmapTabular, get_shared_benchdata
+
+
+# Each function below reproduces __call__ of the corresponding benchmark in benchmark_apis for N queries at once.
+# The benchmarks without a vectorized counterpart, e.g. JAHSBench201, are evaluated one by one.
+def _tabular(bench: HPOBench | HPOLib) -> _MemmapTabular:
+    if isinstance(bench._benchdata, _MemmapTabular):
+        return bench._benchdata
+    if not hasattr(bench, "_batch_benchdata"):
+        # The pickled table is converted into memmaps once and kept for the subsequent batches.
+        bench._batch_benchdata = get_shared_benchdata(bench)
+
+    return bench._batch_benchdata
+
+
+def _epoch_indices(bench: HPOBench | HPOLib, epochs: np.ndarray, fidels: list[dict[str, Any] | None]) -> np.ndarray:
+    epoch_key = bench._CONSTS.fidel_keys.epoch
+    targets = np.asarray([int(bench._validate_fidels(f)[epoch_key]) for f in fidels])
+    indices = np.minimum(np.searchsorted(epochs, targets), epochs.size - 1)
+    if np.any(epochs[indices] != targets):
+        raise ValueError(f"fidel for {bench.__class__.__name__} must be in {epochs.tolist()}, but got {targets}")
+
+    return indices
+
+
+def _evaluate_hpobench(
+    bench: HPOBench, eval_configs: list[dict[str, Any]], fidels: list[dict[str, Any] | None], seeds: np.ndarray
+) -> dict[str, np.ndarray]:
+    data = _tabular(bench)
+    config_ids = ["".join([str(eval_config[k]) for k in HPOBENCH_KEY_ORDER]) for eval_config in eval_configs]
+    ci, si = data.config_indices(config_ids), seeds % bench._N_SEEDS
+    ei = _epoch_indices(bench, data.epochs("bal_acc"), fidels)
+    return dict(loss=1.0 - data.table("bal_acc")[ci, si, ei], runtime=data.table("runtime")[ci, si, ei])
+
+
+def _evaluate_hpolib(
+    bench: HPOLib, eval_configs: list[dict[str, Any]], fidels: list[dict[str, Any] | None], seeds: np.ndarray
+) -> dict[str, np.ndarray]:
+    data = _tabular(bench)
+    config_ids = ["".join([str(eval_config[k]) for k in HPOLIB_KEY_ORDER]) for eval_config in eval_configs]
+    ci, si = data.config_indices(config_ids), seeds % bench._N_SEEDS
+    epochs = data.epochs("valid_mse")
+    ei = _epoch_indices(bench, epochs, fidels)
+    epoch_key = bench._CONSTS.fidel_keys.epoch
+    runtime = data.table("runtime")[ci, si] * epochs[ei] / bench._max_fidels[epoch_key]
+    return dict(loss=np.log(data.table("valid_mse")[ci, si, ei]), runtime=runtime)
+
+
+def _evaluate_lcbench(
+    bench: LCBench, eval_configs: list[dict[str, Any]], fidels: list[dict[str, Any] | None]
+) -> dict[str, np.ndarray]:
+    surrogate = bench.get_benchdata() if bench._load_every_call else bench._validate_benchdata(None)
+    surrogate = surrogate.get() if isinstance(surrogate, _LazySurrogate) else surrogate
+    configs = []
+    for eval_config, _fidels in zip(eval_configs, fidels):
+        _eval_config, _fidels = bench._validate_inputs(eval_config=eval_config, fidels=_fidels)
+        epoch = int(min(bench._TRUE_MAX_EPOCH, _fidels["epoch"]))
+        configs.append({**_eval_config, "OpenML_task_id": surrogate._dataset_id, "epoch": epoch})
+
+    # yahpo evaluates all the configs in one forward pass.
+    outputs = surrogate._surrogate.objective_function(configs)
+    return dict(
+        loss=1.0 - np.asarray([out["val_balanced_accuracy"] for out in outputs], dtype=np.float64),
+        runtime=np.asarray([out["time"] for out in outputs], dtype=np.float64),
+    )
+
+
+def _synthetic_inputs(
+    bench: MFBranin | MFHartmann, eval_configs: list[dict[str, Any]], fidels: list[dict[str, Any] | None]
+) -> tuple[np.ndarray, np.ndarray]:
+    x = np.asarray([[eval_config[f"x{d}"] for d in range(bench.dim)] for eval_config in eval_configs], dtype=float)
+    if not bench._use_fidel:
+        if any(f is not None and len(f) > 0 for f in fidels):
+            raise ValueError("Fidelity must not be provided for use_fidel=False.")
+        fidels = [{k: bench._max_fidel for k in bench.fidel_keys}] * len(eval_configs)
+
+    z = np.asarray([[f[k] / max_fidel for k, max_fidel in bench.max_fidels.items()] for f in fidels], dtype=float)
+    if np.any((x < 0.0) | (x > 1.0)):
+        raise ValueError("All elements in x must be in [0.0, 1.0]")
+    if np.any((z < bench._min_fidel / bench._max_fidel) | (z > 1.0)):
+        raise ValueError(f"All elements in fidels must be in [{bench._min_fidel}, {bench._max_fidel}]")
+
+    return x, z
+
+
+def _noise(bench: MFBranin | MFHartmann, size: int) -> np.ndarray:
+    # RandomState.normal(size=N) yields the same sequence as N calls of RandomState.normal().
+    return np.zeros(size) if bench._deterministic else bench._noise_std * bench._rng.normal(size=size)
+
+
+def _evaluate_branin(
+    bench: MFBranin, eval_configs: list[dict[str, Any]], fidels: list[dict[str, Any] | None]
+) -> dict[str, np.ndarray]:
+    x, z = _synthetic_inputs(bench, eval_configs, fidels)
+    z1, z2, z3 = z.T if bench.fidel_dim == bench._DEFAULT_FIDEL_DIM else (z[:, 0], z[:, 0], z[:, 0])
+    b = 5.1 / (4 * np.pi**2) - bench._delta_b * (1 - z1)
+    c = 5 / np.pi - bench._delta_c * (1 - z2)
+    t = 1 / (8 * np.pi) + bench._delta_t * (1 - z3)
+    x1, x2 = 15.0 * x[:, 0] - 5, 15.0 * x[:, 1]
+    noise = _noise(bench, size=x.shape[0])
+    loss = (x2 - b * x1**2 + c * x1 - 6) ** 2 + 10 * (1 - t) * np.cos(x1) + 10 + noise
+    runtime = (0.05 + 0.95 * z[:, 0] ** 1.5) * bench._runtime_factor
+    return dict(loss=loss, runtime=runtime)
+
+
+def _evaluate_hartmann(
+    bench: MFHartmann, eval_configs: list[dict[str, Any]], fidels: list[dict[str, Any] | None]
+) -> dict[str, np.ndarray]:
+    x, z = _synthetic_inputs(bench, eval_configs, fidels)
+    noise = _noise(bench, size=x.shape[0])
+    alphas = bench.alphas - bench.bias * (1 - z)
+    loss = -np.sum(alphas * np.exp(np.sum(-bench.A * (x[:, None, :] - bench.P) ** 2, axis=-1)), axis=-1) + noise
+    z1, z2, z3, z4 = z.T if bench.fidel_dim == bench._DEFAULT_FIDEL_DIM else (z[:, 0], z[:, 0], z[:, 0], z[:, 0])
+    if bench.dim == 3:
+        factor = (z1 + z3 * z4 + z2**3) / 3
+    else:
+        factor = (z1 + z3 + z2**2 + z4**3) / 4
+    return dict(loss=loss, runtime=(0.1 + 0.9 * factor) * bench._runtime_factor)
+
+
+def evaluate_batch(
+    bench: Any,
+    eval_configs: list[dict[str, Any]],
+    fidels: list[dict[str, Any] | None] | None = None,
+    seeds: list[int] | np.ndarray | None = None,
+) -> dict[str, np.ndarray]:
+    n_configs = len(eval_configs)
+    fidels = [None] * n_configs if fidels is None else fidels
+    if isinstance(bench, (HPOBench, HPOLib)) and seeds is not None and not bench._load_every_call:
+        evaluate = _evaluate_hpobench if isinstance(bench, HPOBench) else _evaluate_hpolib
+        return evaluate(bench, eval_configs, fidels, np.asarray(seeds, dtype=np.int64))
+    if isinstance(bench, LCBench):
+        return _evaluate_lcbench(bench, eval_configs, fidels)
+    if isinstance(bench, MFBranin):
+        return _evaluate_branin(bench, eval_configs, fidels)
+    if isinstance(bench, MFHartmann):
+        return _evaluate_hartmann(bench, eval_configs, fidels)
+
+    seeds = [None] * n_configs if seeds is None else seeds
+    outputs = [bench(c, fidels=f, seed=None if s is None else int(s)) for c, f, s in zip(eval_configs, fidels, seeds)]
+    return {k: np.asarray([out[k] for out in outputs], dtype=np.float64) for k in ["loss", "runtime"]}
+
+
+class PrefetchedObjectiveFunc:
+    # Replay the results of the queries evaluated by evaluate_batch before the simulation.
+    # If the simulator queries something else, e.g. a different seed, we fall back to the benchmark itself.
+    def __init__(
+        self,
+        bench: Any,
+        eval_configs: list[dict[str, Any]],
+        fidels: list[dict[str, Any] | None] | None,
+        seeds: list[int],
+        start: int = 0,
+    ):
+        self._bench = bench
+        self._eval_configs = eval_configs
+        self._fidels = [None] * len(eval_configs) if fidels is None else fidels
+        self._seeds = seeds
+        self._results = evaluate_batch(bench, eval_configs, fidels=self._fidels, seeds=seeds)
+        # A resumed run starts from the query after its checkpoint.
+        self._count = start
+        self._n_fallbacks = 0
+
+    @property
+    def n_fallbacks(self) -> int:
+        return self._n_fallbacks
+
+    def __call__(
+        self,
+        eval_config: dict[str, Any],
+        *,
+        fidels: dict[str, int | float] | None = None,
+        seed: int | None = None,
+        **data_to_scatter: Any,
+    ) -> dict[str, float]:
+        i = self._count
+        self._count += 1
+        if (
+            i < len(self._seeds)
+            and seed == self._seeds[i]
+            and fidels == self._fidels[i]
+            and eval_config == self._eval_configs[i]
+        ):
+            return {k: float(v[i]) for k, v in self._results.items()}
+
+        self._n_fallbacks += 1
+        return self._bench(eval_config, fidels=fidels, seed=seed, **data_to_scatter)
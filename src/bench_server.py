@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from argparse import ArgumentParser
+from collections import defaultdict
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any
+
+from src import batch_eval
+
+
+# (bench_cls, dataset_id), eval_config, fidels, seed
+Request = tuple[tuple[type, int], dict[str, Any], Any, Any]
+
+
+def evaluate_batch(bench: Any, requests: list[Request]) -> list[tuple[bool, Any]]:
+    if len(requests) > 1:
+        try:
+            eval_configs = [eval_config for _, eval_config, _, _ in requests]
+            fidels = [fidels for _, _, fidels, _ in requests]
+            seeds = None if any(seed is None for *_, seed in requests) else [seed for *_, seed in requests]
+            results = batch_eval.evaluate_batch(bench, eval_configs, fidels=fidels, seeds=seeds)
+            return [(True, {k: float(v[i]) for k, v in results.items()}) for i in range(len(requests))]
+        except Exception:
+            pass  # Evaluate one by one so that only the invalid request gets the error.
+
+    outputs: list[tuple[bool, Any]] = []
+    for _, eval_config, fidels, seed in requests:
+        try:
+            outputs.append((True, bench(eval_config, fidels=fidels, seed=seed)))
+        except Exception as e:
+            outputs.append((False, e))
+
+    return outputs
+
+
+class BenchServer:
+    def __init__(self, address: str, root_dir: str | None, batch_window: float = 1e-3, max_batch_size: int = 256):
+        self._address = address
+        self._root_dir = root_dir
+        self._batch_window = batch_window
+        self._max_batch_size = max_batch_size
+        self._queue: queue.Queue[tuple[Connection, Request]] = queue.Queue()
+        self._benches: dict[tuple[type, int], Any] = {}
+        self._n_requests = 0
+        self._n_batches = 0
+
+    def _get_bench(self, spec: tuple[type, int]) -> Any:
+        if spec not in self._benches:
+            bench_cls, dataset_id = spec
+            print(f"Load {bench_cls.__name__} with dataset_id={dataset_id}")
+            self._benches[spec] = bench_cls(dataset_id=dataset_id, root_dir=self._root_dir)
+
+        return self._benches[spec]
+
+    def _receive(self, conn: Connection) -> None:
+        while True:
+            try:
+                request = conn.recv()
+            except (EOFError, OSError):
+                conn.close()
+                return
+
+            self._queue.put((conn, request))
+
+    def _next_batch(self) -> list[tuple[Connection, Request]]:
+        # Requests arriving within batch_window after the first one are coalesced into one batch.
+        batch = [self._queue.get()]
+        deadline = time.time() + self._batch_window
+        while len(batch) < self._max_batch_size:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _process(self) -> None:
+        while True:
+            groups: dict[tuple[type, int], list[tuple[Connection, Request]]] = defaultdict(list)
+            for conn, request in self._next_batch():
+                groups[request[0]].append((conn, request))
+
+            for spec, items in groups.items():
+                try:
+                    outputs = evaluate_batch(self._get_bench(spec), [request for _, request in items])
+                except Exception as e:  # e.g. the benchmark data is not available
+                    outputs = [(False, e)] * len(items)
+
+                for (conn, _), output in zip(items, outputs):
+                    try:
+                        conn.send(output)
+                    except OSError:  # The client has already gone.
+                        pass
+
+                self._n_requests += len(items)
+                self._n_batches += 1
+                if self._n_batches % 10000 == 0:
+                    print(f"Served {self._n_requests} requests with {self._n_requests / self._n_batches:.2f} per batch")
+
+    def serve_forever(self) -> None:
+        if os.path.exists(self._address):
+            os.remove(self._address)
+
+        threading.Thread(target=self._process, daemon=True).start()
+        with Listener(self._address, family="AF_UNIX") as listener:
+            print(f"Serve the benchmarks at {self._address}")
+            while True:
+                conn = listener.accept()
+                threading.Thread(target=self._receive, args=(conn,), daemon=True).start()
+
+
+class RemoteBench:
+    # A drop-in replacement of the HPO benchmark instances that forwards every query to BenchServer.
+    # The local instance does not load any benchmark data and provides only the metadata, e.g. config_space.
+    def __init__(self, address: str, dataset_id: int, local_bench: Any):
+        self._address = address
+        self._spec = (type(local_bench), dataset_id)
+        self._local_bench = local_bench
+        self._local = threading.local()
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = self.__dict__.copy()
+        state.pop("_local")
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("__") or name in ["_local_bench", "_local"]:
+            raise AttributeError(name)
+
+        return getattr(self._local_bench, name)
+
+    def _connection(self) -> Connection:
+        # Each thread and each (forked) process needs its own connection.
+        if getattr(self._local, "pid", None) != os.getpid():
+            self._local.conn = Client(self._address, family="AF_UNIX")
+            self._local.pid = os.getpid()
+
+        return self._local.conn
+
+    def __call__(
+        self,
+        eval_config: dict[str, Any],
+        *,
+        fidels: dict[str, int | float] | None = None,
+        seed: int | None = None,
+        **data_to_scatter: Any,
+    ) -> dict[str, float]:
+        conn = self._connection()
+        conn.send((self._spec, eval_config, fidels, seed))
+        ok, output = conn.recv()
+        if not ok:
+            raise output
+
+        return output
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--address", type=str, required=True, help="The path to the Unix socket")
+    parser.add_argument("--tmp_dir", type=str, default=None)
+    parser.add_argument("--batch_window", type=float, default=1e-3)
+    args = parser.parse_args()
+    BenchServer(address=args.address, root_dir=args.tmp_dir, batch_window=args.batch_window).serve_forever()
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import os
+import pickle
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from benchmark_simulator import AbstractAskTellOptimizer, ObjectiveFuncWrapper
+
+import numpy as np
+
+from src.info_tree import INFO_DIR
+
+
+CHECKPOINT_FN = "checkpoint.pkl"
+# The simulator state is restored from its private attributes, which are stable within mfhpo-simulator 1.4.x.
+SIMULATOR_ATTRS = [
+    "_timenow",
+    "_cumtimes",
+    "_pending_results",
+    "_seen_config_keys",
+    "_sampled_time",
+    "_results",
+    "_config_tracker",
+    "_state_tracker",
+]
+
+
+@dataclass(frozen=True)
+class Checkpoint:
+    n_asks: int
+    worker_id: int
+    elapsed: float
+    rng_state: tuple
+    simulator_state: dict[str, Any]
+    observations: list[dict[str, Any]]
+
+    @property
+    def n_evals(self) -> int:
+        return len(self.simulator_state["_results"]["cumtime"])
+
+
+class ReplayableOptimizer(AbstractAskTellOptimizer):
+    # The state of the optimizer must be recoverable from the number of asks and the observations told so far.
+    def replay(self, n_asks: int, observations: list[dict[str, Any]]) -> None:
+        for observation in observations:
+            self.tell(**observation)
+
+
+class _RecordingOptimizer(AbstractAskTellOptimizer):
+    def __init__(self, opt: ReplayableOptimizer, observations: list[dict[str, Any]]):
+        self._opt = opt
+        self._observations = observations
+
+    def ask(self) -> tuple[dict[str, Any], dict[str, int | float] | None, int | None]:
+        return self._opt.ask()
+
+    def tell(
+        self,
+        eval_config: dict[str, Any],
+        results: dict[str, float],
+        fidels: dict[str, int | float] | None = None,
+        config_id: int | None = None,
+    ) -> None:
+        observation = dict(eval_config=eval_config, results=results, fidels=fidels, config_id=config_id)
+        self._observations.append(observation)
+        self._opt.tell(**observation)
+
+
+def checkpoint_path(save_dir_name: str) -> str:
+    # The checkpoint always stays in the cwd because tmp_dir is usually lost together with the job.
+    return os.path.join(INFO_DIR, save_dir_name, CHECKPOINT_FN)
+
+
+def load_checkpoint(save_dir_name: str) -> Checkpoint | None:
+    path = checkpoint_path(save_dir_name)
+    if not os.path.exists(path):
+        return None
+
+    with open(path, mode="rb") as f:
+        return pickle.load(f)
+
+
+def _save_checkpoint(save_dir_name: str, checkpoint: Checkpoint) -> None:
+    path = checkpoint_path(save_dir_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Replace the file atomically so that a kill during the dump never leaves a truncated checkpoint behind.
+    with open(f"{path}.tmp", mode="wb") as f:
+        pickle.dump(checkpoint, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def simulate(
+    wrapper: ObjectiveFuncWrapper,
+    opt: ReplayableOptimizer,
+    save_dir_name: str,
+    checkpoint_interval: float = 300.0,
+) -> None:
+    # The same loop as ObjectiveFuncWrapper.simulate, but the state is dumped every checkpoint_interval seconds
+    # and a restarted job replays the last checkpoint instead of starting from scratch.
+    manager = wrapper._main_wrapper
+    n_workers = manager._wrapper_vars.n_workers
+    n_asks, worker_id, observations = 0, 0, []
+    checkpoint = load_checkpoint(save_dir_name)
+    if checkpoint is not None:
+        print(f"Resume {save_dir_name} from {checkpoint.n_evals} evaluations")
+        for attr in SIMULATOR_ATTRS:
+            setattr(manager, attr, checkpoint.simulator_state[attr])
+        manager._worker_vars.rng.set_state(checkpoint.rng_state)
+        # actual_cumtime continues from the checkpoint, i.e. the downtime between the jobs is not counted.
+        manager._start_time = time.time() - checkpoint.elapsed
+        n_asks, worker_id, observations = checkpoint.n_asks, checkpoint.worker_id, checkpoint.observations
+        opt.replay(n_asks=n_asks, observations=observations)
+
+    recording_opt = _RecordingOptimizer(opt, observations)
+    last_saved = time.time()
+    for i in range(n_asks, manager._wrapper_vars.n_evals + n_workers - 1):
+        eval_config, fidels, config_id = manager._ask_with_timer(opt=recording_opt, worker_id=worker_id)
+        manager._proc_obj_func(eval_config=eval_config, worker_id=worker_id, fidels=fidels, config_id=config_id)
+        worker_id = int(np.argmin(manager._cumtimes))
+        if i + 1 >= n_workers:
+            manager._tell_pending_result(opt=recording_opt, worker_id=worker_id)
+        if manager._cumtimes[worker_id] > manager._wrapper_vars.max_total_eval_time:
+            break
+
+        if time.time() - last_saved >= checkpoint_interval:
+            checkpoint = Checkpoint(
+                n_asks=i + 1,
+                worker_id=worker_id,
+                elapsed=time.time() - manager._start_time,
+                rng_state=manager._worker_vars.rng.get_state(),
+                simulator_state={attr: getattr(manager, attr) for attr in SIMULATOR_ATTRS},
+                observations=observations,
+            )
+            _save_checkpoint(save_dir_name, checkpoint)
+            last_saved = time.time()
+
+    manager._save_results()
+    if os.path.exists(checkpoint_path(save_dir_name)):
+        os.remove(checkpoint_path(save_dir_name))
@@ -1,4 +1,5 @@
 from src.utils import cleanup_info
 
 
-cleanup_info()
+if __name__ == "__main__":
+    cleanup_info()
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from src.info_tree import INFO_DIR
+
+
+INDEX_PATH = os.path.join(INFO_DIR, "completion-index.sqlite")
+
+
+class CompletionIndex:
+    # We use the rollback journal (not WAL) because WAL does not work on network filesystems.
+    def __init__(self, path: str = INDEX_PATH, timeout: float = 600.0):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "save_dir_name TEXT PRIMARY KEY, "
+            "opt_name TEXT NOT NULL, "
+            "n_evals INTEGER NOT NULL, "
+            "completed INTEGER NOT NULL, "
+            "compressed INTEGER NOT NULL DEFAULT 0, "
+            "cleaned INTEGER NOT NULL DEFAULT 0, "
+            "updated_at REAL NOT NULL)"
+        )
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        # Grouping many updates into one transaction avoids a sync of the journal per update.
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        else:
+            self._conn.execute("COMMIT")
+
+    def flags(self) -> dict[str, tuple[bool, bool, bool]]:
+        query = "SELECT save_dir_name, completed, compressed, cleaned FROM runs"
+        return {row[0]: (bool(row[1]), bool(row[2]), bool(row[3])) for row in self._conn.execute(query)}
+
+    def is_completed(self, save_dir_name: str) -> bool:
+        row = self._conn.execute("SELECT completed FROM runs WHERE save_dir_name = ?", (save_dir_name,)).fetchone()
+        return row is not None and bool(row[0])
+
+    def record(self, save_dir_name: str, opt_name: str, n_evals: int, completed: bool) -> None:
+        # A run may be recorded more than once, e.g. by a resumed job, so we keep the largest n_evals seen so far.
+        self._conn.execute(
+            "INSERT INTO runs (save_dir_name, opt_name, n_evals, completed, updated_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(save_dir_name) DO UPDATE SET "
+            "n_evals = MAX(n_evals, excluded.n_evals), "
+            "completed = MAX(completed, excluded.completed), "
+            "updated_at = excluded.updated_at",
+            (save_dir_name, opt_name, n_evals, int(completed), time.time()),
+        )
+
+    def mark(self, save_dir_name: str, flag: str) -> None:
+        if flag not in ["compressed", "cleaned"]:
+            raise ValueError(f"flag must be either compressed or cleaned, but got {flag}")
+
+        self._conn.execute(
+            f"UPDATE runs SET {flag} = 1, updated_at = ? WHERE save_dir_name = ?", (time.time(), save_dir_name)
+        )
+
+    def remove(self, save_dir_name: str) -> None:
+        self._conn.execute("DELETE FROM runs WHERE save_dir_name = ?", (save_dir_name,))
+
+    def completed_dirs(self, opt_name: str | None = None, unflagged: str | None = None) -> list[str]:
+        query, params = "SELECT save_dir_name FROM runs WHERE completed = 1", []
+        if opt_name is not None:
+            query += " AND opt_name = ?"
+            params.append(opt_name)
+        if unflagged is not None:
+            if unflagged not in ["compressed", "cleaned"]:
+                raise ValueError(f"unflagged must be either compressed or cleaned, but got {unflagged}")
+            query += f" AND {unflagged} = 0"
+
+        return [row[0] for row in self._conn.execute(query, params)]
@@ -1,4 +1,5 @@
 from src.utils import compress_files
 
 
-compress_files()
+if __name__ == "__main__":
+    compress_files()
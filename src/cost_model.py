@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import math
+import os
+from argparse import ArgumentParser
+from collections import defaultdict
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.info_tree import INFO_DIR, parse_save_dir_name, walk_run_dirs
+from src.timing import PHASE_TIMES_FN
+from src.trajectory_io import load_target
+from src.utils import BENCH_CHOICES, N_EVALS_DICT, UNSUPPORTED_BENCHES, get_bench_cls
+
+import ujson as json
+
+
+COST_MODEL_PATH = "mfhpo-simulator-cost-model.json"
+N_WORKERS_CHOICES = [1, 2, 4, 8]
+# The fixed requests of scripts/submit.sh, which are used until a run of the group finishes.
+DEFAULT_WALLTIME_HOURS = dict(hyperband=12.0, neps=20.0)
+# The predictions are the 95th percentile of the walltimes and the maximum memory, both with a safety margin.
+WALLTIME_QUANTILE = 0.95
+MARGIN = 1.2
+MIN_MEMORY_GB = 4.0
+
+
+@dataclass(frozen=True)
+class Cost:
+    walltime: float | None  # in seconds, None if not enough runs have finished yet
+    memory_gb: float
+
+
+def default_memory_gb(opt_name: str, n_workers: int) -> float:
+    return 15.0 + 5.0 * n_workers if opt_name in ["dehb", "smac"] else 15.0 * n_workers
+
+
+def _run_cost(
+    dir_path: str, file_names: list[str], opt_name: str, n_workers: int
+) -> tuple[float | None, float | None]:
+    if PHASE_TIMES_FN not in file_names:
+        # Runs before the phase breakdown have only actual_cumtime, which misses the startup and the teardown.
+        actual_cumtime = load_target(dir_path, "results", keys=["actual_cumtime"]).get("actual_cumtime", [])
+        return (float(actual_cumtime[-1]) if len(actual_cumtime) > 0 else None), None
+
+    with open(os.path.join(dir_path, PHASE_TIMES_FN), mode="r") as f:
+        times = json.load(f)
+
+    if not times.get("memory_reliable", True):
+        # The later runs of src.driver in one process may report the peaks of the earlier runs.
+        memory_gb = None
+    elif opt_name == "neps" and times["max_child_rss_gb"] == 0.0:
+        # Before src.neps forked the workers, each worker was a separate job and only worker 0 recorded its memory.
+        memory_gb = n_workers * times["max_rss_gb"]
+    else:  # The workers are either threads or children, e.g. Dask workers, of the main process.
+        memory_gb = times["max_rss_gb"] + n_workers * times["max_child_rss_gb"]
+    return times["total"], memory_gb
+
+
+def _cost_key(opt_name: str, bench_name: str, n_workers: int) -> str:
+    return f"{opt_name}/{bench_name}/{n_workers}"
+
+
+class CostModel:
+    def __init__(self, costs: dict[str, dict[str, float]]):
+        self._costs = costs
+
+    @classmethod
+    def load(cls, path: str = COST_MODEL_PATH) -> CostModel:
+        if not os.path.exists(path):
+            return cls({})
+
+        with open(path, mode="r") as f:
+            return cls(json.load(f))
+
+    def save(self, path: str = COST_MODEL_PATH) -> None:
+        with open(path, mode="w") as f:
+            json.dump(self._costs, f, indent=4, escape_forward_slashes=False)
+
+    @classmethod
+    def fit(cls, prefix: str = INFO_DIR, min_runs: int = 3) -> CostModel:
+        walltimes: dict[str, list[float]] = defaultdict(list)
+        memories: dict[str, list[float]] = defaultdict(list)
+        for count, (dir_path, file_names) in enumerate(walk_run_dirs(prefix), start=1):
+            if count % 1000 == 0:
+                print(f"Read {count} directories")
+
+            if "complete.lock" not in file_names:
+                continue
+
+            key = parse_save_dir_name(dir_path)
+            walltime, memory_gb = _run_cost(dir_path, file_names, key.opt_name, key.n_workers)
+            cost_key = _cost_key(key.opt_name, key.bench_name, key.n_workers)
+            if walltime is not None:
+                walltimes[cost_key].append(walltime)
+            if memory_gb is not None:
+                memories[cost_key].append(memory_gb)
+
+        costs = {}
+        for cost_key, vals in walltimes.items():
+            if len(vals) < min_runs:
+                continue
+
+            costs[cost_key] = dict(walltime=MARGIN * float(np.quantile(vals, WALLTIME_QUANTILE)), n_runs=len(vals))
+            if len(memories[cost_key]) >= min_runs:
+                costs[cost_key]["memory_gb"] = MARGIN * max(memories[cost_key])
+
+        return cls(costs)
+
+    def predict(self, opt_name: str, bench_name: str, n_workers: int) -> Cost:
+        # No fallback to the other benchmarks because, e.g. the synthetic ones are much cheaper than the tabular ones.
+        cost = self._costs.get(_cost_key(opt_name, bench_name, n_workers), None)
+        default_memory = default_memory_gb(opt_name, n_workers)
+        if cost is None:
+            return Cost(walltime=None, memory_gb=default_memory)
+
+        return Cost(walltime=cost["walltime"], memory_gb=max(MIN_MEMORY_GB, cost.get("memory_gb", default_memory)))
+
+
+def _bench_variants() -> list[tuple[str, int]]:
+    # The benchmarks run by each job of scripts/run.moab and the number of their datasets.
+    variants = []
+    for bench_name in BENCH_CHOICES:
+        bench_cls = get_bench_cls(bench_name)
+        if bench_cls._BENCH_TYPE == "HPO":
+            variants.append((bench_name, len(bench_cls._CONSTS.dataset_names)))
+        elif bench_name == "hartmann":
+            variants.extend([("hartmann3d", 1), ("hartmann6d", 1)])
+        else:
+            variants.append((bench_name, 1))
+
+    return variants
+
+
+def print_requests(cost_model: CostModel, opt_names: list[str]) -> None:
+    # One line per job of scripts/submit.sh, i.e. every benchmark for one (opt_name, n_workers), longest first.
+    requests = []
+    for opt_name in opt_names:
+        for n_workers in N_WORKERS_CHOICES:
+            costs = [
+                (n_datasets, cost_model.predict(opt_name, bench_name, n_workers))
+                for bench_name, n_datasets in _bench_variants()
+                if bench_name not in UNSUPPORTED_BENCHES.get(opt_name, [])
+            ]
+            if any(cost.walltime is None for _, cost in costs):
+                walltime = 3600.0 * DEFAULT_WALLTIME_HOURS.get(opt_name, 4.0)
+            else:
+                walltime = sum(n_datasets * cost.walltime for n_datasets, cost in costs)
+
+            requests.append((walltime, opt_name, n_workers, max(cost.memory_gb for _, cost in costs)))
+
+    for walltime, opt_name, n_workers, memory_gb in sorted(requests, reverse=True):
+        minutes = math.ceil(walltime / 60)
+        print(f"{opt_name} {n_workers} walltime={minutes // 60}:{minutes % 60:02d}:00,mem={math.ceil(memory_gb)}gb")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("command", type=str, choices=["fit", "requests"])
+    parser.add_argument("--prefix", type=str, default=INFO_DIR)
+    parser.add_argument("--path", type=str, default=COST_MODEL_PATH)
+    parser.add_argument("--opt_names", type=str, nargs="+", default=[k for k in N_EVALS_DICT if k != "hebo"])
+    args = parser.parse_args()
+
+    if args.command == "fit":
+        cost_model = CostModel.fit(args.prefix)
+        cost_model.save(args.path)
+        print(f"Saved the cost model to {args.path}")
+    else:
+        print_requests(CostModel.load(args.path), args.opt_names)
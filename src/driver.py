@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import multiprocessing
+import shutil
+import sys
+import time
+import traceback
+from dataclasses import replace
+from typing import Any
+
+from src.timing import PHASE_TIMER
+from src.utils import (
+    N_EVALS_DICT,
+    UNSUPPORTED_BENCHES,
+    ParsedArgs,
+    get_arg_parser,
+    get_bench_cls,
+    get_bench_instance,
+    get_optimizer,
+    init_job_tmp_dir,
+    is_completed,
+    make_save_dir_name,
+    move_results,
+    to_parsed_args,
+)
+
+
+OPT_CHOICES = list(N_EVALS_DICT.keys())
+
+
+def _run_cell(opt_name: str, args: ParsedArgs, bench: Any | None) -> None:
+    start = time.time()
+    if bench is not None:
+        bench.reseed(args.seed)
+
+    get_optimizer(opt_name).run(args, bench=bench)
+    print(f"Finished {opt_name} with seed={args.seed} in {time.time() - start:.1f} seconds")
+
+
+def _run_forked_cell(opt_name: str, args: ParsedArgs, bench: Any | None) -> None:
+    # The time spent by the parent, e.g. waiting for the other cells, does not belong to this cell.
+    PHASE_TIMER.reset()
+    if args.tmp_dir is None:
+        _run_cell(opt_name, args, bench)
+        return
+
+    # The concurrent cells get their own tmp_dir, and the results go back to tmp_dir as in the sequential mode.
+    save_dir_name = make_save_dir_name(opt_name=opt_name, args=args)
+    cell_tmp_dir = init_job_tmp_dir(args.tmp_dir, save_dir_name)
+    try:
+        _run_cell(opt_name, replace(args, tmp_dir=cell_tmp_dir), bench)
+    finally:
+        move_results(cell_tmp_dir, args.tmp_dir, save_dir_name)
+        shutil.rmtree(cell_tmp_dir, ignore_errors=True)
+
+
+def _get_cells(opt_names: list[str], args: ParsedArgs, seeds: list[int]) -> list[tuple[str, ParsedArgs]]:
+    cells = []
+    for seed in seeds:
+        for opt_name in opt_names:
+            cell_args = replace(args, seed=seed)
+            if args.bench_name in UNSUPPORTED_BENCHES.get(opt_name, []):
+                print(f"Skip {opt_name} as it does not support {args.bench_name}")
+            elif is_completed(make_save_dir_name(opt_name=opt_name, args=cell_args), opt_name=opt_name):
+                print(f"Skip {opt_name} with seed={seed} as the completed result already exists")
+            else:
+                cells.append((opt_name, cell_args))
+
+    return cells
+
+
+def _run_isolated_cell(opt_name: str, args: ParsedArgs, bench: Any | None) -> bool:
+    # A failure of a cell, including the sys.exit of get_save_dir_name, must not abort the rest of the cells.
+    try:
+        _run_cell(opt_name, args, bench)
+    except SystemExit as e:
+        if e.code in [None, 0]:
+            return True
+        print(f"Failed {opt_name} with seed={args.seed}: {e.code}")
+        return False
+    except Exception:
+        print(f"Failed {opt_name} with seed={args.seed}:\n{traceback.format_exc()}")
+        return False
+
+    return True
+
+
+def run_cells(cells: list[tuple[str, ParsedArgs]], bench: Any | None, n_procs: int) -> list[tuple[str, int]]:
+    # Returns (opt_name, seed) of the failed cells.
+    if n_procs == 1:
+        return [(opt_name, args.seed) for opt_name, args in cells if not _run_isolated_cell(opt_name, args, bench)]
+
+    # Each cell runs in a forked process so that every cell inherits the loaded modules and benchmark.
+    # multiprocessing.Pool cannot be used here because its daemonic workers cannot launch the workers of DEHB/SMAC.
+    ctx = multiprocessing.get_context("fork")
+    running: list[tuple[multiprocessing.process.BaseProcess, str, int]] = []
+    failed: list[tuple[str, int]] = []
+
+    def _collect(block: bool) -> None:
+        for p, opt_name, seed in running:
+            if block:
+                p.join()
+            if not p.is_alive() and p.exitcode != 0:
+                print(f"Failed {opt_name} with seed={seed} with the exit code {p.exitcode}")
+                failed.append((opt_name, seed))
+
+        running[:] = [r for r in running if r[0].is_alive()]
+
+    for opt_name, args in cells:
+        while len(running) >= n_procs:
+            time.sleep(1.0)
+            _collect(block=False)
+
+        p = ctx.Process(target=_run_forked_cell, args=(opt_name, args, bench))
+        p.start()
+        running.append((p, opt_name, args.seed))
+
+    _collect(block=True)
+    return failed
+
+
+if __name__ == "__main__":
+    parser = get_arg_parser()
+    parser.add_argument("--opt_names", type=str, nargs="+", choices=OPT_CHOICES, required=True)
+    parser.add_argument("--seed_end", type=int, default=None, help="Run the seeds from --seed to --seed_end")
+    parser.add_argument("--n_procs", type=int, default=1, help="The number of cells to run at the same time")
+    args = parser.parse_args()
+    seeds = list(range(args.seed, (args.seed if args.seed_end is None else args.seed_end) + 1))
+    n_procs = args.n_procs
+    opt_names = args.opt_names
+    args = to_parsed_args(args)
+
+    cells = _get_cells(opt_names, args, seeds)
+    bench = None
+    if len(cells) > 0 and get_bench_cls(args.bench_name)._BENCH_TYPE == "HPO":
+        # The synthetic benchmarks are cheap to build and some optimizers need them with use_fidel=False.
+        bench = get_bench_instance(args, share_benchdata=True)
+
+    print(f"Run {len(cells)} cells with n_procs={n_procs}")
+    failed = run_cells(cells, bench=bench, n_procs=n_procs)
+    if len(failed) > 0:
+        sys.exit(f"{len(failed)} of {len(cells)} cells failed: {failed}")
@@ -5,7 +5,7 @@ from typing import Any
 
 import ConfigSpace as CS
 
-from benchmark_simulator import AbstractAskTellOptimizer, ObjectiveFuncWrapper
+from benchmark_simulator import ObjectiveFuncWrapper
 
 from hebo.design_space.design_space import DesignSpace
 from hebo.optimizers.hebo import HEBO
@@ -14,7 +14,9 @@ import numpy as np
 
 import pandas as pd
 
-from src.utils import get_bench_instance, get_save_dir_name, parse_args
+from src.checkpoint import ReplayableOptimizer, simulate
+from src.timing import PHASE_TIMER, EvalTimer
+from src.utils import ParsedArgs, get_bench_instance, get_save_dir_name, parse_args, record_completion
 
 
 def extract_space(config_space: CS.ConfigurationSpace):
@@ -37,24 +39,44 @@ def extract_space(config_space: CS.ConfigurationSpace):
     return DesignSpace().parse(config_info)
 
 
-class HEBOOptimizer(AbstractAskTellOptimizer):
-    def __init__(self, hebo_space, obj_key: str):
+class HEBOOptimizer(ReplayableOptimizer):
+    # HEBO refits its surrogate at every suggest, so we ask for batch_size suggestions per refit and queue them.
+    # The results told in between are buffered and given to HEBO in one observe right before the next refit.
+    def __init__(self, hebo_space, obj_key: str, batch_size: int = 1):
         self._hebo = HEBO(space=hebo_space)
         self._obj_key = obj_key
+        self._batch_size = batch_size
+        self._queue: list[dict[str, Any]] = []
+        self._buffer: list[tuple[dict[str, Any], float]] = []
         self._count_for_debug = 0
 
+    def _observe(self, eval_configs: list[dict[str, Any]], losses: list[float]) -> None:
+        if len(eval_configs) == 0:
+            return
+
+        self._hebo.observe(pd.DataFrame(eval_configs), np.asarray(losses)[:, np.newaxis])
+
     def ask(self) -> tuple[dict[str, Any], None, None]:
         self._count_for_debug += 1
         if self._count_for_debug % 20 == 0:
             print(f"Sample {self._count_for_debug}-th config at {time.time()}")
 
-        config: pd.DataFrame = self._hebo.suggest()
-        eval_config = {name: next(iter(v.values())) for name, v in config.to_dict().items()}
-        return eval_config, None, None
+        if len(self._queue) == 0:
+            self._observe([c for c, _ in self._buffer], [loss for _, loss in self._buffer])
+            self._buffer = []
+            configs: pd.DataFrame = self._hebo.suggest(n_suggestions=self._batch_size)
+            self._queue = configs.to_dict(orient="records")
+
+        return self._queue.pop(0), None, None
 
     def tell(self, eval_config: dict[str, Any], results: dict[str, float], **kwargs) -> None:
-        config = pd.DataFrame({name: {0: v} for name, v in eval_config.items()})
-        self._hebo.observe(config, np.array([[results[self._obj_key]]]))
+        self._buffer.append((eval_config, results[self._obj_key]))
+
+    def replay(self, n_asks: int, observations: list[dict[str, Any]]) -> None:
+        # The checkpoint does not keep the queue, so the replayed run starts with a new batch.
+        self._count_for_debug = n_asks
+        eval_configs = [observation["eval_config"] for observation in observations]
+        self._observe(eval_configs, [observation["results"][self._obj_key] for observation in observations])
 
 
 def run_hebo(
@@ -65,29 +87,38 @@ def run_hebo(
     n_workers: int,
     tmp_dir: str | None,
     n_evals: int = 200,  # eta=3,S=2,100 full evals
+    batch_size: int | None = None,
+    eval_times: bool = False,
 ):
     n_actual_evals_in_opt = n_evals + n_workers
-    wrapper = ObjectiveFuncWrapper(
-        obj_func=obj_func,
-        n_workers=n_workers,
-        save_dir_name=save_dir_name,
-        n_actual_evals_in_opt=n_actual_evals_in_opt,
-        n_evals=n_evals,
-        seed=seed,
-        ask_and_tell=True,
-        store_actual_cumtime=True,
-        expensive_sampler=True,
-        tmp_dir=tmp_dir,
-    )
-    hebo_space = extract_space(config_space=config_space)
-    hebo_opt = HEBOOptimizer(hebo_space=hebo_space, obj_key=wrapper.obj_keys[0])
-    wrapper.simulate(opt=hebo_opt)
-
-
-if __name__ == "__main__":
-    args = parse_args()
+    with PHASE_TIMER.phase("optimizer"):
+        wrapper = ObjectiveFuncWrapper(
+            obj_func=obj_func,
+            n_workers=n_workers,
+            save_dir_name=save_dir_name,
+            n_actual_evals_in_opt=n_actual_evals_in_opt,
+            n_evals=n_evals,
+            seed=seed,
+            ask_and_tell=True,
+            store_actual_cumtime=True,
+            expensive_sampler=True,
+            tmp_dir=tmp_dir,
+        )
+        if eval_times:
+            # The timer patches the ask-and-tell manager of the wrapper.
+            EvalTimer(wrapper)
+
+        hebo_space = extract_space(config_space=config_space)
+        batch_size = n_workers if batch_size is None else batch_size
+        hebo_opt = HEBOOptimizer(hebo_space=hebo_space, obj_key=wrapper.obj_keys[0], batch_size=batch_size)
+
+    with PHASE_TIMER.phase("optimize"):
+        simulate(wrapper, opt=hebo_opt, save_dir_name=save_dir_name)
+
+
+def run(args: ParsedArgs, bench: Any | None = None) -> None:
     save_dir_name = get_save_dir_name(opt_name="hebo", args=args)
-    bench = get_bench_instance(args, use_fidel=False)
+    bench = get_bench_instance(args, use_fidel=False) if bench is None else bench
     run_hebo(
         obj_func=bench,
         config_space=bench.config_space,
@@ -95,4 +126,10 @@ if __name__ == "__main__":
         save_dir_name=save_dir_name,
         seed=args.seed,
         tmp_dir=args.tmp_dir,
+        eval_times=args.eval_times,
     )
+    record_completion(save_dir_name, opt_name="hebo", tmp_dir=args.tmp_dir)
+
+
+if __name__ == "__main__":
+    run(parse_args())
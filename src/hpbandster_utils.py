@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+from typing import Any, Literal
+
+from benchmark_simulator import AbstractAskTellOptimizer, ObjectiveFuncWrapper, get_multiple_wrappers
+
+import ConfigSpace as CS
+
+from hpbandster.core import nameserver as hpns
+from hpbandster.core.base_iteration import BaseIteration
+from hpbandster.core.dispatcher import Job
+from hpbandster.core.worker import Worker
+from hpbandster.optimizers import BOHB, HyperBand
+from hpbandster.optimizers.config_generators import RandomSampling
+from hpbandster.optimizers.config_generators.bohb import BOHB as BOHBConfigGenerator
+from hpbandster.optimizers.iterations import SuccessiveHalving
+
+import numpy as np
+
+from src.timing import PHASE_TIMER, EvalTimer, timed_call
+
+
+class BOHBWorker(Worker):
+    # https://github.com/automl/HpBandSter
+    def __init__(
+        self, worker: ObjectiveFuncWrapper, sleep_interval: int = 0.5, eval_times: bool = False, **kwargs: Any
+    ):
+        super().__init__(**kwargs)
+        self.sleep_interval = sleep_interval
+        self._worker = worker
+        self._eval_timer = EvalTimer(worker) if eval_times else None
+
+    def compute(self, config: dict[str, Any], budget: int, **kwargs: Any) -> dict[str, float]:
+        fidel_keys = self._worker.fidel_keys
+        fidels = dict(epoch=int(budget)) if "epoch" in fidel_keys else {k: int(budget) for k in fidel_keys}
+        # config_id: a triplet of ints(iteration, budget index, running index) internally used in BOHB
+        # By passing config_id, it increases the safety in the continual learning
+        config_id = kwargs["config_id"][0] + 100000 * kwargs["config_id"][2]
+        with timed_call(self._eval_timer):
+            results = self._worker(eval_config=config, fidels=fidels, config_id=config_id)
+        return dict(loss=results["loss"])
+
+
+class HpBandSterOptimizer(AbstractAskTellOptimizer):
+    # The bracket scheduling of hpbandster.core.master.Master.run without the dispatcher,
+    # so the config generator and the successive halving brackets are driven in-process without any Pyro call.
+    def __init__(
+        self,
+        config_space: CS.ConfigurationSpace,
+        min_fidel: int,
+        max_fidel: int,
+        fidel_key: str,
+        sampler: Literal["hyperband", "bohb"],
+        eta: int = 3,
+    ):
+        if sampler == "hyperband":
+            self._config_generator = RandomSampling(config_space)
+        else:
+            self._config_generator = BOHBConfigGenerator(configspace=config_space)
+
+        self._fidel_key = fidel_key
+        self._eta = eta
+        # The same budgets as HyperBand and BOHB in hpbandster.optimizers.
+        self._max_sh_iter = -int(np.log(min_fidel / max_fidel) / np.log(eta)) + 1
+        self._budgets = max_fidel * np.power(eta, -np.linspace(self._max_sh_iter - 1, 0, self._max_sh_iter))
+        self._iterations: list[BaseIteration] = []
+        self._config_ids: dict[int, tuple[int, int, int]] = {}
+
+    def _get_next_iteration(self, iteration: int) -> SuccessiveHalving:
+        s = self._max_sh_iter - 1 - (iteration % self._max_sh_iter)
+        n0 = int(np.floor(self._max_sh_iter / (s + 1)) * self._eta**s)
+        ns = [max(int(n0 * self._eta ** (-i)), 1) for i in range(s + 1)]
+        return SuccessiveHalving(
+            HPB_iter=iteration,
+            num_configs=ns,
+            budgets=self._budgets[(-s - 1) :],
+            config_sampler=self._config_generator.get_config,
+        )
+
+    def ask(self) -> tuple[dict[str, Any], dict[str, int], int]:
+        # As in Master.run with an unbounded n_iterations, the next bracket is opened if no bracket has a free slot.
+        # Master.run waits for the running jobs only once no iteration is left, which never happens here
+        # because the simulator stops the run after n_evals.
+        next_run = None
+        for iteration in self._iterations:
+            if not iteration.is_finished:
+                next_run = iteration.get_next_run()
+            if next_run is not None:
+                break
+        else:
+            self._iterations.append(self._get_next_iteration(len(self._iterations)))
+            next_run = self._iterations[-1].get_next_run()
+
+        hb_config_id, config, budget = next_run
+        # config_id: a triplet of ints(iteration, budget index, running index) internally used in BOHB
+        # By passing config_id, it increases the safety in the continual learning
+        config_id = hb_config_id[0] + 100000 * hb_config_id[2]
+        self._config_ids[config_id] = hb_config_id
+        return config, {self._fidel_key: int(budget)}, config_id
+
+    def tell(
+        self,
+        eval_config: dict[str, Any],
+        results: dict[str, float],
+        fidels: dict[str, int | float] | None = None,
+        config_id: int | None = None,
+    ) -> None:
+        hb_config_id = self._config_ids[config_id]
+        budget = self._iterations[hb_config_id[0]].data[hb_config_id].budget
+        job = Job(hb_config_id, config=eval_config, budget=budget)
+        job.result = dict(loss=results["loss"], info={})
+        self._iterations[hb_config_id[0]].register_result(job)
+        self._config_generator.new_result(job)
+
+
+def get_bohb_workers(
+    run_id: str,
+    ns_host: str,
+    ns_port: int,
+    obj_func: Any,
+    save_dir_name: str,
+    max_fidel: int,
+    fidel_key: str,
+    n_workers: int,
+    n_actual_evals_in_opt: int,
+    n_evals: int,
+    seed: int,
+    tmp_dir: str | None,
+    eval_times: bool = False,
+) -> list[BOHBWorker]:
+    kwargs = dict(
+        obj_func=obj_func,
+        n_workers=n_workers,
+        save_dir_name=save_dir_name,
+        continual_max_fidel=max_fidel,
+        fidel_keys=[fidel_key],
+        n_actual_evals_in_opt=n_actual_evals_in_opt,
+        n_evals=n_evals,
+        seed=seed,
+        store_actual_cumtime=True,
+        tmp_dir=tmp_dir,
+    )
+    bohb_workers = []
+    for i, w in enumerate(get_multiple_wrappers(**kwargs, max_waiting_time=120.0)):
+        worker = BOHBWorker(
+            worker=w, id=i, nameserver=ns_host, nameserver_port=ns_port, run_id=run_id, eval_times=eval_times
+        )
+        worker.run(background=True)
+        bohb_workers.append(worker)
+
+    return bohb_workers
+
+
+def _run_bohb_with_nameserver(
+    obj_func: Any,
+    config_space: CS.ConfigurationSpace,
+    save_dir_name: str,
+    min_fidel: int,
+    max_fidel: int,
+    fidel_key: str,
+    seed: int,
+    n_workers: int,
+    tmp_dir: str | None,
+    sampler: Literal["hyperband", "bohb"],
+    run_id: str,
+    ns_host: str,
+    n_evals: int,
+    n_brackets: int,
+    eval_times: bool,
+) -> None:
+    with PHASE_TIMER.phase("optimizer"):
+        ns = hpns.NameServer(run_id=run_id, host=ns_host, port=None)
+        # The port is passed explicitly so that concurrent runs on the same node never share a nameserver.
+        ns_host, ns_port = ns.start()
+        _ = get_bohb_workers(
+            run_id=run_id,
+            ns_host=ns_host,
+            ns_port=ns_port,
+            obj_func=obj_func,
+            save_dir_name=save_dir_name,
+            max_fidel=max_fidel,
+            fidel_key=fidel_key,
+            n_workers=n_workers,
+            n_actual_evals_in_opt=n_evals + n_workers,
+            n_evals=n_evals,
+            seed=seed,
+            tmp_dir=tmp_dir,
+            eval_times=eval_times,
+        )
+        sampler_cls = HyperBand if sampler == "hyperband" else BOHB
+        opt = sampler_cls(
+            configspace=config_space,
+            run_id=run_id,
+            nameserver=ns_host,
+            nameserver_port=ns_port,
+            min_budget=min_fidel,
+            max_budget=max_fidel,
+        )
+
+    with PHASE_TIMER.phase("optimize"):
+        opt.run(n_iterations=n_brackets, min_n_workers=n_workers)
+
+    with PHASE_TIMER.phase("teardown"):
+        opt.shutdown(shutdown_workers=True)
+        ns.shutdown()
+
+
+def run_bohb(
+    obj_func: Any,
+    config_space: CS.ConfigurationSpace,
+    save_dir_name: str,
+    min_fidel: int,
+    max_fidel: int,
+    fidel_key: str,
+    seed: int,
+    n_workers: int,
+    tmp_dir: str | None,
+    sampler: Literal["hyperband", "bohb"],
+    run_id: str = "bohb-run",
+    ns_host: str = "127.0.0.1",
+    n_evals: int = 450,  # eta=3,S=2,100 full evals
+    n_brackets: int = 72,  # 22 HB iter --> 33 SH brackets
+    ask_and_tell: bool = True,
+    eval_times: bool = False,
+) -> None:
+    if not ask_and_tell:
+        # The original setup with a Pyro nameserver and a worker thread per simulated worker.
+        _run_bohb_with_nameserver(
+            obj_func=obj_func,
+            config_space=config_space,
+            save_dir_name=save_dir_name,
+            min_fidel=min_fidel,
+            max_fidel=max_fidel,
+            fidel_key=fidel_key,
+            seed=seed,
+            n_workers=n_workers,
+            tmp_dir=tmp_dir,
+            sampler=sampler,
+            run_id=run_id,
+            ns_host=ns_host,
+            n_evals=n_evals,
+            n_brackets=n_brackets,
+            eval_times=eval_times,
+        )
+        return
+
+    # n_brackets is ignored from here, as the ask-and-tell run opens new brackets until the simulator stops at n_evals.
+    with PHASE_TIMER.phase("optimizer"):
+        wrapper = ObjectiveFuncWrapper(
+            obj_func=obj_func,
+            n_workers=n_workers,
+            save_dir_name=save_dir_name,
+            continual_max_fidel=max_fidel,
+            fidel_keys=[fidel_key],
+            n_actual_evals_in_opt=n_evals + n_workers,
+            n_evals=n_evals,
+            seed=seed,
+            ask_and_tell=True,
+            store_actual_cumtime=True,
+            expensive_sampler=True,
+            tmp_dir=tmp_dir,
+        )
+        if eval_times:
+            # The timer patches the ask-and-tell manager of the wrapper.
+            EvalTimer(wrapper)
+        opt = HpBandSterOptimizer(
+            config_space=config_space, min_fidel=min_fidel, max_fidel=max_fidel, fidel_key=fidel_key, sampler=sampler
+        )
+
+    with PHASE_TIMER.phase("optimize"):
+        wrapper.simulate(opt)
@@ -1,21 +1,22 @@
 from __future__ import annotations
 
 import logging
+from typing import Any
 
 import numpy as np
 
-from src.utils import get_bench_instance, get_save_dir_name, parse_args, run_bohb
+from src.hpbandster_utils import run_bohb
+from src.utils import ParsedArgs, get_bench_instance, get_save_dir_name, parse_args, record_completion
 
 
 logging.getLogger("hpbandster").setLevel(logging.CRITICAL)
 
 
-if __name__ == "__main__":
-    args = parse_args()
+def run(args: ParsedArgs, bench: Any | None = None) -> None:
     sampler = "hyperband"
     save_dir_name = get_save_dir_name(opt_name=sampler, args=args)
     np.random.seed(args.seed)
-    obj_func = get_bench_instance(args)
+    obj_func = get_bench_instance(args) if bench is None else bench
 
     run_id = f"{sampler}_bench={args.bench_name}_dataset={args.dataset_id}_nworkers={args.n_workers}_seed={args.seed}"
     fidel_key = "epoch" if "epoch" in obj_func.fidel_keys else "z0"
@@ -30,6 +31,13 @@ if __name__ == "__main__":
         save_dir_name=save_dir_name,
         seed=args.seed,
         tmp_dir=args.tmp_dir,
+        run_id=run_id,
         n_evals=4500,
         n_brackets=720,
+        eval_times=args.eval_times,
     )
+    record_completion(save_dir_name, opt_name=sampler, tmp_dir=args.tmp_dir)
+
+
+if __name__ == "__main__":
+    run(parse_args())
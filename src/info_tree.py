@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import Iterator
+
+from src.trajectory_io import TRAJECTORY_FN
+
+
+INFO_DIR = "mfhpo-simulator-info/"
+
+
+@dataclass(frozen=True)
+class RunKey:
+    opt_name: str
+    bench_name: str
+    dataset_name: str | None
+    n_workers: int
+    seed: int
+
+    @property
+    def save_dir_name(self) -> str:
+        dataset_part = "" if self.dataset_name is None else f"_dataset={self.dataset_name}"
+        return f"{self.opt_name}/bench={self.bench_name}{dataset_part}_nworkers={self.n_workers}/{self.seed}"
+
+
+def parse_save_dir_name(save_dir_name: str) -> RunKey:
+    # save_dir_name can be either <opt>/<cond>/<seed> or a path ending with it, e.g. mfhpo-simulator-info/<opt>/...
+    opt_name, cond, seed = save_dir_name.rstrip("/").split("/")[-3:]
+    # dataset names never contain "_" because get_save_dir_name replaces it with "-"
+    subcond = dict(kv.split("=") for kv in cond.split("_"))
+    return RunKey(
+        opt_name=opt_name,
+        bench_name=subcond["bench"],
+        dataset_name=subcond.get("dataset", None),
+        n_workers=int(subcond["nworkers"]),
+        seed=int(seed),
+    )
+
+
+def walk_run_dirs(prefix: str = INFO_DIR) -> Iterator[tuple[str, list[str]]]:
+    for dir_path, _, file_names in os.walk(prefix):
+        if "results.json" in file_names or TRAJECTORY_FN in file_names:
+            yield dir_path, file_names
@@ -1,30 +1,47 @@
 from __future__ import annotations
 
 import logging
+import multiprocessing
 import os
+import shutil
+import tempfile
+import time
 import warnings
 from typing import Any
 
 import ConfigSpace as CS
 
 from benchmark_simulator import ObjectiveFuncWrapper
+from benchmark_simulator._constants import DIR_NAME, _SharedDataFileNames
 
 import neps
 
 import numpy as np
 
-from src.utils import get_bench_instance, get_save_dir_name, parse_args
+from src.info_tree import INFO_DIR
+from src.timing import PHASE_TIMER, EvalTimer, timed_call
+from src.utils import ParsedArgs, get_bench_instance, get_save_dir_name, parse_args, record_completion
 
 
 warnings.filterwarnings("ignore", category=DeprecationWarning)
+# The simulator and NePS coordinate the worker processes through files, which are polled every 0.1 ms.
+# The files live in the RAM-backed /dev/shm during the run, so that the polls and locks never touch a disk.
+COORDINATION_DIR = "/dev/shm"
+# The simulator files are initialized only by the worker 0, and the other workers read them as soon as they are listed,
+# i.e. possibly before the worker 0 wrote their initial content. So the other workers start after the initialization.
+INIT_POLL_INTERVAL = 1e-3
+INIT_TIME_LIMIT = 600.0
 
 
 class NEPSWorker(ObjectiveFuncWrapper):
+    eval_timer: EvalTimer | None = None
+
     def __call__(self, **eval_config: dict[str, Any]) -> dict[str, float]:
         _eval_config = eval_config.copy()
         fidel_key = self.fidel_keys[0]
         fidels = {fidel_key: _eval_config.pop(fidel_key)}
-        return super().__call__(eval_config=_eval_config, fidels=fidels)
+        with timed_call(self.eval_timer):
+            return super().__call__(eval_config=_eval_config, fidels=fidels)
 
 
 def get_pipeline_space(config_space: CS.ConfigurationSpace) -> dict[str, neps.search_spaces.parameter.Parameter]:
@@ -55,44 +72,122 @@ def run_neps(
     seed: int,
     tmp_dir: str | None,
     n_evals: int = 450,  # eta=3,S=2,100 full evals
+    eval_times: bool = False,
 ):
     np.random.seed(seed)
     n_actual_evals_in_opt = n_evals + n_workers
-    worker = NEPSWorker(
-        save_dir_name=save_dir_name,
-        launch_multiple_wrappers_from_user_side=True,
-        n_workers=n_workers,
-        obj_func=obj_func,
-        n_actual_evals_in_opt=n_actual_evals_in_opt,
-        n_evals=n_evals,
-        fidel_keys=[fidel_key],
-        continual_max_fidel=max_fidel,
-        seed=seed,
-        expensive_sampler=True,
-        max_waiting_time=3600.0,
-        store_actual_cumtime=True,
-        tmp_dir=tmp_dir,
-        worker_index=worker_index,
-    )
-    pipeline_space = get_pipeline_space(config_space)
-    pipeline_space[fidel_key] = neps.IntegerParameter(lower=min_fidel, upper=max_fidel, is_fidelity=True)
+    with PHASE_TIMER.phase("optimizer"):
+        worker = NEPSWorker(
+            save_dir_name=save_dir_name,
+            launch_multiple_wrappers_from_user_side=True,
+            n_workers=n_workers,
+            obj_func=obj_func,
+            n_actual_evals_in_opt=n_actual_evals_in_opt,
+            n_evals=n_evals,
+            fidel_keys=[fidel_key],
+            continual_max_fidel=max_fidel,
+            seed=seed,
+            expensive_sampler=True,
+            max_waiting_time=3600.0,
+            store_actual_cumtime=True,
+            tmp_dir=tmp_dir,
+            worker_index=worker_index,
+        )
+        worker.eval_timer = EvalTimer(worker) if eval_times else None
+        pipeline_space = get_pipeline_space(config_space)
+        pipeline_space[fidel_key] = neps.IntegerParameter(lower=min_fidel, upper=max_fidel, is_fidelity=True)
 
     logging.basicConfig(level=logging.ERROR)
-    neps.run(
-        run_pipeline=worker,
-        pipeline_space=pipeline_space,
-        root_directory=os.path.join("" if tmp_dir is None else tmp_dir, "logs", "_".join(save_dir_name.split("/"))),
-        max_evaluations_total=n_actual_evals_in_opt,
-    )
+    with PHASE_TIMER.phase("optimize"):
+        neps.run(
+            run_pipeline=worker,
+            pipeline_space=pipeline_space,
+            root_directory=os.path.join("" if tmp_dir is None else tmp_dir, "logs", "_".join(save_dir_name.split("/"))),
+            max_evaluations_total=n_actual_evals_in_opt,
+        )
 
 
-if __name__ == "__main__":
-    args = parse_args()
+def _is_simulator_initialized(dir_name: str) -> bool:
+    for fn in _SharedDataFileNames:
+        path = os.path.join(dir_name, fn.value)
+        # The initialization writes "{}" to each file.
+        if not os.path.exists(path) or os.path.getsize(path) < 2:
+            return False
+
+    return True
+
+
+def _wait_simulator_init(proc: multiprocessing.process.BaseProcess, dir_name: str) -> None:
+    start = time.time()
+    while not _is_simulator_initialized(dir_name):
+        if not proc.is_alive():
+            raise RuntimeError(f"The NePS worker 0 exited with {proc.exitcode} before initializing {dir_name}")
+        if time.time() - start >= INIT_TIME_LIMIT:
+            proc.terminate()
+            raise TimeoutError(f"The NePS worker 0 did not initialize {dir_name} in {INIT_TIME_LIMIT} seconds")
+
+        time.sleep(INIT_POLL_INTERVAL)
+
+
+def launch_neps(
+    obj_func: Any,
+    config_space: CS.ConfigurationSpace,
+    save_dir_name: str,
+    min_fidel: int,
+    max_fidel: int,
+    fidel_key: str,
+    n_workers: int,
+    seed: int,
+    tmp_dir: str | None,
+    coordination_dir: str | None = COORDINATION_DIR,
+    n_evals: int = 450,
+    eval_times: bool = False,
+) -> None:
+    use_shm = coordination_dir is not None and os.path.isdir(coordination_dir)
+    work_dir = tempfile.mkdtemp(prefix="neps-", dir=coordination_dir) if use_shm else tmp_dir
+    kwargs = dict(
+        obj_func=obj_func,
+        config_space=config_space,
+        save_dir_name=save_dir_name,
+        min_fidel=min_fidel,
+        max_fidel=max_fidel,
+        fidel_key=fidel_key,
+        n_workers=n_workers,
+        seed=seed,
+        tmp_dir=work_dir,
+        n_evals=n_evals,
+        eval_times=eval_times,
+    )
+    # The forked workers inherit the imported modules and the loaded benchmark from this process.
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=run_neps, kwargs=dict(**kwargs, worker_index=i)) for i in range(n_workers)]
+    try:
+        with PHASE_TIMER.phase("optimize"):
+            procs[0].start()
+            _wait_simulator_init(procs[0], os.path.join("" if work_dir is None else work_dir, DIR_NAME, save_dir_name))
+            for p in procs[1:]:
+                p.start()
+            for p in procs:
+                p.join()
+    finally:
+        if use_shm:
+            with PHASE_TIMER.phase("teardown"):
+                src_dir = os.path.join(work_dir, INFO_DIR, save_dir_name)
+                if os.path.exists(src_dir):
+                    dst_dir = os.path.join("" if tmp_dir is None else tmp_dir, INFO_DIR, save_dir_name)
+                    shutil.copytree(src_dir, dst_dir, dirs_exist_ok=True)
+                shutil.rmtree(work_dir)
+
+    exit_codes = [p.exitcode for p in procs]
+    if any(code != 0 for code in exit_codes):
+        raise RuntimeError(f"NePS workers of {save_dir_name} failed with the exit codes {exit_codes}")
+
+
+def run(args: ParsedArgs, bench: Any | None = None, coordination_dir: str | None = COORDINATION_DIR) -> None:
     save_dir_name = get_save_dir_name(opt_name="neps", args=args)
-    bench = get_bench_instance(args)
+    bench = get_bench_instance(args, share_benchdata=True) if bench is None else bench
     fidel_key = "epoch" if "epoch" in bench.fidel_keys else "z0"
-
-    run_neps(
+    launch_neps(
         obj_func=bench,
         config_space=bench.config_space,
         min_fidel=bench.min_fidels[fidel_key],
@@ -102,5 +197,11 @@ if __name__ == "__main__":
         save_dir_name=save_dir_name,
         seed=args.seed,
         tmp_dir=args.tmp_dir,
-        worker_index=args.worker_index,
+        coordination_dir=coordination_dir,
+        eval_times=args.eval_times,
     )
+    record_completion(save_dir_name, opt_name="neps", tmp_dir=args.tmp_dir)
+
+
+if __name__ == "__main__":
+    run(parse_args())
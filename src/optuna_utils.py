@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+from typing import Any
+
+from benchmark_simulator import AbstractAskTellOptimizer, ObjectiveFuncWrapper
+
+import ConfigSpace as CS
+
+import optuna
+
+from src.timing import PHASE_TIMER, EvalTimer, timed_call
+
+
+def suggest_config(trial: optuna.Trial, config_space: CS.ConfigurationSpace) -> dict[str, Any]:
+    eval_config: dict[str, Any] = {}
+    for name in config_space:
+        hp = config_space.get_hyperparameter(name)
+        if isinstance(hp, CS.CategoricalHyperparameter):
+            eval_config[name] = trial.suggest_categorical(name, choices=hp.choices)
+        elif isinstance(hp, CS.UniformFloatHyperparameter) or hp.log:
+            dtype = float if isinstance(hp, CS.UniformFloatHyperparameter) else int
+            eval_config[name] = dtype(trial.suggest_float(name, low=hp.lower, high=hp.upper, log=hp.log))
+        elif isinstance(hp, CS.UniformIntegerHyperparameter):
+            eval_config[name] = trial.suggest_int(name, low=hp.lower, high=hp.upper)
+        else:
+            raise ValueError(f"{type(hp)} is not supported.")
+
+    return eval_config
+
+
+class OptunaObjectiveFuncWrapper(ObjectiveFuncWrapper):
+    eval_timer: EvalTimer | None = None
+
+    def set_config_space(self, config_space: CS.ConfigurationSpace) -> None:
+        self.config_space = config_space
+
+    def __call__(
+        self,
+        trial: optuna.Trial,
+    ) -> float:
+        with timed_call(self.eval_timer):
+            output = super().__call__(suggest_config(trial, self.config_space))
+        return output[self.obj_keys[0]]
+
+
+class OptunaOptimizer(AbstractAskTellOptimizer):
+    def __init__(self, study: optuna.Study, config_space: CS.ConfigurationSpace, obj_key: str):
+        self._study = study
+        self._config_space = config_space
+        self._obj_key = obj_key
+        self._running_trials: dict[int, optuna.Trial] = {}
+
+    def ask(self) -> tuple[dict[str, Any], None, int]:
+        trial = self._study.ask()
+        self._running_trials[trial.number] = trial
+        # The trial number identifies the trial in tell even if two running trials have the same config.
+        return suggest_config(trial, self._config_space), None, trial.number
+
+    def tell(
+        self,
+        eval_config: dict[str, Any],
+        results: dict[str, float],
+        fidels: dict[str, int | float] | None = None,
+        config_id: int | None = None,
+    ) -> None:
+        self._study.tell(self._running_trials.pop(config_id), results[self._obj_key])
+
+
+def _run_optuna_with_threads(
+    obj_func: Any,
+    config_space: CS.ConfigurationSpace,
+    save_dir_name: str,
+    seed: int,
+    n_workers: int,
+    sampler: optuna.samplers.BaseSampler,
+    tmp_dir: str | None,
+    n_evals: int,
+    eval_times: bool,
+) -> None:
+    n_actual_evals_in_opt = n_evals + n_workers
+    with PHASE_TIMER.phase("optimizer"):
+        wrapper = OptunaObjectiveFuncWrapper(
+            obj_func=obj_func,
+            n_workers=n_workers,
+            save_dir_name=save_dir_name,
+            n_actual_evals_in_opt=n_actual_evals_in_opt,
+            n_evals=n_evals,
+            max_waiting_time=120.0,
+            store_actual_cumtime=True,
+            seed=seed,
+            tmp_dir=tmp_dir,
+        )
+        wrapper.set_config_space(config_space=config_space)
+        wrapper.eval_timer = EvalTimer(wrapper) if eval_times else None
+        study = optuna.create_study(sampler=sampler)
+
+    with PHASE_TIMER.phase("optimize"):
+        study.optimize(wrapper, n_trials=n_actual_evals_in_opt, n_jobs=n_workers)
+
+
+def run_optuna(
+    obj_func: Any,
+    config_space: CS.ConfigurationSpace,
+    save_dir_name: str,
+    seed: int,
+    n_workers: int,
+    sampler: optuna.samplers.BaseSampler,
+    tmp_dir: str | None,
+    n_evals: int = 200,
+    ask_and_tell: bool = True,
+    eval_times: bool = False,
+) -> None:
+    if not ask_and_tell:
+        # The original setup with a thread per simulated worker, which contend for the GIL and the storage lock.
+        _run_optuna_with_threads(
+            obj_func=obj_func,
+            config_space=config_space,
+            save_dir_name=save_dir_name,
+            seed=seed,
+            n_workers=n_workers,
+            sampler=sampler,
+            tmp_dir=tmp_dir,
+            n_evals=n_evals,
+            eval_times=eval_times,
+        )
+        return
+
+    with PHASE_TIMER.phase("optimizer"):
+        wrapper = ObjectiveFuncWrapper(
+            obj_func=obj_func,
+            n_workers=n_workers,
+            save_dir_name=save_dir_name,
+            n_actual_evals_in_opt=n_evals + n_workers,
+            n_evals=n_evals,
+            seed=seed,
+            ask_and_tell=True,
+            store_actual_cumtime=True,
+            expensive_sampler=True,
+            tmp_dir=tmp_dir,
+        )
+        if eval_times:
+            # The timer patches the ask-and-tell manager of the wrapper.
+            EvalTimer(wrapper)
+        study = optuna.create_study(sampler=sampler)
+        opt = OptunaOptimizer(study=study, config_space=config_space, obj_key=wrapper.obj_keys[0])
+
+    with PHASE_TIMER.phase("optimize"):
+        wrapper.simulate(opt)
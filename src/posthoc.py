@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import os
+import shutil
+import time
+from argparse import ArgumentParser
+from multiprocessing import Pool
+from typing import Iterator
+
+from src.completion_index import CompletionIndex
+from src.info_tree import INFO_DIR, walk_run_dirs
+from src.run_summary import SUMMARY_FN, write_summary
+from src.utils import COMPRESS_LOCK, N_EVALS_DICT, cleanup_dir, compress_dir, count_evals
+
+
+def _process_dir(task: tuple[str, str, bool, bool, bool, bool]) -> tuple[str, str, int | None, bool]:
+    # Every step is idempotent, so an interrupted pass can simply be re-run.
+    save_dir_name, opt_name, completed, compressed, cleaned, binary = task
+    dir_path = os.path.join(INFO_DIR, save_dir_name)
+    n_evals = None
+    if not completed:
+        lock_file = os.path.join(dir_path, "complete.lock")
+        if os.path.exists(lock_file):
+            n_evals = N_EVALS_DICT[opt_name]
+        else:
+            try:
+                n_evals = count_evals(dir_path)
+            except ValueError:  # results.json was truncated by a killed job
+                n_evals = 0
+
+            if n_evals < N_EVALS_DICT[opt_name]:
+                shutil.rmtree(dir_path)
+                return save_dir_name, opt_name, n_evals, True
+
+            with open(lock_file, mode="w"):
+                pass
+
+    if not compressed and not os.path.exists(os.path.join(dir_path, COMPRESS_LOCK)):
+        compress_dir(dir_path, binary=binary)
+    if not os.path.exists(os.path.join(dir_path, SUMMARY_FN)):
+        write_summary(dir_path)
+    if not cleaned:
+        cleanup_dir(dir_path)
+
+    return save_dir_name, opt_name, n_evals, False
+
+
+def _iterate_tasks(
+    flags: dict[str, tuple[bool, bool, bool]], skip_count: dict[str, int], binary: bool
+) -> Iterator[tuple[str, str, bool, bool, bool, bool]]:
+    # The pool consumes this generator in a separate thread, so the walk overlaps with the processing.
+    for dir_path, _ in walk_run_dirs(INFO_DIR):
+        save_dir_name = os.path.relpath(dir_path, INFO_DIR)
+        opt_name = save_dir_name.split("/")[0]
+        completed, compressed, cleaned = flags.get(save_dir_name, (False, False, False))
+        if completed and compressed and cleaned:
+            skip_count[opt_name] += 1
+            continue
+
+        yield save_dir_name, opt_name, completed, compressed, cleaned, binary
+
+
+def _flush(index: CompletionIndex, outcomes: list[tuple[str, str, int | None, bool]]) -> None:
+    # Only the main process writes to the index, so the workers never contend for the lock.
+    with index.transaction():
+        for save_dir_name, opt_name, n_evals, removed in outcomes:
+            if removed:
+                index.remove(save_dir_name)
+                continue
+            if n_evals is not None:
+                index.record(save_dir_name, opt_name=opt_name, n_evals=n_evals, completed=True)
+
+            index.mark(save_dir_name, "compressed")
+            index.mark(save_dir_name, "cleaned")
+
+    outcomes.clear()
+
+
+def posthoc(n_workers: int, binary: bool = False, chunksize: int = 64, flush_interval: int = 1000) -> None:
+    index = CompletionIndex()
+    complete_count = {opt_name: 0 for opt_name in N_EVALS_DICT}
+    skip_count = {opt_name: 0 for opt_name in N_EVALS_DICT}
+    n_removed, outcomes = 0, []
+    start = time.time()
+    with Pool(processes=n_workers) as pool:
+        tasks = _iterate_tasks(index.flags(), skip_count, binary=binary)
+        for count, outcome in enumerate(pool.imap_unordered(_process_dir, tasks, chunksize=chunksize), start=1):
+            outcomes.append(outcome)
+            if outcome[-1]:
+                n_removed += 1
+            else:
+                complete_count[outcome[1]] += 1
+
+            if count % flush_interval == 0:
+                _flush(index, outcomes)
+                elapsed = time.time() - start
+                print(f"Processed {count} directories in {elapsed:.0f} seconds ({count / elapsed:.1f} dirs/sec)")
+
+    _flush(index, outcomes)
+    complete_count = {opt_name: n + skip_count[opt_name] for opt_name, n in complete_count.items()}
+    elapsed = time.time() - start
+    print(f"Skipped {sum(skip_count.values())} processed runs and removed {n_removed} runs in {elapsed:.0f} seconds")
+    print(complete_count)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--n_workers", type=int, default=os.cpu_count())
+    parser.add_argument("--binary", action="store_true", help="Store the trajectories losslessly in trajectory.bin")
+    args = parser.parse_args()
+    posthoc(n_workers=args.n_workers, binary=args.binary)
@@ -1,21 +1,107 @@
 from __future__ import annotations
 
+from typing import Any
+
+import ConfigSpace as CS
+
+from benchmark_simulator import ObjectiveFuncWrapper
+
+import numpy as np
+
 import optuna
 
-from src.utils import get_bench_instance, get_save_dir_name, parse_args, run_optuna
+from src.batch_eval import PrefetchedObjectiveFunc
+from src.checkpoint import ReplayableOptimizer, load_checkpoint, simulate
+from src.optuna_utils import suggest_config
+from src.timing import PHASE_TIMER, EvalTimer
+from src.utils import ParsedArgs, get_bench_instance, get_save_dir_name, parse_args, record_completion
 
 
-if __name__ == "__main__":
-    args = parse_args()
+class RandomSearch(ReplayableOptimizer):
+    # The samples of Optuna's RandomSampler do not depend on the results, so every config can be drawn from it
+    # before the simulation. The trials are never told, as the sampler ignores the history.
+    def __init__(self, config_space: CS.ConfigurationSpace, n_samples: int, seed: int):
+        study = optuna.create_study(sampler=optuna.samplers.RandomSampler(seed=seed))
+        self._eval_configs = [suggest_config(study.ask(), config_space) for _ in range(n_samples)]
+        self._count = 0
+
+    @property
+    def eval_configs(self) -> list[dict[str, Any]]:
+        return self._eval_configs
+
+    def ask(self) -> tuple[dict[str, Any], None, None]:
+        eval_config = self._eval_configs[self._count]
+        self._count += 1
+        return eval_config, None, None
+
+    def tell(self, eval_config: dict[str, Any], results: dict[str, float], **kwargs) -> None:
+        pass
+
+    def replay(self, n_asks: int, observations: list[dict[str, Any]]) -> None:
+        self._count = n_asks
+
+
+def run_random(
+    obj_func: Any,
+    config_space: CS.ConfigurationSpace,
+    save_dir_name: str,
+    seed: int,
+    n_workers: int,
+    tmp_dir: str | None,
+    n_evals: int = 2000,
+    eval_times: bool = False,
+) -> None:
+    n_actual_evals_in_opt = n_evals + n_workers
+    # The simulator queries n_evals + n_workers - 1 configs with the seeds drawn from RandomState(seed) in this order.
+    n_samples = n_evals + n_workers - 1
+    with PHASE_TIMER.phase("optimizer"):
+        rng = np.random.RandomState(seed)
+        seeds = [rng.randint(1 << 30) for _ in range(n_samples)]
+        opt = RandomSearch(config_space=config_space, n_samples=n_samples, seed=seed)
+
+    with PHASE_TIMER.phase("prefetch"):
+        # Every config is evaluated even for a resumed run, so that the noise of the synthetic benchmarks,
+        # which is drawn in the query order, matches the one of the run before the checkpoint.
+        checkpoint = load_checkpoint(save_dir_name)
+        start = 0 if checkpoint is None else checkpoint.n_asks
+        prefetched_obj_func = PrefetchedObjectiveFunc(obj_func, opt.eval_configs, fidels=None, seeds=seeds, start=start)
+
+    with PHASE_TIMER.phase("optimizer"):
+        wrapper = ObjectiveFuncWrapper(
+            obj_func=prefetched_obj_func,
+            n_workers=n_workers,
+            save_dir_name=save_dir_name,
+            n_actual_evals_in_opt=n_actual_evals_in_opt,
+            n_evals=n_evals,
+            seed=seed,
+            ask_and_tell=True,
+            store_actual_cumtime=True,
+            tmp_dir=tmp_dir,
+        )
+        if eval_times:
+            # The timer patches the ask-and-tell manager of the wrapper.
+            EvalTimer(wrapper)
+
+    with PHASE_TIMER.phase("optimize"):
+        simulate(wrapper, opt=opt, save_dir_name=save_dir_name)
+
+    print(f"{prefetched_obj_func.n_fallbacks} queries were not prefetched")
+
+
+def run(args: ParsedArgs, bench: Any | None = None) -> None:
     save_dir_name = get_save_dir_name(opt_name="random", args=args)
-    bench = get_bench_instance(args, use_fidel=False)
-    run_optuna(
+    bench = get_bench_instance(args, use_fidel=False) if bench is None else bench
+    run_random(
         obj_func=bench,
         config_space=bench.config_space,
         n_workers=args.n_workers,
         save_dir_name=save_dir_name,
         seed=args.seed,
-        sampler=optuna.samplers.RandomSampler(),
         tmp_dir=args.tmp_dir,
-        n_evals=2000,
+        eval_times=args.eval_times,
     )
+    record_completion(save_dir_name, opt_name="random", tmp_dir=args.tmp_dir)
+
+
+if __name__ == "__main__":
+    run(parse_args())
@@ -1,4 +1,5 @@
 from src.utils import remove_failed_files
 
 
-remove_failed_files()
+if __name__ == "__main__":
+    remove_failed_files()
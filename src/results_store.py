@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import os
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import numpy as np
+
+from src.info_tree import INFO_DIR, RunKey, parse_save_dir_name, walk_run_dirs
+from src.trajectory_io import load_target, result_file_path
+
+
+STORE_PATH = "mfhpo-simulator-results.npz"
+TRAJECTORY_KEYS = ["cumtime", "actual_cumtime", "loss"]
+KEY_COLUMNS = ["opt_name", "bench_name", "dataset_name", "n_workers", "seed"]
+
+
+def load_run(dir_path: str) -> dict[str, np.ndarray]:
+    data = load_target(dir_path, "results", keys=TRAJECTORY_KEYS, as_array=True)
+    n_evals = len(data.get("cumtime", []))
+    return {
+        k: np.asarray(data[k], dtype=np.float64) if k in data else np.full(n_evals, np.nan)
+        for k in TRAJECTORY_KEYS
+    }
+
+
+def _load_entry(dir_path: str, prefix: str) -> tuple[RunKey, int, dict[str, np.ndarray]]:
+    key = parse_save_dir_name(os.path.relpath(dir_path, prefix))
+    mtime_ns = os.stat(result_file_path(dir_path)).st_mtime_ns
+    return key, mtime_ns, load_run(dir_path)
+
+
+def _pack(entries: list[tuple[RunKey, int, dict[str, np.ndarray]]]) -> dict[str, np.ndarray]:
+    entries = sorted(entries, key=lambda e: (e[0].opt_name, e[0].save_dir_name))
+    sizes = [e[2]["cumtime"].size for e in entries]
+    columns = {
+        "opt_name": np.array([e[0].opt_name for e in entries], dtype=str),
+        "bench_name": np.array([e[0].bench_name for e in entries], dtype=str),
+        "dataset_name": np.array(["" if e[0].dataset_name is None else e[0].dataset_name for e in entries], dtype=str),
+        "n_workers": np.array([e[0].n_workers for e in entries], dtype=np.int32),
+        "seed": np.array([e[0].seed for e in entries], dtype=np.int32),
+        "mtime_ns": np.array([e[1] for e in entries], dtype=np.int64),
+        "offsets": np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64),
+    }
+    for k in TRAJECTORY_KEYS:
+        columns[k] = np.concatenate([e[2][k] for e in entries]) if len(entries) else np.empty(0)
+
+    return columns
+
+
+class ResultsStore:
+    def __init__(self, columns: dict[str, np.ndarray]):
+        self._columns = columns
+        self._index: dict[RunKey, int] = {}
+        for i, key_vals in enumerate(zip(*[columns[k].tolist() for k in KEY_COLUMNS])):
+            opt_name, bench_name, dataset_name, n_workers, seed = key_vals
+            key = RunKey(opt_name, bench_name, dataset_name if dataset_name != "" else None, n_workers, seed)
+            self._index[key] = i
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: RunKey) -> bool:
+        return key in self._index
+
+    def keys(self) -> list[RunKey]:
+        return list(self._index.keys())
+
+    def get(self, key: RunKey) -> dict[str, np.ndarray]:
+        if key not in self._index:
+            # Fall back to the original file so that a stale store does not break any analysis.
+            return load_run(os.path.join(INFO_DIR, key.save_dir_name))
+
+        i = self._index[key]
+        start, end = self._columns["offsets"][i], self._columns["offsets"][i + 1]
+        return {k: self._columns[k][start:end] for k in TRAJECTORY_KEYS}
+
+    def get_from_path(self, path: str) -> dict[str, np.ndarray]:
+        return self.get(parse_save_dir_name(path))
+
+    def mtime_ns(self, key: RunKey) -> int:
+        return int(self._columns["mtime_ns"][self._index[key]])
+
+    def save(self, path: str = STORE_PATH) -> None:
+        # Write to a temporary file first so that readers never see a half-written store.
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, **self._columns)
+        os.replace(tmp_path, path)
+
+
+def collect_results(
+    prefix: str = INFO_DIR, old_store: ResultsStore | None = None, n_threads: int = 16
+) -> ResultsStore:
+    entries: list[tuple[RunKey, int, dict[str, np.ndarray]]] = []
+    targets: list[str] = []
+    for count, (dir_path, _) in enumerate(walk_run_dirs(prefix), start=1):
+        if count % 3000 == 0:
+            print(f"Checked {count} directories")
+
+        key = parse_save_dir_name(os.path.relpath(dir_path, prefix))
+        if old_store is not None and key in old_store:
+            mtime_ns = os.stat(result_file_path(dir_path)).st_mtime_ns
+            if old_store.mtime_ns(key) == mtime_ns:
+                entries.append((key, mtime_ns, old_store.get(key)))
+                continue
+
+        targets.append(dir_path)
+
+    print(f"Load {len(targets)} new or updated results and reuse {len(entries)} stored results")
+    # Most of the time is spent on waiting for the shared filesystem, so threads are sufficient.
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        entries.extend(executor.map(lambda d: _load_entry(d, prefix), targets))
+
+    return ResultsStore(_pack(entries))
+
+
+def load_results_store(path: str = STORE_PATH, prefix: str = INFO_DIR) -> ResultsStore:
+    if not os.path.exists(path):
+        print(f"{path} does not exist, so collect the results from {prefix} directly")
+        return collect_results(prefix=prefix)
+
+    with np.load(path) as data:
+        columns: dict[str, Any] = {k: data[k] for k in data.files}
+
+    return ResultsStore(columns)
+
+
+def ingest(path: str = STORE_PATH, prefix: str = INFO_DIR, update: bool = True) -> None:
+    old_store = load_results_store(path) if update and os.path.exists(path) else None
+    store = collect_results(prefix=prefix, old_store=old_store)
+    store.save(path)
+    print(f"Saved {len(store)} results to {path}")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--path", type=str, default=STORE_PATH)
+    parser.add_argument("--prefix", type=str, default=INFO_DIR)
+    parser.add_argument("--rebuild", action="store_true", help="Ignore the existing store and read every file")
+    args = parser.parse_args()
+    ingest(path=args.path, prefix=args.prefix, update=not args.rebuild)
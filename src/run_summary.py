@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import os
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import numpy as np
+
+from src.info_tree import INFO_DIR, RunKey, parse_save_dir_name, walk_run_dirs
+from src.results_store import load_run
+
+import ujson as json
+
+
+SUMMARY_FN = "summary.json"
+
+
+def summarize(dir_path: str) -> dict[str, Any]:
+    data = load_run(dir_path)
+    n_evals = data["cumtime"].size
+    losses = data["loss"][~np.isnan(data["loss"])]
+    return dict(
+        cumtime=float(data["cumtime"][-1]) if n_evals else float("nan"),
+        actual_cumtime=float(data["actual_cumtime"][-1]) if n_evals else float("nan"),
+        best_loss=float(losses.min()) if losses.size else float("nan"),
+        n_evals=n_evals,
+        status="completed" if os.path.exists(os.path.join(dir_path, "complete.lock")) else "incomplete",
+    )
+
+
+def write_summary(dir_path: str) -> dict[str, Any]:
+    summary = summarize(dir_path)
+    path = os.path.join(dir_path, SUMMARY_FN)
+    with open(f"{path}.tmp", mode="w") as f:
+        json.dump(summary, f)
+
+    os.replace(f"{path}.tmp", path)
+    return summary
+
+
+def load_summary(dir_path: str, file_names: list[str] | None = None) -> dict[str, Any]:
+    # Fall back to the trajectory for the runs finished before the summaries were introduced.
+    path = os.path.join(dir_path, SUMMARY_FN)
+    if not (os.path.exists(path) if file_names is None else SUMMARY_FN in file_names):
+        return summarize(dir_path)
+
+    with open(path, mode="r") as f:
+        return json.load(f)
+
+
+def collect_summaries(prefix: str = INFO_DIR, n_threads: int = 16) -> dict[RunKey, dict[str, Any]]:
+    targets = list(walk_run_dirs(prefix))
+    n_missing = sum(SUMMARY_FN not in file_names for _, file_names in targets)
+    print(f"Load {len(targets)} summaries, {n_missing} of which are computed from the trajectories")
+    # Most of the time is spent on waiting for the shared filesystem, so threads are sufficient.
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        summaries = executor.map(lambda target: load_summary(*target), targets)
+        return {
+            parse_save_dir_name(os.path.relpath(dir_path, prefix)): summary
+            for (dir_path, _), summary in zip(targets, summaries)
+        }
+
+
+def backfill(prefix: str = INFO_DIR, n_threads: int = 16) -> None:
+    targets = [dir_path for dir_path, file_names in walk_run_dirs(prefix) if SUMMARY_FN not in file_names]
+    print(f"Write {SUMMARY_FN} to {len(targets)} directories")
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        for count, _ in enumerate(executor.map(write_summary, targets), start=1):
+            if count % 1000 == 0:
+                print(f"Wrote {count} summaries")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--prefix", type=str, default=INFO_DIR)
+    args = parser.parse_args()
+    backfill(prefix=args.prefix)
@@ -0,0 +1,383 @@
+from __future__ import annotations
+
+import math
+import os
+import shlex
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from argparse import ArgumentParser
+from dataclasses import dataclass
+
+from src.checkpoint import checkpoint_path
+from src.completion_index import CompletionIndex
+from src.cost_model import COST_MODEL_PATH, Cost, CostModel
+from src.info_tree import INFO_DIR, parse_save_dir_name
+from src.utils import (
+    BENCH_CHOICES,
+    N_EVALS_DICT,
+    RESUMABLE_OPT_NAMES,
+    UNSUPPORTED_BENCHES,
+    ParsedArgs,
+    get_bench_cls,
+    get_job_tmp_dir,
+    init_job_tmp_dir,
+    is_completed,
+    make_save_dir_name,
+    move_results,
+)
+
+import ujson as json
+
+
+SEEDS = list(range(30))
+N_WORKERS_CHOICES = [1, 2, 4, 8]
+LEASE_DIR = "mfhpo-simulator-leases/"
+
+
+@dataclass(frozen=True)
+class Job:
+    opt_name: str
+    bench_name: str
+    dataset_id: int
+    dim: int
+    n_workers: int
+    seed: int
+
+    @property
+    def args(self) -> ParsedArgs:
+        return ParsedArgs(
+            seed=self.seed,
+            dataset_id=self.dataset_id,
+            dim=self.dim,
+            bench_name=self.bench_name,
+            n_workers=self.n_workers,
+            tmp_dir=None,
+            bench_server=None,
+        )
+
+    @property
+    def save_dir_name(self) -> str:
+        return make_save_dir_name(opt_name=self.opt_name, args=self.args)
+
+    @property
+    def n_cores(self) -> int:
+        return self.n_workers
+
+
+def enumerate_grid(
+    opt_names: list[str], bench_names: list[str], seeds: list[int], n_workers_choices: list[int]
+) -> list[Job]:
+    variants: list[tuple[str, int, int]] = []
+    for bench_name in bench_names:
+        bench_cls = get_bench_cls(bench_name)
+        if bench_cls._BENCH_TYPE == "HPO":
+            variants.extend((bench_name, dataset_id, 3) for dataset_id in range(len(bench_cls._CONSTS.dataset_names)))
+        elif bench_name == "hartmann":
+            variants.extend([(bench_name, 0, 3), (bench_name, 0, 6)])
+        else:
+            variants.append((bench_name, 0, 3))
+
+    # The same order as scripts/submit.sh so that the earlier seeds finish first.
+    jobs = []
+    for seed in seeds:
+        for n_workers in n_workers_choices:
+            for opt_name in opt_names:
+                for bench_name, dataset_id, dim in variants:
+                    if bench_name in UNSUPPORTED_BENCHES.get(opt_name, []):
+                        continue
+                    jobs.append(Job(opt_name, bench_name, dataset_id, dim, n_workers, seed))
+
+    return jobs
+
+
+class Lease:
+    # A lease is a file created with O_EXCL in a directory shared by all the machines.
+    # The owner touches it every heartbeat, so a lease of a killed scheduler becomes stale and can be taken over.
+    def __init__(self, lease_dir: str, job: Job, timeout: float):
+        self._path = os.path.join(lease_dir, f"{job.save_dir_name.replace('/', '_')}.lease")
+        self._timeout = timeout
+
+    def _is_stale(self, path: str) -> bool:
+        try:
+            return time.time() - os.path.getmtime(path) > self._timeout
+        except FileNotFoundError:
+            return False
+
+    def _take_over(self) -> bool:
+        # Only one scheduler can rename the stale lease, and it puts the lease back if it was renewed meanwhile.
+        tombstone = f"{self._path}.{socket.gethostname()}-{os.getpid()}"
+        try:
+            os.rename(self._path, tombstone)
+        except FileNotFoundError:
+            return False
+
+        if not self._is_stale(tombstone):
+            try:
+                os.link(tombstone, self._path)
+            except FileExistsError:
+                pass
+            os.remove(tombstone)
+            return False
+
+        os.remove(tombstone)
+        return True
+
+    def acquire(self) -> bool:
+        for _ in range(2):
+            try:
+                fd = os.open(self._path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if self._is_stale(self._path) and self._take_over():
+                    continue
+                return False
+
+            with os.fdopen(fd, mode="w") as f:
+                json.dump(dict(host=socket.gethostname(), pid=os.getpid(), start=time.time()), f)
+            return True
+
+        return False
+
+    def renew(self) -> None:
+        try:
+            os.utime(self._path)
+        except FileNotFoundError:
+            pass
+
+    def release(self) -> None:
+        try:
+            os.remove(self._path)
+        except FileNotFoundError:
+            pass
+
+
+class Scheduler:
+    def __init__(
+        self,
+        jobs: list[Job],
+        n_cores: int,
+        memory_gb: float,
+        lease_dir: str,
+        log_dir: str,
+        tmp_dir: str | None,
+        exec_prefix: list[str],
+        smac_exec_prefix: list[str],
+        cost_model: CostModel,
+        lease_timeout: float = 600.0,
+        heartbeat: float = 60.0,
+        poll_interval: float = 5.0,
+    ):
+        self._costs = {job: _predict(cost_model, job) for job in jobs}
+        # Longest first, so that the long jobs do not start at the end and leave the other cores idle.
+        # The jobs without any measurement come first as they may be the longest.
+        walltimes = {job: math.inf if cost.walltime is None else cost.walltime for job, cost in self._costs.items()}
+        self._pending = sorted(jobs, key=lambda job: walltimes[job], reverse=True)
+        self._n_cores = n_cores
+        self._memory_gb = memory_gb
+        self._lease_dir = lease_dir
+        self._log_dir = log_dir
+        self._tmp_dir = tmp_dir
+        self._exec_prefix = exec_prefix
+        self._smac_exec_prefix = smac_exec_prefix
+        self._lease_timeout = lease_timeout
+        self._heartbeat = heartbeat
+        self._poll_interval = poll_interval
+        self._running: dict[subprocess.Popen, tuple[Job, Lease, float]] = {}
+        self._retry_at: dict[Job, float] = {}
+        self._index = CompletionIndex()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._n_finished = 0
+        self._n_failed = 0
+        os.makedirs(lease_dir, exist_ok=True)
+        os.makedirs(log_dir, exist_ok=True)
+
+    def _command(self, job: Job) -> list[str]:
+        opts = ["--seed", job.seed, "--bench_name", job.bench_name, "--dataset_id", job.dataset_id, "--dim", job.dim]
+        tmp_dir = "" if self._tmp_dir is None else get_job_tmp_dir(self._tmp_dir, job.save_dir_name)
+        opts += ["--n_workers", job.n_workers, "--tmp_dir", tmp_dir]
+        prefix = self._smac_exec_prefix if job.opt_name == "smac" else self._exec_prefix
+        python = ["python"] if len(prefix) > 0 else [sys.executable]
+        return prefix + python + ["-m", "src.driver", "--opt_names", job.opt_name] + list(map(str, opts))
+
+    def _run_dirs(self, job: Job) -> list[str]:
+        run_dirs = [os.path.join(INFO_DIR, job.save_dir_name)]
+        if self._tmp_dir is not None:
+            job_tmp_dir = get_job_tmp_dir(self._tmp_dir, job.save_dir_name)
+            run_dirs.append(os.path.join(job_tmp_dir, INFO_DIR, job.save_dir_name))
+        return run_dirs
+
+    def _start(self, job: Job, lease: Lease) -> None:
+        # The lease guarantees that nobody else is running this job, so a leftover is from a killed run.
+        resumable = job.opt_name in RESUMABLE_OPT_NAMES and os.path.exists(checkpoint_path(job.save_dir_name))
+        for run_dir in self._run_dirs(job)[int(resumable):]:
+            if os.path.exists(run_dir):
+                shutil.rmtree(run_dir)
+                self._index.remove(job.save_dir_name)
+
+        if self._tmp_dir is not None:
+            # The logs of SMAC, DEHB and hpbandster in tmp_dir are never resumed from.
+            shutil.rmtree(get_job_tmp_dir(self._tmp_dir, job.save_dir_name), ignore_errors=True)
+            init_job_tmp_dir(self._tmp_dir, job.save_dir_name)
+
+        log_path = os.path.join(self._log_dir, f"{job.save_dir_name.replace('/', '_')}.log")
+        with open(log_path, mode="w") as log:
+            proc = subprocess.Popen(self._command(job), stdout=log, stderr=subprocess.STDOUT)
+        with self._lock:
+            self._running[proc] = (job, lease, time.time())
+
+    def _finish(self, proc: subprocess.Popen) -> None:
+        with self._lock:
+            job, lease, start = self._running.pop(proc)
+
+        if self._tmp_dir is not None:
+            # Move the results from the node-local tmp_dir of the job to the shared directory.
+            job_tmp_dir = get_job_tmp_dir(self._tmp_dir, job.save_dir_name)
+            move_results(job_tmp_dir, None, job.save_dir_name)
+            shutil.rmtree(job_tmp_dir, ignore_errors=True)
+
+            # The run is recorded in the index only now that its results are in the shared directory.
+            is_completed(job.save_dir_name, opt_name=job.opt_name, index=self._index)
+
+        lease.release()
+        self._n_finished += 1
+        if proc.returncode != 0:
+            self._n_failed += 1
+            print(f"Failed {job.save_dir_name} with the exit code {proc.returncode}")
+        elif self._n_finished % 100 == 0:
+            print(f"Finished {self._n_finished} jobs ({self._n_failed} failed), {len(self._pending)} jobs pending")
+
+        print(f"Finished {job.save_dir_name} in {time.time() - start:.0f} seconds")
+
+    def _free_resources(self) -> tuple[int, float]:
+        jobs = [job for job, _, _ in self._running.values()]
+        free_memory = self._memory_gb - sum(self._costs[job].memory_gb for job in jobs)
+        return self._n_cores - sum(job.n_cores for job in jobs), free_memory
+
+    def _schedule(self) -> None:
+        # First fit: start every pending job that fits into the free cores and memory, in the given order.
+        free_cores, free_memory = self._free_resources()
+        remaining = []
+        now = time.time()
+        for job in self._pending:
+            memory_gb = self._costs[job].memory_gb
+            if job.n_cores > free_cores or memory_gb > free_memory or self._retry_at.get(job, 0.0) > now:
+                remaining.append(job)
+                continue
+
+            if is_completed(job.save_dir_name, opt_name=job.opt_name, index=self._index):  # Another machine did it.
+                continue
+
+            lease = Lease(self._lease_dir, job, timeout=self._lease_timeout)
+            if not lease.acquire():
+                # Another machine runs it. Check again later whether it has finished or its lease has expired.
+                self._retry_at[job] = now + self._heartbeat
+                remaining.append(job)
+                continue
+
+            if is_completed(job.save_dir_name, opt_name=job.opt_name, index=self._index):
+                # It finished between the check above and the lease.
+                lease.release()
+                continue
+
+            self._start(job, lease)
+            free_cores -= job.n_cores
+            free_memory -= memory_gb
+
+        self._pending = remaining
+
+    def _renew_leases(self) -> None:
+        while not self._stopped.wait(self._heartbeat):
+            with self._lock:
+                leases = [lease for _, lease, _ in self._running.values()]
+            for lease in leases:
+                lease.renew()
+
+    def stop(self, *_) -> None:
+        # Kill the running jobs and give back their leases so that another scheduler can pick them up at once.
+        self._stopped.set()
+        with self._lock:
+            running = list(self._running.items())
+        for proc, (_, lease, _) in running:
+            proc.terminate()
+            proc.wait()
+            lease.release()
+        sys.exit("Stopped the scheduler")
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.stop)
+        threading.Thread(target=self._renew_leases, daemon=True).start()
+        print(f"Schedule {len(self._pending)} jobs on {self._n_cores} cores and {self._memory_gb:.0f} GB")
+        try:
+            while len(self._pending) > 0 or len(self._running) > 0:
+                for proc in [proc for proc in list(self._running) if proc.poll() is not None]:
+                    self._finish(proc)
+
+                self._schedule()
+                if len(self._running) == 0 and len(self._pending) > 0:
+                    # Every pending job is leased by another machine or does not fit into this machine.
+                    too_large = [
+                        job.n_cores > self._n_cores or self._costs[job].memory_gb > self._memory_gb
+                        for job in self._pending
+                    ]
+                    if all(too_large):
+                        print(f"{len(self._pending)} jobs do not fit into this machine")
+                        break
+
+                time.sleep(self._poll_interval)
+        except KeyboardInterrupt:
+            self.stop()
+
+        self._stopped.set()
+        print(f"Finished {self._n_finished} jobs ({self._n_failed} failed)")
+
+
+def _predict(cost_model: CostModel, job: Job) -> Cost:
+    bench_name = parse_save_dir_name(job.save_dir_name).bench_name
+    return cost_model.predict(job.opt_name, bench_name, job.n_workers)
+
+
+def _total_memory_gb() -> float:
+    with open("/proc/meminfo", mode="r") as f:
+        mem_kb = next(int(line.split()[1]) for line in f if line.startswith("MemTotal"))
+    return mem_kb / 1024**2
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--opt_names", type=str, nargs="+", default=list(N_EVALS_DICT.keys()))
+    parser.add_argument("--bench_names", type=str, nargs="+", default=list(BENCH_CHOICES.keys()))
+    parser.add_argument("--seeds", type=int, nargs="+", default=SEEDS)
+    parser.add_argument("--n_workers", type=int, nargs="+", default=N_WORKERS_CHOICES)
+    parser.add_argument("--n_cores", type=int, default=os.cpu_count())
+    parser.add_argument("--memory_gb", type=float, default=None, help="The total memory by default")
+    parser.add_argument("--lease_dir", type=str, default=LEASE_DIR, help="Must be shared by all the machines")
+    parser.add_argument("--log_dir", type=str, default="logs/scheduler")
+    parser.add_argument("--tmp_dir", type=str, default=None)
+    parser.add_argument("--exec_prefix", type=str, default="", help="e.g. singularity exec mfhpo-simulator.sif")
+    parser.add_argument("--smac_exec_prefix", type=str, default=None, help="--exec_prefix by default")
+    parser.add_argument("--lease_timeout", type=float, default=600.0)
+    parser.add_argument("--cost_model", type=str, default=COST_MODEL_PATH, help="Fitted by src.cost_model")
+    args = parser.parse_args()
+
+    jobs = enumerate_grid(args.opt_names, args.bench_names, args.seeds, args.n_workers)
+    index = CompletionIndex()
+    # is_completed checks that the results of the recorded runs still exist, which the index alone cannot tell.
+    jobs = [job for job in jobs if not is_completed(job.save_dir_name, opt_name=job.opt_name, index=index)]
+    smac_exec_prefix = args.exec_prefix if args.smac_exec_prefix is None else args.smac_exec_prefix
+    Scheduler(
+        jobs=jobs,
+        n_cores=args.n_cores,
+        memory_gb=_total_memory_gb() if args.memory_gb is None else args.memory_gb,
+        lease_dir=args.lease_dir,
+        log_dir=args.log_dir,
+        tmp_dir=args.tmp_dir,
+        exec_prefix=shlex.split(args.exec_prefix),
+        smac_exec_prefix=shlex.split(smac_exec_prefix),
+        cost_model=CostModel.load(args.cost_model),
+        lease_timeout=args.lease_timeout,
+    ).run()
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import os
+import shutil
+from typing import Any
+
+from benchmark_apis import HPOBench, HPOLib, JAHSBench201, LCBench
+from benchmark_apis.hpo.hpobench import HPOBenchTabular
+from benchmark_apis.hpo.hpolib import HPOLibTabular
+from benchmark_apis.hpo.jahs import JAHSBenchSurrogate
+from benchmark_apis.hpo.lcbench import LCBenchSurrogate
+
+import numpy as np
+
+import ujson as json
+
+
+META_FN = "meta.json"
+
+
+def _publish_tabular(db: dict[str, dict[str, Any]], dir_path: str) -> None:
+    # Each metric becomes one (n_configs, n_seeds, n_epochs), (n_configs, n_seeds) or (n_configs, ) array.
+    config_ids = sorted(db.keys())
+    meta: dict[str, Any] = {"config_ids": config_ids, "metrics": {}}
+    for metric, vals in db[config_ids[0]].items():
+        if isinstance(vals, list) and isinstance(vals[0], dict):
+            epochs = sorted(vals[0].keys())
+            array = np.empty((len(config_ids), len(vals), len(epochs)), dtype=np.float64)
+            for i, config_id in enumerate(config_ids):
+                array[i] = [[row[e] for e in epochs] for row in db[config_id][metric]]
+            meta["metrics"][metric] = {"kind": "curve", "epochs": epochs}
+        elif isinstance(vals, list):
+            array = np.asarray([db[config_id][metric] for config_id in config_ids], dtype=np.float64)
+            meta["metrics"][metric] = {"kind": "seeds"}
+        else:
+            array = np.asarray([db[config_id][metric] for config_id in config_ids], dtype=np.float64)
+            meta["metrics"][metric] = {"kind": "scalar"}
+
+        np.save(os.path.join(dir_path, f"{metric}.npy"), array)
+
+    with open(os.path.join(dir_path, META_FN), mode="w") as f:
+        json.dump(meta, f)
+
+
+class _MemmapTabular:
+    # Only the directory path is pickled, and each process attaches to the read-only memmaps at the first lookup.
+    # Since the OS shares the pages of the memmaps, the tabular data exists only once in memory.
+    def __init__(self, dir_path: str):
+        self._dir_path = dir_path
+        self._meta: dict[str, Any] | None = None
+        self._index: dict[str, int] = {}
+        self._arrays: dict[str, np.ndarray] = {}
+
+    def __getstate__(self) -> dict[str, Any]:
+        return {"_dir_path": self._dir_path, "_meta": None, "_index": {}, "_arrays": {}}
+
+    def _attach(self) -> dict[str, Any]:
+        with open(os.path.join(self._dir_path, META_FN), mode="r") as f:
+            meta = json.load(f)
+
+        self._index = {config_id: i for i, config_id in enumerate(meta["config_ids"])}
+        self._arrays = {
+            metric: np.load(os.path.join(self._dir_path, f"{metric}.npy"), mmap_mode="r") for metric in meta["metrics"]
+        }
+        self._meta = meta
+        return meta
+
+    def __getitem__(self, key: str) -> dict[str, Any]:
+        meta = self._attach() if self._meta is None else self._meta
+        i = self._index[key]
+        row: dict[str, Any] = {}
+        for metric, info in meta["metrics"].items():
+            vals = self._arrays[metric][i].tolist()
+            if info["kind"] == "curve":
+                row[metric] = [dict(zip(info["epochs"], v)) for v in vals]
+            else:
+                row[metric] = vals
+
+        return row
+
+    def config_indices(self, config_ids: list[str]) -> np.ndarray:
+        if self._meta is None:
+            self._attach()
+        return np.asarray([self._index[config_id] for config_id in config_ids], dtype=np.int64)
+
+    def table(self, metric: str) -> np.ndarray:
+        if self._meta is None:
+            self._attach()
+        return self._arrays[metric]
+
+    def epochs(self, metric: str) -> np.ndarray:
+        meta = self._attach() if self._meta is None else self._meta
+        return np.asarray(meta["metrics"][metric]["epochs"])
+
+
+class SharedHPOBenchTabular(_MemmapTabular, HPOBenchTabular):
+    pass
+
+
+class SharedHPOLibTabular(_MemmapTabular, HPOLibTabular):
+    pass
+
+
+class _LazySurrogate:
+    # Surrogates cannot be memory-mapped, so each process builds the surrogate once at the first call
+    # instead of once per call as load_every_call=True does. Only the benchmark instance is pickled.
+    def __init__(self, bench: LCBench | JAHSBench201):
+        self._bench = bench
+        self._surrogate: Any = None
+
+    def __getstate__(self) -> dict[str, Any]:
+        return {"_bench": self._bench, "_surrogate": None}
+
+    def get(self) -> LCBenchSurrogate | JAHSBenchSurrogate:
+        if self._surrogate is None:
+            self._surrogate = self._bench.get_benchdata()
+
+        return self._surrogate
+
+    def __call__(self, eval_config: dict[str, Any], fidels: dict[str, int | float]) -> dict[str, float]:
+        return self.get()(eval_config=eval_config, fidels=fidels)
+
+
+class SharedLCBenchSurrogate(_LazySurrogate, LCBenchSurrogate):
+    pass
+
+
+class SharedJAHSBenchSurrogate(_LazySurrogate, JAHSBenchSurrogate):
+    pass
+
+
+def get_shared_benchdata(bench: HPOBench | HPOLib | LCBench | JAHSBench201) -> Any:
+    if isinstance(bench, LCBench):
+        return SharedLCBenchSurrogate(bench)
+    if isinstance(bench, JAHSBench201):
+        return SharedJAHSBenchSurrogate(bench)
+
+    bench_name = "hpobench" if isinstance(bench, HPOBench) else "hpolib"
+    dir_path = os.path.join(bench.dir_name, "memmap", f"{bench_name}-{bench.dataset_name_for_dir}")
+    if not os.path.exists(os.path.join(dir_path, META_FN)):
+        # Publish in a private directory first so that concurrent jobs never attach to half-written arrays.
+        tmp_dir_path = f"{dir_path}.{os.getpid()}"
+        os.makedirs(tmp_dir_path, exist_ok=True)
+        benchdata = bench.get_benchdata() if bench._benchdata is None else bench._benchdata
+        _publish_tabular(benchdata._db, tmp_dir_path)
+        try:
+            os.rename(tmp_dir_path, dir_path)
+        except OSError:  # Another job has published the same data in the meantime.
+            shutil.rmtree(tmp_dir_path)
+
+    shared_cls = SharedHPOBenchTabular if isinstance(bench, HPOBench) else SharedHPOLibTabular
+    return shared_cls(dir_path)
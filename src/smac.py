@@ -1,19 +1,23 @@
 from __future__ import annotations
 
 import sys
+from typing import Any
 
-from src.utils import get_bench_instance, get_save_dir_name, parse_args, run_smac
+from src.smac_utils import run_smac
+from src.utils import (
+    UNSUPPORTED_BENCHES,
+    ParsedArgs,
+    get_bench_instance,
+    get_save_dir_name,
+    parse_args,
+    record_completion,
+)
 
 
-if __name__ == "__main__":
-    args = parse_args()
+def run(args: ParsedArgs, bench: Any | None = None) -> None:
     sampler = "smac"
-    if args.bench_name in ["lc", "jahs"]:
-        sys.exit(f"SMAC3 cannot handle {args.bench_name} due to the dependency in ConfigSpace")
-
     save_dir_name = get_save_dir_name(opt_name=sampler, args=args)
-    load_every_call = True
-    bench = get_bench_instance(args, keep_benchdata=False, load_every_call=load_every_call)
+    bench = get_bench_instance(args, share_benchdata=True) if bench is None else bench
     fidel_key = "epoch" if "epoch" in bench.fidel_keys else "z0"
     run_smac(
         obj_func=bench,
@@ -24,7 +28,16 @@ if __name__ == "__main__":
         n_workers=args.n_workers,
         save_dir_name=save_dir_name,
         sampler=sampler,
-        load_every_call=load_every_call,
         seed=args.seed,
         tmp_dir=args.tmp_dir,
+        eval_times=args.eval_times,
     )
+    record_completion(save_dir_name, opt_name=sampler, tmp_dir=args.tmp_dir)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.bench_name in UNSUPPORTED_BENCHES["smac"]:
+        sys.exit(f"SMAC3 cannot handle {args.bench_name} due to the dependency in ConfigSpace")
+
+    run(args)
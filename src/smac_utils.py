@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Any, Literal
+
+from benchmark_simulator import ObjectiveFuncWrapper
+
+import ConfigSpace as CS
+
+from smac import HyperbandFacade as HBFacade
+from smac import MultiFidelityFacade as MFFacade
+from smac import Scenario
+from smac.intensifier.hyperband import Hyperband
+from smac.main.config_selector import ConfigSelector
+
+from src.timing import PHASE_TIMER, EvalTimer, timed_call
+
+
+class SMACObjectiveFuncWrapper(ObjectiveFuncWrapper):
+    eval_timer: EvalTimer | None = None
+
+    def __call__(
+        self,
+        config: CS.Configuration,
+        budget: int,
+        seed: int | None = None,
+        data_to_scatter: dict[str, Any] | None = None,
+    ) -> float:
+        data_to_scatter = {} if data_to_scatter is None else data_to_scatter
+        eval_config = dict(config)
+        with timed_call(self.eval_timer):
+            output = super().__call__(eval_config, fidels={self.fidel_keys[0]: int(budget)}, **data_to_scatter)
+        return output[self.obj_keys[0]]
+
+
+def run_smac(
+    obj_func: Any,
+    config_space: CS.ConfigurationSpace,
+    save_dir_name: str,
+    min_fidel: int,
+    max_fidel: int,
+    fidel_key: list[str],
+    seed: int,
+    n_workers: int,
+    sampler: Literal["smac", "hyperband"],
+    tmp_dir: str | None,
+    n_init_min: int = 5,
+    n_evals: int = 450,  # eta=3,S=2,100 full evals
+    eval_times: bool = False,
+) -> None:
+    n_actual_evals_in_opt = n_evals + n_workers
+    with PHASE_TIMER.phase("optimizer"):
+        scenario = Scenario(
+            config_space,
+            n_trials=n_actual_evals_in_opt,
+            min_budget=min_fidel,
+            max_budget=max_fidel,
+            n_workers=n_workers,
+            output_directory=Path(os.path.join("" if tmp_dir is None else tmp_dir, "logs/smac3")),
+        )
+        wrapper = SMACObjectiveFuncWrapper(
+            obj_func=obj_func,
+            n_workers=n_workers,
+            save_dir_name=save_dir_name,
+            n_actual_evals_in_opt=n_actual_evals_in_opt,
+            n_evals=n_evals,
+            seed=seed,
+            max_waiting_time=120.0,
+            store_actual_cumtime=True,
+            fidel_keys=[fidel_key],
+            continual_max_fidel=max_fidel,
+            tmp_dir=tmp_dir,
+        )
+        wrapper.eval_timer = EvalTimer(wrapper) if eval_times else None
+
+        Facade = HBFacade if sampler == "hyperband" else MFFacade
+
+        class _WrappedFacade(Facade):
+            @staticmethod
+            def get_config_selector(
+                scenario: Scenario,
+                *,
+                retrain_after: int = 8,
+                retries: int = 1000,  # To prevent the early stopping in SMAC
+            ) -> ConfigSelector:
+                return ConfigSelector(scenario, retrain_after=retrain_after, retries=retries)
+
+        smac = _WrappedFacade(
+            scenario,
+            wrapper.__call__,  # SMAC raises an error when using wrapper, so we use wrapper.__call__ instead.
+            initial_design=MFFacade.get_initial_design(scenario, n_configs=max(n_init_min, n_workers)),
+            intensifier=Hyperband(scenario, incumbent_selection="highest_budget"),
+            overwrite=True,
+        )
+
+    with PHASE_TIMER.phase("optimize"):
+        smac.optimize()
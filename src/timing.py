@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import os
+import resource
+import struct
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, ContextManager, Iterator
+
+import ujson as json
+
+
+PHASE_TIMES_FN = "phase_times.json"
+PHASES = ["import", "parse_args", "bench", "optimizer", "prefetch", "optimize", "teardown"]
+EVAL_TIMES_FN = "eval_times.bin"
+# The actual seconds of each call to a function-wrapper worker, which are appended as 4 float32 per call.
+EVAL_TIME_KEYS = ["sample", "query", "wait", "write"]
+EVAL_TIME_FORMAT = "<4f"
+# The private methods of the simulator worker timed for each key, which are stable within mfhpo-simulator 1.4.x.
+EVAL_TIME_METHODS = dict(
+    query=["_query_obj_func"],
+    wait=["_wait_until_next"],
+    write=["_record_cumtime", "_record_result", "_record_timestamp"],
+)
+# The ask-and-tell manager samples and queries in the main process without any wait or file write per call.
+ASK_AND_TELL_METHODS = dict(sample="_ask_with_timer", query="_proc_obj_func")
+# The time when each worker returned the last result, which is per process, i.e. per Dask or NePS worker.
+_LAST_RETURNS: dict[tuple[str, int], float] = {}
+
+
+def _process_start_time() -> float:
+    # The import phase starts when the interpreter starts, which is only available from /proc on Linux.
+    try:
+        with open("/proc/self/stat", mode="r") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/stat", mode="r") as f:
+            boot_time = next(int(line.split()[1]) for line in f if line.startswith("btime"))
+        return boot_time + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration):
+        return time.time()
+
+
+def _peak_rss_gb() -> tuple[float, float]:
+    # The peak memory of this process since the last _reset_peak_rss and the lifetime peak of its largest child,
+    # e.g. a Dask worker, in GB (VmHWM and ru_maxrss are in KB).
+    try:
+        with open("/proc/self/status", mode="r") as f:
+            max_rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+    except (OSError, ValueError, IndexError, StopIteration):
+        max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return max_rss_kb / 1024**2, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024**2
+
+
+def _reset_peak_rss() -> bool:
+    # Writing 5 to clear_refs resets VmHWM to the current memory on Linux.
+    try:
+        with open("/proc/self/clear_refs", mode="w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class PhaseTimer:
+    def __init__(self):
+        self._start = _process_start_time()
+        self._times: dict[str, float] = {}
+        self._import_recorded = False
+        # The peaks right after the last reset, which are None for the first run of this process.
+        self._peaks_at_reset: tuple[float, float] | None = None
+        self._peak_rss_reset = False
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.time()
+        if not self._import_recorded:
+            # Everything before the first phase, i.e. the interpreter startup and the imports.
+            self._times["import"] = max(0.0, start - self._start)
+            self._import_recorded = True
+
+        try:
+            yield
+        finally:
+            self._times[name] = self._times.get(name, 0.0) + time.time() - start
+
+    def as_dict(self) -> dict[str, float]:
+        total = time.time() - self._start
+        times = {name: self._times.get(name, 0.0) for name in PHASES}
+        max_rss_gb, max_child_rss_gb = _peak_rss_gb()
+        memory_reliable = True
+        if self._peaks_at_reset is not None:
+            # A lifetime peak that did not grow since the reset may belong to an earlier run in this process.
+            rss_gb_at_reset, child_rss_gb_at_reset = self._peaks_at_reset
+            memory_reliable = self._peak_rss_reset or max_rss_gb > rss_gb_at_reset
+            memory_reliable &= child_rss_gb_at_reset == 0.0 or max_child_rss_gb > child_rss_gb_at_reset
+        return {
+            **times,
+            "other": max(0.0, total - sum(times.values())),
+            "total": total,
+            "max_rss_gb": max_rss_gb,
+            "max_child_rss_gb": max_child_rss_gb,
+            "memory_reliable": memory_reliable,
+        }
+
+    def reset(self) -> None:
+        self._start = time.time()
+        self._times = {}
+        self._import_recorded = True
+        self._peak_rss_reset = _reset_peak_rss()
+        self._peaks_at_reset = _peak_rss_gb()
+
+    def save(self, dir_path: str) -> None:
+        with open(os.path.join(dir_path, PHASE_TIMES_FN), mode="w") as f:
+            json.dump(self.as_dict(), f, indent=4)
+
+        # The next run in the same process, e.g. by src.driver, starts to count from here.
+        self.reset()
+
+
+PHASE_TIMER = PhaseTimer()
+
+
+class _TimedMethod:
+    # Looks the method up on the class at each call so that the patched worker stays picklable, e.g. for Dask.
+    def __init__(self, timer: EvalTimer, key: str, worker: Any, name: str):
+        self._timer = timer
+        self._key = key
+        self._worker = worker
+        self._name = name
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        start = time.time()
+        try:
+            return getattr(type(self._worker), self._name)(self._worker, *args, **kwargs)
+        finally:
+            self._timer._add(self._key, time.time() - start, self._worker)
+
+
+class EvalTimer:
+    def __init__(self, wrapper: Any):
+        # wrapper is ObjectiveFuncWrapper, whose main wrapper is a single worker, a manager of workers
+        # or the ask-and-tell manager.
+        main_wrapper = wrapper._main_wrapper
+        self._path = os.path.join(wrapper.dir_name, EVAL_TIMES_FN)
+        self._local = threading.local()
+        self._ask_and_tell = hasattr(main_wrapper, ASK_AND_TELL_METHODS["sample"])
+        if self._ask_and_tell:
+            # The calls are timed by the patched methods alone, so the optimizers need no timed_call.
+            self._sample = float("nan")
+            for key, name in ASK_AND_TELL_METHODS.items():
+                setattr(main_wrapper, name, _TimedMethod(self, key, main_wrapper, name))
+            return
+
+        for worker in getattr(main_wrapper, "_workers", [main_wrapper]):
+            for key, names in EVAL_TIME_METHODS.items():
+                for name in names:
+                    setattr(worker, name, _TimedMethod(self, key, worker, name))
+
+    def __getstate__(self) -> dict[str, Any]:
+        return {"_path": self._path}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self._path = state["_path"]
+        self._local = threading.local()
+        self._ask_and_tell = False
+
+    def _add(self, key: str, duration: float, worker: Any) -> None:
+        if not self._ask_and_tell:
+            self._local.durations[key] += duration
+            self._local.worker_index = worker._worker_vars.worker_index
+        elif key == "sample":
+            # Unlike the function-wrapper workers, sample is the time of opt.ask itself.
+            self._sample = duration
+        else:
+            self._append(self._sample, duration, 0.0, 0.0)
+
+    def _append(self, *durations: float) -> None:
+        record = struct.pack(EVAL_TIME_FORMAT, *durations)
+        # A single append of a few bytes is atomic, so the threads and processes of a run share the file.
+        fd = os.open(self._path, os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+        try:
+            os.write(fd, record)
+        finally:
+            os.close(fd)
+
+    @contextmanager
+    def call(self) -> Iterator[None]:
+        start = time.time()
+        self._local.durations = dict.fromkeys(EVAL_TIME_KEYS[1:], 0.0)
+        self._local.worker_index = None
+        try:
+            yield
+        finally:
+            worker_index = self._local.worker_index
+            # The calls after the termination return without querying and are not evaluations.
+            if worker_index is not None:
+                # NaN for the first call of each worker as its sampling time includes the optimizer setup.
+                sample = start - _LAST_RETURNS.get((self._path, worker_index), float("nan"))
+                self._append(sample, *self._local.durations.values())
+                _LAST_RETURNS[(self._path, worker_index)] = time.time()
+
+
+def timed_call(timer: EvalTimer | None) -> ContextManager:
+    return nullcontext() if timer is None else timer.call()
@@ -1,14 +1,16 @@
 from __future__ import annotations
 
+from typing import Any
+
 import optuna
 
-from src.utils import get_bench_instance, get_save_dir_name, parse_args, run_optuna
+from src.optuna_utils import run_optuna
+from src.utils import ParsedArgs, get_bench_instance, get_save_dir_name, parse_args, record_completion
 
 
-if __name__ == "__main__":
-    args = parse_args()
+def run(args: ParsedArgs, bench: Any | None = None) -> None:
     save_dir_name = get_save_dir_name(opt_name="tpe", args=args)
-    bench = get_bench_instance(args, use_fidel=False)
+    bench = get_bench_instance(args, use_fidel=False) if bench is None else bench
     run_optuna(
         obj_func=bench,
         config_space=bench.config_space,
@@ -17,4 +19,10 @@ if __name__ == "__main__":
         seed=args.seed,
         sampler=optuna.samplers.TPESampler(),
         tmp_dir=args.tmp_dir,
+        eval_times=args.eval_times,
     )
+    record_completion(save_dir_name, opt_name="tpe", tmp_dir=args.tmp_dir)
+
+
+if __name__ == "__main__":
+    run(parse_args())
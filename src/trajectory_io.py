@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import os
+import zlib
+from typing import Any
+
+import numpy as np
+
+import ujson as json
+
+
+TRAJECTORY_FN = "trajectory.bin"
+TARGETS = ["results", "sampled_time"]
+# These columns are (almost) monotone, so the deltas of their bit patterns are small and compress well.
+DELTA_KEYS = ["cumtime", "actual_cumtime", "before_sample", "after_sample"]
+
+
+# trajectory.bin is a 4-byte header size, a json header and the zlib-compressed concatenation of all the columns.
+# We do not use npz because parsing its zip entries takes longer than parsing the original json for short runs.
+def _encode_column(vals: list[Any], delta: bool) -> tuple[bytes, str, str]:
+    if len(vals) and all(type(v) is int for v in vals):
+        return np.asarray(vals, dtype=np.int64).tobytes(), "raw", "<i8"
+    if len(vals) and all(type(v) is float for v in vals):
+        array = np.asarray(vals, dtype=np.float64)
+        if not delta:
+            return array.tobytes(), "raw", "<f8"
+        # The int64 view of float64 makes the delta encoding exactly invertible, which float arithmetic does not.
+        return np.diff(array.view(np.int64), prepend=np.int64(0)).tobytes(), "delta", "<i8"
+
+    return json.dumps(vals).encode(), "json", "|u1"
+
+
+def _decode_column(buffer: bytes, offset: int, nbytes: int, encoding: str, dtype: str) -> np.ndarray | list[Any]:
+    if encoding == "json":
+        return json.loads(buffer[offset : offset + nbytes])
+
+    array = np.frombuffer(buffer, dtype=dtype, count=nbytes // np.dtype(dtype).itemsize, offset=offset)
+    return np.cumsum(array).view(np.float64) if encoding == "delta" else array
+
+
+def _to_lists(data: dict[str, np.ndarray | list[Any]]) -> dict[str, list[Any]]:
+    return {k: v if isinstance(v, list) else v.tolist() for k, v in data.items()}
+
+
+def _write_binary(path: str, data: dict[str, dict[str, list[Any]]]) -> None:
+    header, chunks = [], []
+    for target in TARGETS:
+        for k, vals in data[target].items():
+            chunk, encoding, dtype = _encode_column(vals, delta=k in DELTA_KEYS)
+            header.append([target, k, encoding, dtype, len(chunk)])
+            chunks.append(chunk)
+
+    header_bytes = json.dumps(header).encode()
+    with open(path, mode="wb") as f:
+        f.write(len(header_bytes).to_bytes(4, "little"))
+        f.write(header_bytes)
+        f.write(zlib.compress(b"".join(chunks)))
+
+
+def _load_binary(path: str, target: str, keys: list[str] | None) -> dict[str, np.ndarray | list[Any]]:
+    with open(path, mode="rb") as f:
+        raw = f.read()
+
+    header_size = int.from_bytes(raw[:4], "little")
+    header = json.loads(raw[4 : 4 + header_size])
+    buffer = zlib.decompress(raw[4 + header_size :])
+    data, offset = {}, 0
+    for _target, k, encoding, dtype, nbytes in header:
+        if _target == target and (keys is None or k in keys):
+            data[k] = _decode_column(buffer, offset, nbytes, encoding, dtype)
+        offset += nbytes
+
+    return data
+
+
+def result_file_path(dir_path: str) -> str:
+    path = os.path.join(dir_path, TRAJECTORY_FN)
+    return path if os.path.exists(path) else os.path.join(dir_path, "results.json")
+
+
+def has_results(dir_path: str) -> bool:
+    return os.path.exists(result_file_path(dir_path))
+
+
+def load_target(
+    dir_path: str, target: str, keys: list[str] | None = None, as_array: bool = False
+) -> dict[str, Any]:
+    # Read either the binary trajectory or the original json transparently.
+    # as_array=True skips the conversion of the binary columns to lists, which dominates the loading time.
+    path = os.path.join(dir_path, TRAJECTORY_FN)
+    if os.path.exists(path):
+        data = _load_binary(path, target, keys)
+        return data if as_array else _to_lists(data)
+
+    with open(os.path.join(dir_path, f"{target}.json"), mode="r") as f:
+        data = json.load(f)
+    return data if keys is None else {k: data[k] for k in keys if k in data}
+
+
+def encode_dir(dir_path: str) -> None:
+    path = os.path.join(dir_path, TRAJECTORY_FN)
+    if not os.path.exists(path):
+        # trajectory.bin appears only after the verification, so an interrupted encoding simply restarts here.
+        original = {}
+        for target in TARGETS:
+            with open(os.path.join(dir_path, f"{target}.json"), mode="r") as f:
+                original[target] = json.load(f)
+
+        tmp_path = f"{path}.tmp"
+        _write_binary(tmp_path, original)
+        for target in TARGETS:
+            if _to_lists(_load_binary(tmp_path, target, keys=None)) != original[target]:
+                os.remove(tmp_path)
+                raise ValueError(f"The binary encoding of {target} in {dir_path} does not match the original json")
+
+        os.replace(tmp_path, path)
+
+    for target in TARGETS:
+        json_path = os.path.join(dir_path, f"{target}.json")
+        if os.path.exists(json_path):
+            os.remove(json_path)
@@ -1,46 +1,27 @@
 from __future__ import annotations
 
+import importlib
 import os
 import shutil
 import sys
-from argparse import ArgumentParser
+from argparse import ArgumentParser, Namespace
 from dataclasses import dataclass
-from pathlib import Path
-from typing import Any, Literal
+from types import ModuleType
+from typing import Any
 
-from benchmark_apis import HPOBench, HPOLib, JAHSBench201, LCBench, MFBranin, MFHartmann
-
-from benchmark_simulator import ObjectiveFuncWrapper, get_multiple_wrappers
-
-import ConfigSpace as CS
-
-try:
-    from hpbandster.core import nameserver as hpns
-    from hpbandster.core.worker import Worker
-    from hpbandster.optimizers import BOHB, HyperBand
-except ModuleNotFoundError:
-    class Worker:
-        NotImplemented
-
-try:
-    import optuna
-except ModuleNotFoundError:
-    pass
-
-try:
-    from smac import HyperbandFacade as HBFacade
-    from smac import MultiFidelityFacade as MFFacade
-    from smac import Scenario
-    from smac.main.config_selector import ConfigSelector
-    from smac.intensifier.hyperband import Hyperband
-except ModuleNotFoundError:
-    pass
+from src.completion_index import CompletionIndex
+from src.info_tree import INFO_DIR, RunKey, parse_save_dir_name, walk_run_dirs
+from src.run_summary import SUMMARY_FN, write_summary
+from src.timing import EVAL_TIMES_FN, PHASE_TIMER, PHASE_TIMES_FN
+from src.trajectory_io import TRAJECTORY_FN, encode_dir, has_results, load_target
 
 import ujson as json
 
 
+# The benchmarks and the optimizer back ends are imported only when a run needs them,
+# so that the housekeeping commands do not pay for benchmark_apis, hpbandster, optuna or smac.
 BENCH_CHOICES = dict(
-    lc=LCBench, hpobench=HPOBench, hpolib=HPOLib, jahs=JAHSBench201, branin=MFBranin, hartmann=MFHartmann
+    lc="LCBench", hpobench="HPOBench", hpolib="HPOLib", jahs="JAHSBench201", branin="MFBranin", hartmann="MFHartmann"
 )
 N_EVALS_DICT = dict(
     hyperband=4500,
@@ -52,233 +33,35 @@ N_EVALS_DICT = dict(
     smac=450,
     neps=450,
 )
+# SMAC3 cannot handle them due to the dependency in ConfigSpace.
+UNSUPPORTED_BENCHES = dict(smac=["lc", "jahs"])
+# The ask-and-tell optimizers that dump src.checkpoint and can resume a killed run.
+RESUMABLE_OPT_NAMES = ["random", "hebo"]
+COMPRESS_LOCK = "compress.lock"
+PROTECTED_FILES = [
+    "results.json",
+    "compress.lock",
+    "complete.lock",
+    "sampled_time.json",
+    TRAJECTORY_FN,
+    PHASE_TIMES_FN,
+    EVAL_TIMES_FN,
+    SUMMARY_FN,
+]
 
 
-class OptunaObjectiveFuncWrapper(ObjectiveFuncWrapper):
-    def set_config_space(self, config_space: CS.ConfigurationSpace) -> None:
-        self.config_space = config_space
-
-    def __call__(
-        self,
-        trial: optuna.Trial,
-    ) -> float:
-        eval_config: dict[str, Any] = {}
-        for name in self.config_space:
-            hp = self.config_space.get_hyperparameter(name)
-            if isinstance(hp, CS.CategoricalHyperparameter):
-                eval_config[name] = trial.suggest_categorical(name, choices=hp.choices)
-            elif isinstance(hp, CS.UniformFloatHyperparameter) or hp.log:
-                dtype = float if isinstance(hp, CS.UniformFloatHyperparameter) else int
-                eval_config[name] = dtype(trial.suggest_float(name, low=hp.lower, high=hp.upper, log=hp.log))
-            elif isinstance(hp, CS.UniformIntegerHyperparameter):
-                eval_config[name] = trial.suggest_int(name, low=hp.lower, high=hp.upper)
-            else:
-                raise ValueError(f"{type(hp)} is not supported.")
-
-        output = super().__call__(eval_config)
-        return output[self.obj_keys[0]]
-
-
-def run_optuna(
-    obj_func: Any,
-    config_space: CS.ConfigurationSpace,
-    save_dir_name: str,
-    seed: int,
-    n_workers: int,
-    sampler: optuna.samplers.BaseSampler,
-    tmp_dir: str | None,
-    n_evals: int = 200,
-) -> None:
-    n_actual_evals_in_opt = n_evals + n_workers
-    wrapper = OptunaObjectiveFuncWrapper(
-        obj_func=obj_func,
-        n_workers=n_workers,
-        save_dir_name=save_dir_name,
-        n_actual_evals_in_opt=n_actual_evals_in_opt,
-        n_evals=n_evals,
-        max_waiting_time=120.0,
-        store_actual_cumtime=True,
-        seed=seed,
-        tmp_dir=tmp_dir,
-    )
-    wrapper.set_config_space(config_space=config_space)
-    study = optuna.create_study(sampler=sampler)
-    study.optimize(wrapper, n_trials=n_actual_evals_in_opt, n_jobs=n_workers)
-
-
-class SMACObjectiveFuncWrapper(ObjectiveFuncWrapper):
-    def __call__(
-        self,
-        config: CS.Configuration,
-        budget: int,
-        seed: int | None = None,
-        data_to_scatter: dict[str, Any] | None = None,
-    ) -> float:
-        data_to_scatter = {} if data_to_scatter is None else data_to_scatter
-        eval_config = dict(config)
-        output = super().__call__(eval_config, fidels={self.fidel_keys[0]: int(budget)}, **data_to_scatter)
-        return output[self.obj_keys[0]]
-
-
-def run_smac(
-    obj_func: Any,
-    config_space: CS.ConfigurationSpace,
-    save_dir_name: str,
-    min_fidel: int,
-    max_fidel: int,
-    fidel_key: list[str],
-    seed: int,
-    n_workers: int,
-    sampler: Literal["smac", "hyperband"],
-    load_every_call: bool,
-    tmp_dir: str | None,
-    n_init_min: int = 5,
-    n_evals: int = 450,  # eta=3,S=2,100 full evals
-) -> None:
-    data_to_scatter = None
-    # if not load_every_call and hasattr(obj_func, "get_benchdata"):
-    #     # This data is shared in memory, and thus the optimization becomes quicker!
-    #     data_to_scatter = {"benchdata": obj_func.get_benchdata()}
-
-    n_actual_evals_in_opt = n_evals + n_workers
-    scenario = Scenario(
-        config_space,
-        n_trials=n_actual_evals_in_opt,
-        min_budget=min_fidel,
-        max_budget=max_fidel,
-        n_workers=n_workers,
-        output_directory=Path(os.path.join("" if tmp_dir is None else tmp_dir, "logs/smac3")),
-    )
-    wrapper = SMACObjectiveFuncWrapper(
-        obj_func=obj_func,
-        n_workers=n_workers,
-        save_dir_name=save_dir_name,
-        n_actual_evals_in_opt=n_actual_evals_in_opt,
-        n_evals=n_evals,
-        seed=seed,
-        max_waiting_time=120.0,
-        store_actual_cumtime=True,
-        fidel_keys=[fidel_key],
-        continual_max_fidel=max_fidel,
-        tmp_dir=tmp_dir,
-    )
+def get_bench_cls(bench_name: str) -> type:
+    import benchmark_apis
 
-    Facade = HBFacade if sampler == "hyperband" else MFFacade
-
-    class _WrappedFacade(Facade):
-        @staticmethod
-        def get_config_selector(
-            scenario: Scenario,
-            *,
-            retrain_after: int = 8,
-            retries: int = 1000,  # To prevent the early stopping in SMAC
-        ) -> ConfigSelector:
-            return ConfigSelector(scenario, retrain_after=retrain_after, retries=retries)
-
-    smac = _WrappedFacade(
-        scenario,
-        wrapper.__call__,  # SMAC raises an error when using wrapper, so we use wrapper.__call__ instead.
-        initial_design=MFFacade.get_initial_design(scenario, n_configs=max(n_init_min, n_workers)),
-        intensifier=Hyperband(scenario, incumbent_selection="highest_budget"),
-        overwrite=True,
-    )
+    return getattr(benchmark_apis, BENCH_CHOICES[bench_name])
 
-    # data_to_scatter must be a keyword argument.
-    smac.optimize(data_to_scatter=data_to_scatter)
-
-
-class BOHBWorker(Worker):
-    # https://github.com/automl/HpBandSter
-    def __init__(self, worker: ObjectiveFuncWrapper, sleep_interval: int = 0.5, **kwargs: Any):
-        super().__init__(**kwargs)
-        self.sleep_interval = sleep_interval
-        self._worker = worker
-
-    def compute(self, config: dict[str, Any], budget: int, **kwargs: Any) -> dict[str, float]:
-        fidel_keys = self._worker.fidel_keys
-        fidels = dict(epoch=int(budget)) if "epoch" in fidel_keys else {k: int(budget) for k in fidel_keys}
-        # config_id: a triplet of ints(iteration, budget index, running index) internally used in BOHB
-        # By passing config_id, it increases the safety in the continual learning
-        config_id = kwargs["config_id"][0] + 100000 * kwargs["config_id"][2]
-        results = self._worker(eval_config=config, fidels=fidels, config_id=config_id)
-        return dict(loss=results["loss"])
-
-
-def get_bohb_workers(
-    run_id: str,
-    ns_host: str,
-    obj_func: Any,
-    save_dir_name: str,
-    max_fidel: int,
-    fidel_key: str,
-    n_workers: int,
-    n_actual_evals_in_opt: int,
-    n_evals: int,
-    seed: int,
-    tmp_dir: str | None,
-) -> list[BOHBWorker]:
-    kwargs = dict(
-        obj_func=obj_func,
-        n_workers=n_workers,
-        save_dir_name=save_dir_name,
-        continual_max_fidel=max_fidel,
-        fidel_keys=[fidel_key],
-        n_actual_evals_in_opt=n_actual_evals_in_opt,
-        n_evals=n_evals,
-        seed=seed,
-        store_actual_cumtime=True,
-        tmp_dir=tmp_dir,
-    )
-    bohb_workers = []
-    for i, w in enumerate(get_multiple_wrappers(**kwargs, max_waiting_time=120.0)):
-        worker = BOHBWorker(worker=w, id=i, nameserver=ns_host, run_id=run_id)
-        worker.run(background=True)
-        bohb_workers.append(worker)
-
-    return bohb_workers
-
-
-def run_bohb(
-    obj_func: Any,
-    config_space: CS.ConfigurationSpace,
-    save_dir_name: str,
-    min_fidel: int,
-    max_fidel: int,
-    fidel_key: str,
-    seed: int,
-    n_workers: int,
-    tmp_dir: str | None,
-    sampler: Literal["hyperband", "bohb"],
-    run_id: str = "bohb-run",
-    ns_host: str = "127.0.0.1",
-    n_evals: int = 450,  # eta=3,S=2,100 full evals
-    n_brackets: int = 72,  # 22 HB iter --> 33 SH brackets
-) -> None:
-    ns = hpns.NameServer(run_id=run_id, host=ns_host, port=None)
-    ns.start()
-    _ = get_bohb_workers(
-        run_id=run_id,
-        ns_host=ns_host,
-        obj_func=obj_func,
-        save_dir_name=save_dir_name,
-        max_fidel=max_fidel,
-        fidel_key=fidel_key,
-        n_workers=n_workers,
-        n_actual_evals_in_opt=n_evals + n_workers,
-        n_evals=n_evals,
-        seed=seed,
-        tmp_dir=tmp_dir,
-    )
-    sampler_cls = HyperBand if sampler == "hyperband" else BOHB
-    opt = sampler_cls(
-        configspace=config_space,
-        run_id=run_id,
-        min_budget=min_fidel,
-        max_budget=max_fidel,
-    )
-    opt.run(n_iterations=n_brackets, min_n_workers=n_workers)
-    opt.shutdown(shutdown_workers=True)
-    ns.shutdown()
+
+def get_optimizer(opt_name: str) -> ModuleType:
+    # Each module, e.g. src.tpe, imports only its own back end and exposes run(args, bench=None).
+    if opt_name not in N_EVALS_DICT:
+        raise ValueError(f"opt_name must be in {list(N_EVALS_DICT.keys())}, but got {opt_name}")
+
+    return importlib.import_module(f"src.{opt_name}")
 
 
 @dataclass(frozen=True)
@@ -288,11 +71,12 @@ class ParsedArgs:
     dim: int
     bench_name: str
     n_workers: int
-    worker_index: int | None
     tmp_dir: str | None
+    bench_server: str | None
+    eval_times: bool = False
 
 
-def parse_args() -> ParsedArgs:
+def get_arg_parser() -> ArgumentParser:
     parser = ArgumentParser()
     parser.add_argument("--seed", type=int)
     parser.add_argument("--dataset_id", type=int, default=0, choices=list(range(34)))
@@ -300,35 +84,126 @@ def parse_args() -> ParsedArgs:
     parser.add_argument("--bench_name", type=str, choices=list(BENCH_CHOICES.keys()))
     parser.add_argument("--n_workers", type=int)
     parser.add_argument("--tmp_dir", type=str, default=None)
-    parser.add_argument("--worker_index", type=int, default=None)
-    args = parser.parse_args()
+    parser.add_argument("--bench_server", type=str, default=None, help="The Unix socket of src.bench_server")
+    parser.add_argument(
+        "--eval_times", action="store_true", help="Record the overheads of each call to the function-wrapper workers"
+    )
+    return parser
+
+
+def to_parsed_args(args: Namespace) -> ParsedArgs:
     args.tmp_dir = None if args.tmp_dir == "" else args.tmp_dir
+    args.bench_server = None if args.bench_server == "" else args.bench_server
 
     kwargs = {k: getattr(args, k) for k in ParsedArgs.__annotations__.keys()}
     return ParsedArgs(**kwargs)
 
 
-def is_completed(save_dir_name: str, opt_name: str) -> bool:
-    result_path = os.path.join("mfhpo-simulator-info", save_dir_name, "results.json")
-    if not os.path.exists(result_path):
+def parse_args() -> ParsedArgs:
+    with PHASE_TIMER.phase("parse_args"):
+        return to_parsed_args(get_arg_parser().parse_args())
+
+
+def count_evals(dir_path: str) -> int:
+    results = load_target(dir_path, "results", keys=["cumtime"])
+    return len(results["cumtime"]) if len(results) != 0 else 0
+
+
+def is_completed(save_dir_name: str, opt_name: str, index: CompletionIndex | None = None) -> bool:
+    index = CompletionIndex() if index is None else index
+    dir_path = os.path.join(INFO_DIR, save_dir_name)
+    if not has_results(dir_path):
+        # The results of a recorded run may have been removed or never copied from tmp_dir, so it must be rerun.
+        if index.is_completed(save_dir_name):
+            index.remove(save_dir_name)
         return False
 
-    lock_file = os.path.join("mfhpo-simulator-info", save_dir_name, "complete.lock")
-    if os.path.exists(lock_file):
+    if index.is_completed(save_dir_name):
         return True
 
-    n_evals = N_EVALS_DICT[opt_name]
-    with open(result_path, mode="r") as f:
-        results = json.load(f)
+    lock_file = os.path.join(dir_path, "complete.lock")
+    if os.path.exists(lock_file):
+        # Backfill the index for the results finished before the index was introduced.
+        index.record(save_dir_name, opt_name=opt_name, n_evals=N_EVALS_DICT[opt_name], completed=True)
+        return True
 
-    completed = len(results) != 0 and len(results["cumtime"]) >= n_evals
+    n_evals = count_evals(dir_path)
+    completed = n_evals >= N_EVALS_DICT[opt_name]
     if completed:
         with open(lock_file, mode="w"):
             pass
+        index.record(save_dir_name, opt_name=opt_name, n_evals=n_evals, completed=True)
 
     return completed
 
 
+def record_completion(save_dir_name: str, opt_name: str, tmp_dir: str | None) -> None:
+    # Called at the end of each run. The results may still be in tmp_dir, but the index is always in the cwd.
+    # The index records only the results in INFO_DIR, so the results in tmp_dir are recorded by is_completed
+    # from complete.lock once they are copied to INFO_DIR, e.g. by Scheduler._finish or the next post-hoc pass.
+    run_dir = os.path.join("" if tmp_dir is None else tmp_dir, INFO_DIR, save_dir_name)
+    with PHASE_TIMER.phase("teardown"):
+        n_evals = count_evals(run_dir)
+        completed = n_evals >= N_EVALS_DICT[opt_name]
+        if completed:
+            with open(os.path.join(run_dir, "complete.lock"), mode="w"):
+                pass
+
+        # The final times and the best loss, so that the runtime tables do not parse the whole trajectories.
+        write_summary(run_dir)
+
+    PHASE_TIMER.save(run_dir)
+
+    if tmp_dir is None:
+        CompletionIndex().record(save_dir_name, opt_name=opt_name, n_evals=n_evals, completed=completed)
+
+
+def backfill_index(prefix: str = INFO_DIR, index: CompletionIndex | None = None) -> int:
+    # Records the runs with complete.lock under prefix whose results are in INFO_DIR, i.e. what is_completed does
+    # per run. prefix is a subtree of either INFO_DIR or the tmp_dir the results were copied from by scripts/run.moab.
+    index = CompletionIndex() if index is None else index
+    flags = index.flags()
+    targets = []
+    for dir_path, file_names in walk_run_dirs(prefix):
+        save_dir_name = parse_save_dir_name(dir_path).save_dir_name
+        if "complete.lock" not in file_names or flags.get(save_dir_name, (False,))[0]:
+            continue
+        if has_results(os.path.join(INFO_DIR, save_dir_name)):
+            targets.append(save_dir_name)
+
+    with index.transaction():
+        for save_dir_name in targets:
+            opt_name = save_dir_name.split("/")[0]
+            index.record(save_dir_name, opt_name=opt_name, n_evals=N_EVALS_DICT[opt_name], completed=True)
+
+    return len(targets)
+
+
+def get_job_tmp_dir(tmp_dir: str, save_dir_name: str) -> str:
+    return os.path.join(tmp_dir, save_dir_name.replace("/", "_"))
+
+
+def init_job_tmp_dir(tmp_dir: str, save_dir_name: str) -> str:
+    # The runs on the same node must not share tmp_dir, because SMAC, DEHB and hpbandster write to fixed paths in it.
+    # The benchmark data stays in tmp_dir and every run sees it via a symlink, as root_dir is also tmp_dir.
+    job_tmp_dir = get_job_tmp_dir(tmp_dir, save_dir_name)
+    os.makedirs(job_tmp_dir, exist_ok=True)
+    bench_dir = os.path.join(tmp_dir, "hpo_benchmarks")
+    link_path = os.path.join(job_tmp_dir, "hpo_benchmarks")
+    if os.path.exists(bench_dir) and not os.path.lexists(link_path):
+        os.symlink(os.path.abspath(bench_dir), link_path)
+
+    return job_tmp_dir
+
+
+def move_results(src_root: str, dst_root: str | None, save_dir_name: str) -> None:
+    src_dir = os.path.join(src_root, INFO_DIR, save_dir_name)
+    if os.path.exists(src_dir):
+        dst_dir = os.path.join("" if dst_root is None else dst_root, INFO_DIR, save_dir_name)
+        shutil.copytree(src_dir, dst_dir, dirs_exist_ok=True)
+        shutil.rmtree(src_dir)
+
+
 def os_walk(target: str):
     for dir_path, _, file_names in os.walk(target):
         if len(file_names) == 0:
@@ -337,97 +212,122 @@ def os_walk(target: str):
             yield dir_path, file_names
 
 
-def compress_files():
-    prefix = "mfhpo-simulator-info/"
-    lock_fn = "compress.lock"
-    complete_count = {opt_name: 0 for opt_name in N_EVALS_DICT}
-    for count, (dir_path, file_names) in enumerate(os_walk(prefix), start=1):
-        if "results.json" not in file_names:
+def compress_dir(dir_path: str, binary: bool = False) -> None:
+    if binary:
+        encode_dir(dir_path)
+    else:
+        for target, keys in zip(["results", "sampled_time"], [["cumtime", "loss"], ["before_sample", "after_sample"]]):
+            json_path = os.path.join(dir_path, f"{target}.json")
+            with open(json_path, mode="r") as f:
+                data = json.load(f)
+                data[keys[0]] = [float(f"{d:.6e}") for d in data[keys[0]]]
+                data[keys[1]] = [float(f"{d:.6e}") for d in data[keys[1]]]
+            # Replace the file atomically so that an interruption never leaves a truncated json behind.
+            with open(f"{json_path}.tmp", mode="w") as f:
+                json.dump(data, f)
+            os.replace(f"{json_path}.tmp", json_path)
+
+    with open(os.path.join(dir_path, COMPRESS_LOCK), mode="w"):
+        pass
+
+
+def cleanup_dir(dir_path: str) -> None:
+    for fn in os.listdir(dir_path):
+        if any(fn.endswith(pattern) for pattern in PROTECTED_FILES):
             continue
 
+        os.remove(os.path.join(dir_path, fn))
+
+
+def compress_files():
+    index = CompletionIndex()
+    backfill_index(index=index)
+    complete_count = {opt_name: len(index.completed_dirs(opt_name=opt_name)) for opt_name in N_EVALS_DICT}
+    for count, save_dir_name in enumerate(index.completed_dirs(unflagged="compressed"), start=1):
         if count % 1000 == 0:
             print(f"Checked {count} directories")
 
-        save_dir_name = dir_path.split(prefix)[-1]
-        opt_name = save_dir_name.split("/")[0]
-        complete_count[opt_name] += 1
-        if lock_fn in file_names:
-            continue
-
-        with open(os.path.join(prefix, save_dir_name, lock_fn), mode="w"):
-            pass
-        if not is_completed(save_dir_name=save_dir_name, opt_name=opt_name):
+        dir_path = os.path.join(INFO_DIR, save_dir_name)
+        if os.path.exists(os.path.join(dir_path, COMPRESS_LOCK)):
+            index.mark(save_dir_name, "compressed")
             continue
 
         print(f"Compress {save_dir_name}")
-        for target, keys in zip(["results", "sampled_time"], [["cumtime", "loss"], ["before_sample", "after_sample"]]):
-            json_fn = f"{target}.json"
-            with open(os.path.join(prefix, save_dir_name, json_fn), mode="r") as f:
-                data = json.load(f)
-                data[keys[0]] = [float(f"{d:.6e}") for d in data[keys[0]]]
-                data[keys[1]] = [float(f"{d:.6e}") for d in data[keys[1]]]
-            with open(os.path.join(prefix, save_dir_name, json_fn), mode="w") as f:
-                json.dump(data, f)
+        compress_dir(dir_path)
+        index.mark(save_dir_name, "compressed")
 
     print(complete_count)
 
 
 def remove_failed_files():
-    prefix = "mfhpo-simulator-info/"
-    lock_fn = "complete.lock"
+    from src.checkpoint import CHECKPOINT_FN, load_checkpoint
+
+    index = CompletionIndex()
+    completed_dirs = set(index.completed_dirs())
     complete_count = {opt_name: 0 for opt_name in N_EVALS_DICT}
-    for count, (dir_path, file_names) in enumerate(os_walk(prefix), start=1):
-        if "results.json" not in file_names:
+    unresumable_count = {opt_name: 0 for opt_name in N_EVALS_DICT}
+    for count, (dir_path, file_names) in enumerate(os_walk(INFO_DIR), start=1):
+        if all(fn not in file_names for fn in ["results.json", TRAJECTORY_FN, CHECKPOINT_FN]):
             continue
 
         if count % 1000 == 0:
             print(f"Checked {count} directories")
 
-        save_dir_name = dir_path.split(prefix)[-1]
+        save_dir_name = os.path.relpath(dir_path, INFO_DIR)
         opt_name = save_dir_name.split("/")[0]
         complete_count[opt_name] += 1
-        if lock_fn in file_names:
+        if save_dir_name in completed_dirs:
+            continue
+
+        if is_completed(save_dir_name=save_dir_name, opt_name=opt_name, index=index):
             continue
 
-        if is_completed(save_dir_name=save_dir_name, opt_name=opt_name):
+        if opt_name in RESUMABLE_OPT_NAMES and CHECKPOINT_FN in file_names:
+            checkpoint = load_checkpoint(save_dir_name)
+            print(f"Keep {save_dir_name} to resume from {checkpoint.n_evals} evaluations")
             continue
 
-        print(f"Remove {save_dir_name}")
+        if opt_name not in RESUMABLE_OPT_NAMES:
+            print(f"Remove {save_dir_name} as {opt_name} cannot resume from {count_evals(dir_path)} evaluations")
+            unresumable_count[opt_name] += 1
+        else:
+            print(f"Remove {save_dir_name} as it has no checkpoint")
+
         shutil.rmtree(dir_path)
+        index.remove(save_dir_name)
 
     print(complete_count)
+    print(f"Removed the partial runs of the optimizers that cannot resume: {unresumable_count}")
 
 
 def cleanup_info():
-    prefix = "mfhpo-simulator-info/"
-    count = 0
-    protected = ["results.json", "compress.lock", "complete.lock", "sampled_time.json"]
-    for (dir_path, file_names) in os_walk(prefix):
-        if "results.json" not in file_names:
-            continue
-
-        count += 1
+    index = CompletionIndex()
+    backfill_index(index=index)
+    for count, save_dir_name in enumerate(index.completed_dirs(unflagged="cleaned"), start=1):
         if count % 1000 == 0:
             print(f"Checked {count} directories")
 
-        for fn in file_names:
-            if any(fn.endswith(pattern) for pattern in protected):
-                continue
+        cleanup_dir(os.path.join(INFO_DIR, save_dir_name))
+        index.mark(save_dir_name, "cleaned")
 
-            os.remove(os.path.join(dir_path, fn))
 
-
-def get_save_dir_name(opt_name: str, args: ParsedArgs) -> str:
-    dataset_part = ""
-    if BENCH_CHOICES[args.bench_name]._BENCH_TYPE == "HPO":
-        dataset_name = "-".join(BENCH_CHOICES[args.bench_name]._CONSTS.dataset_names[args.dataset_id].split("_"))
-        dataset_part = f"_dataset={dataset_name}"
+def make_save_dir_name(opt_name: str, args: ParsedArgs) -> str:
+    dataset_name = None
+    bench_cls = get_bench_cls(args.bench_name)
+    if bench_cls._BENCH_TYPE == "HPO":
+        dataset_name = "-".join(bench_cls._CONSTS.dataset_names[args.dataset_id].split("_"))
 
     bench_name = args.bench_name
     if args.bench_name == "hartmann":
         bench_name = f"{args.bench_name}{args.dim}d"
 
-    save_dir_name = f"{opt_name}/bench={bench_name}{dataset_part}_nworkers={args.n_workers}/{args.seed}"
+    return RunKey(
+        opt_name=opt_name, bench_name=bench_name, dataset_name=dataset_name, n_workers=args.n_workers, seed=args.seed
+    ).save_dir_name
+
+
+def get_save_dir_name(opt_name: str, args: ParsedArgs) -> str:
+    save_dir_name = make_save_dir_name(opt_name=opt_name, args=args)
     if is_completed(save_dir_name, opt_name=opt_name):
         sys.exit("The completed result already exists")
 
@@ -435,19 +335,36 @@ def get_save_dir_name(opt_name: str, args: ParsedArgs) -> str:
 
 
 def get_bench_instance(
-    args: ParsedArgs, keep_benchdata: bool = True, use_fidel: bool = True, load_every_call: bool = False,
+    args: ParsedArgs,
+    keep_benchdata: bool = True,
+    use_fidel: bool = True,
+    load_every_call: bool = False,
+    share_benchdata: bool = False,
 ) -> Any:
-    bench_cls = BENCH_CHOICES[args.bench_name]
-    if bench_cls._BENCH_TYPE == "HPO":
-        obj_func = bench_cls(
-            dataset_id=args.dataset_id,
-            seed=args.seed,
-            keep_benchdata=keep_benchdata,
-            load_every_call=load_every_call,
-            root_dir=args.tmp_dir,
-        )
-    else:
-        kwargs = dict(dim=args.dim) if args.bench_name == "hartmann" else dict()
-        obj_func = bench_cls(seed=args.seed, use_fidel=use_fidel, **kwargs)
+    with PHASE_TIMER.phase("bench"):
+        from src.bench_server import RemoteBench
+        from src.shared_bench import get_shared_benchdata
+
+        bench_cls = get_bench_cls(args.bench_name)
+        if bench_cls._BENCH_TYPE == "HPO" and args.bench_server is not None:
+            # The synthetic benchmarks stay local because their noise depends on the RNG of each instance.
+            local_bench = bench_cls(
+                dataset_id=args.dataset_id, seed=args.seed, keep_benchdata=False, root_dir=args.tmp_dir
+            )
+            obj_func = RemoteBench(address=args.bench_server, dataset_id=args.dataset_id, local_bench=local_bench)
+        elif bench_cls._BENCH_TYPE == "HPO":
+            obj_func = bench_cls(
+                dataset_id=args.dataset_id,
+                seed=args.seed,
+                keep_benchdata=keep_benchdata and not share_benchdata,
+                load_every_call=load_every_call and not share_benchdata,
+                root_dir=args.tmp_dir,
+            )
+            if share_benchdata:
+                # The shared benchdata is cheap to pickle, so worker processes can receive the whole instance.
+                obj_func._benchdata = get_shared_benchdata(obj_func)
+        else:
+            kwargs = dict(dim=args.dim) if args.bench_name == "hartmann" else dict()
+            obj_func = bench_cls(seed=args.seed, use_fidel=use_fidel, **kwargs)
 
     return obj_func
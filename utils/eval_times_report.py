@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import os
+from argparse import ArgumentParser
+from collections import defaultdict
+
+import numpy as np
+
+from src.info_tree import INFO_DIR, parse_save_dir_name, walk_run_dirs
+from src.timing import EVAL_TIME_KEYS, EVAL_TIMES_FN
+
+
+PERCENTILES = [50, 90, 99]
+
+
+def load_eval_times(dir_path: str) -> np.ndarray:
+    # The records are little-endian float32 as in src.timing.EVAL_TIME_FORMAT and a killed run may cut the last one.
+    records = np.fromfile(os.path.join(dir_path, EVAL_TIMES_FN), dtype="<f4")
+    n_keys = len(EVAL_TIME_KEYS)
+    return records[: records.size // n_keys * n_keys].reshape(-1, n_keys)
+
+
+def collect(prefix: str, group_by: list[str]) -> dict[tuple, list[np.ndarray]]:
+    groups: dict[tuple, list[np.ndarray]] = defaultdict(list)
+    n_dirs = 0
+    for dir_path, file_names in walk_run_dirs(prefix):
+        if EVAL_TIMES_FN not in file_names:
+            continue
+
+        key = parse_save_dir_name(dir_path)
+        groups[tuple(getattr(key, k) for k in group_by)].append(load_eval_times(dir_path))
+        n_dirs += 1
+        if n_dirs % 1000 == 0:
+            print(f"Read {n_dirs} eval times")
+
+    return groups
+
+
+def print_report(groups: dict[tuple, list[np.ndarray]], group_by: list[str]) -> None:
+    width = max([len(", ".join(map(str, group))) for group in groups] + [len(", ".join(group_by))])
+    header = [f"{'n_runs':>6}", f"{'n_calls':>8}", f"{'key':>6}", f"{'mean':>9}"]
+    header += [f"{f'p{q}':>9}" for q in PERCENTILES] + [f"{'max':>9}"]
+    print(f"{', '.join(group_by):<{width}} | " + " | ".join(header) + "  (in ms)")
+    for group in sorted(groups):
+        times = np.concatenate(groups[group], axis=0)
+        for i, key in enumerate(EVAL_TIME_KEYS):
+            # The sampling time of the first call of each worker is NaN.
+            vals = 1000 * times[:, i][~np.isnan(times[:, i])]
+            cells = [f"{len(groups[group]):>6}", f"{times.shape[0]:>8}", f"{key:>6}"]
+            if vals.size == 0:
+                cells += [f"{'-':>9}"] * (len(PERCENTILES) + 2)
+            else:
+                stats = [vals.mean(), *np.percentile(vals, PERCENTILES), vals.max()]
+                cells += [f"{s:>9.2f}" for s in stats]
+            print(f"{', '.join(map(str, group)):<{width}} | " + " | ".join(cells))
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--prefix", type=str, default=INFO_DIR)
+    parser.add_argument(
+        "--group_by",
+        type=str,
+        nargs="+",
+        default=["opt_name", "n_workers"],
+        choices=["opt_name", "bench_name", "n_workers"],
+    )
+    args = parser.parse_args()
+
+    groups = collect(args.prefix, args.group_by)
+    if len(groups) == 0:
+        print(f"No {EVAL_TIMES_FN} was found in {args.prefix}; run the optimizers with --eval_times")
+    else:
+        print_report(groups, args.group_by)
@@ -4,6 +4,10 @@ import os
 from argparse import ArgumentParser
 from typing import Final
 
+from src.completion_index import CompletionIndex
+from src.info_tree import INFO_DIR
+from src.utils import backfill_index
+
 
 MAX_BIT: Final[int] = 30
 
@@ -17,18 +21,13 @@ def popcount(num: int, max_bit: int = MAX_BIT) -> int:
 
 
 def check_files(opt_name: str) -> dict[str, int]:
-    os.chdir(f"mfhpo-simulator-info/{opt_name}")
-    counter: dict[str, int] = {}
-    for tup in os.walk("."):
-        if len(tup[-1]) and "complete.lock" in tup[-1]:
-            s = tup[0].split("/")
-            seed = int(s[-1])
-            key = s[1]
-            prev = counter.get(key, 0)
-            counter[key] = prev | (1 << seed)
-        elif len(tup[0]) >= 3 and "/" in tup[0][-3:]:
-            key = tup[0].split("/")[1]
-            counter.setdefault(key, 0)
+    counter: dict[str, int] = {key: 0 for key in os.listdir(f"{INFO_DIR}{opt_name}")}
+    index = CompletionIndex()
+    # The runs copied from tmp_dir may not be recorded yet.
+    backfill_index(prefix=f"{INFO_DIR}{opt_name}", index=index)
+    for save_dir_name in index.completed_dirs(opt_name=opt_name):
+        _, cond, seed = save_dir_name.split("/")
+        counter[cond] = counter.get(cond, 0) | (1 << int(seed))
     return counter
 
 
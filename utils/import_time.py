@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+from argparse import ArgumentParser
+
+
+# The upper bound of the import time in seconds for each entry point.
+# The housekeeping commands must not import any benchmark or optimizer library.
+BUDGETS = {
+    "src.remove_files": 0.3,
+    "src.compress_files": 0.3,
+    "src.clean_files": 0.3,
+    "src.posthoc": 0.3,
+    "src.results_store": 0.3,
+    "utils.find_missing": 0.3,
+    "src.driver": 0.3,
+    "src.bench_server": 3.0,
+    "src.random": 3.0,
+    "src.tpe": 3.0,
+    "src.hebo": 6.0,
+    "src.hyperband": 3.0,
+    "src.bohb": 3.0,
+    "src.dehb": 5.0,
+    "src.smac": 8.0,
+    "src.neps": 8.0,
+}
+HEAVY_MODULES = ["benchmark_apis", "hpbandster", "optuna", "smac", "dehb", "hebo", "neps"]
+
+
+def measure(module: str) -> tuple[float, list[str]]:
+    # Measure in a fresh interpreter, as every job does, and report the heavy libraries imported on the way.
+    code = (
+        "import sys, time; start = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - start); "
+        f"print(','.join(m for m in {HEAVY_MODULES} if m in sys.modules))"
+    )
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    elapsed, loaded = output.split("\n")[-3:-1]
+    return float(elapsed), [m for m in loaded.split(",") if len(m) > 0]
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--modules", type=str, nargs="*", default=list(BUDGETS.keys()))
+    parser.add_argument("--n_repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    n_failures = 0
+    for module in args.modules:
+        try:
+            results = [measure(module) for _ in range(args.n_repeats)]
+        except subprocess.CalledProcessError:
+            print(f"{module:<20}: could not be imported")
+            n_failures += 1
+            continue
+
+        elapsed = min(r[0] for r in results)
+        ok = elapsed <= BUDGETS[module]
+        n_failures += not ok
+        status = "OK" if ok else "OVER BUDGET"
+        print(f"{module:<20}: {elapsed:.3f}/{BUDGETS[module]:.1f} seconds {status} (loaded: {results[0][1]})")
+
+    sys.exit(n_failures > 0)
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import os
+from argparse import ArgumentParser
+from collections import defaultdict
+
+import numpy as np
+
+from src.info_tree import INFO_DIR, parse_save_dir_name, walk_run_dirs
+from src.timing import PHASE_TIMES_FN, PHASES
+
+import ujson as json
+
+
+COLUMNS = PHASES + ["other", "total"]
+
+
+def collect(prefix: str, group_by: list[str]) -> dict[tuple, list[list[float]]]:
+    groups: dict[tuple, list[list[float]]] = defaultdict(list)
+    n_dirs = 0
+    for dir_path, file_names in walk_run_dirs(prefix):
+        if PHASE_TIMES_FN not in file_names:
+            continue
+
+        with open(os.path.join(dir_path, PHASE_TIMES_FN), mode="r") as f:
+            times = json.load(f)
+
+        key = parse_save_dir_name(dir_path)
+        groups[tuple(getattr(key, k) for k in group_by)].append([times.get(c, 0.0) for c in COLUMNS])
+        n_dirs += 1
+        if n_dirs % 1000 == 0:
+            print(f"Read {n_dirs} phase breakdowns")
+
+    return groups
+
+
+def print_report(groups: dict[tuple, list[list[float]]], group_by: list[str]) -> None:
+    width = max([len(", ".join(map(str, group))) for group in groups] + [len(", ".join(group_by))])
+    print(f"{', '.join(group_by):<{width}} | {'n_runs':>6} | " + " | ".join(f"{c:>10}" for c in COLUMNS))
+    for group in sorted(groups):
+        times = np.asarray(groups[group])
+        mean = times.mean(axis=0)
+        # The share of each phase in the walltime summed over the runs of the group.
+        share = times.sum(axis=0) / max(times[:, -1].sum(), 1e-12)
+        cells = [
+            f"{m:>8.1f}s" if c == "total" else f"{m:>5.1f}s{100 * r:>3.0f}%" for c, m, r in zip(COLUMNS, mean, share)
+        ]
+        print(f"{', '.join(map(str, group)):<{width}} | {times.shape[0]:>6} | " + " | ".join(cells))
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--prefix", type=str, default=INFO_DIR)
+    parser.add_argument(
+        "--group_by", type=str, nargs="+", default=["opt_name"], choices=["opt_name", "bench_name", "n_workers"]
+    )
+    args = parser.parse_args()
+
+    groups = collect(args.prefix, args.group_by)
+    if len(groups) == 0:
+        print(f"No {PHASE_TIMES_FN} was found in {args.prefix}")
+    else:
+        print_report(groups, args.group_by)
@@ -1,7 +1,4 @@
 #!/bin/bash -l
 
-for cmd in "./utils/remove.sh" "./utils/compress.sh" "./utils/clean.sh"
-do
-    echo $cmd
-    $cmd
-done
+module load tools/singularity/3.11
+singularity exec mfhpo-simulator.sif python -m src.posthoc "$@"
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import logging
+import os
+import tempfile
+import time
+from argparse import ArgumentParser
+from typing import Any, Callable
+
+from src.trajectory_io import load_target
+from src.utils import N_EVALS_DICT, get_bench_cls
+
+
+# Branin costs almost nothing to query, so the actual walltime per evaluation is the overhead of the optimizer,
+# e.g. the Pyro calls of hpbandster, and of the simulator.
+SEED = 0
+
+logging.getLogger("hpbandster").setLevel(logging.CRITICAL)
+
+
+def _run_hpbandster(
+    sampler: str, mode: str, bench: Any, n_workers: int, n_evals: int, save_dir_name: str, tmp_dir: str
+) -> None:
+    from src.hpbandster_utils import run_bohb
+
+    fidel_key = "epoch" if "epoch" in bench.fidel_keys else "z0"
+    run_bohb(
+        obj_func=bench,
+        config_space=bench.config_space,
+        min_fidel=bench.min_fidels[fidel_key],
+        max_fidel=bench.max_fidels[fidel_key],
+        fidel_key=fidel_key,
+        n_workers=n_workers,
+        sampler=sampler,
+        save_dir_name=save_dir_name,
+        seed=SEED,
+        tmp_dir=tmp_dir,
+        run_id=f"overhead_{os.getpid()}_{sampler}_{mode}_{n_workers}",
+        n_evals=n_evals,
+        # The same ratio as src.bohb, i.e. 72 brackets for 450 evaluations, which only the nameserver mode uses.
+        n_brackets=-(-n_evals * 72 // 450),
+        ask_and_tell=mode == "ask_and_tell",
+    )
+
+
+def _run_optuna(sampler: str, mode: str, bench: Any, n_workers: int, n_evals: int, save_dir_name: str, tmp_dir: str):
+    import optuna
+
+    from src.optuna_utils import run_optuna
+    from src.random import run_random
+
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    kwargs = dict(
+        obj_func=bench,
+        config_space=bench.config_space,
+        n_workers=n_workers,
+        save_dir_name=save_dir_name,
+        seed=SEED,
+        tmp_dir=tmp_dir,
+        n_evals=n_evals,
+    )
+    if sampler == "random" and mode == "ask_and_tell":
+        # src.random already runs its own ask-and-tell random search.
+        run_random(**kwargs)
+    else:
+        optuna_sampler = optuna.samplers.TPESampler() if sampler == "tpe" else optuna.samplers.RandomSampler(SEED)
+        run_optuna(**kwargs, sampler=optuna_sampler, ask_and_tell=mode == "ask_and_tell")
+
+
+def _run_hebo(mode: str, bench: Any, n_workers: int, n_evals: int, save_dir_name: str, tmp_dir: str) -> None:
+    from src.hebo import run_hebo
+
+    run_hebo(
+        obj_func=bench,
+        config_space=bench.config_space,
+        n_workers=n_workers,
+        save_dir_name=save_dir_name,
+        seed=SEED,
+        tmp_dir=tmp_dir,
+        n_evals=n_evals,
+        batch_size=1 if mode == "single" else n_workers,
+    )
+
+
+def _run_neps(mode: str, bench: Any, n_workers: int, n_evals: int, save_dir_name: str, tmp_dir: str) -> None:
+    from src.neps import COORDINATION_DIR, launch_neps
+
+    fidel_key = "epoch" if "epoch" in bench.fidel_keys else "z0"
+    launch_neps(
+        obj_func=bench,
+        config_space=bench.config_space,
+        min_fidel=bench.min_fidels[fidel_key],
+        max_fidel=bench.max_fidels[fidel_key],
+        fidel_key=fidel_key,
+        n_workers=n_workers,
+        save_dir_name=save_dir_name,
+        seed=SEED,
+        tmp_dir=tmp_dir,
+        coordination_dir=COORDINATION_DIR if mode == "shm" else None,
+        n_evals=n_evals,
+    )
+
+
+# The modes of each optimizer, the first of which is the one before the change.
+RUNNERS: dict[str, tuple[list[str], Callable[..., None]]] = dict(
+    hyperband=(["nameserver", "ask_and_tell"], lambda *args: _run_hpbandster("hyperband", *args)),
+    bohb=(["nameserver", "ask_and_tell"], lambda *args: _run_hpbandster("bohb", *args)),
+    tpe=(["n_jobs", "ask_and_tell"], lambda *args: _run_optuna("tpe", *args)),
+    random=(["n_jobs", "ask_and_tell"], lambda *args: _run_optuna("random", *args)),
+    hebo=(["single", "batched"], _run_hebo),
+    # The coordination files of the NePS worker processes are either in tmp_dir or in /dev/shm.
+    neps=(["disk", "shm"], _run_neps),
+)
+
+
+def measure(opt_name: str, mode: str, n_workers: int, n_evals: int) -> tuple[int, float]:
+    bench = get_bench_cls("branin")(seed=SEED, use_fidel=opt_name in ["hyperband", "bohb", "neps"])
+    # tmp_dir is on the disk of the cwd as in the jobs, since /tmp might be RAM-backed.
+    with tempfile.TemporaryDirectory(dir=".") as tmp_dir:
+        save_dir_name = f"{opt_name}/{mode}/{n_workers}"
+        start = time.perf_counter()
+        RUNNERS[opt_name][1](mode, bench, n_workers, n_evals, save_dir_name, tmp_dir)
+        elapsed = time.perf_counter() - start
+        results = load_target(os.path.join(tmp_dir, "mfhpo-simulator-info", save_dir_name), "results", ["cumtime"])
+
+    return len(results["cumtime"]), elapsed
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--opt_names", type=str, nargs="+", default=list(RUNNERS.keys()), choices=list(RUNNERS.keys()))
+    parser.add_argument("--n_workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--n_evals", type=int, default=None, help="N_EVALS_DICT[opt_name] if not given")
+    args = parser.parse_args()
+
+    print(f"{'opt_name':<10} | {'mode':<15} | {'n_workers':>9} | {'n_evals':>7} | {'walltime':>9} | {'per eval':>9}")
+    for opt_name in args.opt_names:
+        n_evals = N_EVALS_DICT[opt_name] if args.n_evals is None else args.n_evals
+        for n_workers in args.n_workers:
+            for mode in RUNNERS[opt_name][0]:
+                n_done, elapsed = measure(opt_name, mode, n_workers, n_evals)
+                print(
+                    f"{opt_name:<10} | {mode:<15} | {n_workers:>9} | {n_done:>7} | {elapsed:>8.1f}s | "
+                    f"{1000 * elapsed / max(n_done, 1):>7.2f}ms"
+                )
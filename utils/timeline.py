@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import os
+from argparse import ArgumentParser
+from collections import defaultdict
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.info_tree import INFO_DIR, parse_save_dir_name, walk_run_dirs
+from src.trajectory_io import load_target
+
+import ujson as json
+
+
+# Each simulated evaluation of a worker is split into 3 spans:
+#   blocked: from the previous result of the worker until the sampler becomes free for the worker,
+#   sample: the sampling time of the optimizer, and eval: the runtime returned by the benchmark.
+SPAN_NAMES = ["blocked", "sample", "eval"]
+SIMULATED_PID, ACTUAL_PID = 0, 1
+
+
+@dataclass(frozen=True)
+class WorkerSpans:
+    worker_index: int
+    starts: np.ndarray  # (n_evals, 3) in the order of SPAN_NAMES
+    ends: np.ndarray
+    actual_starts: np.ndarray  # (n_evals, ), from the previous result of the worker
+    actual_ends: np.ndarray
+
+
+@dataclass(frozen=True)
+class TimelineStats:
+    n_workers: int
+    makespan: float
+    idle_fraction: float
+    sampler_blocking: float
+    sampling: float
+
+    @property
+    def blocking_fraction(self) -> float:
+        return self.sampler_blocking / max(self.n_workers * self.makespan, 1e-12)
+
+
+def build_timeline(dir_path: str) -> list[WorkerSpans]:
+    results = load_target(dir_path, "results", keys=["cumtime", "worker_index", "actual_cumtime"], as_array=True)
+    sampled_time = load_target(dir_path, "sampled_time", as_array=True)
+    cumtime, worker_indices = np.asarray(results["cumtime"]), np.asarray(results["worker_index"])
+    actual_cumtime = np.asarray(results.get("actual_cumtime", np.full_like(cumtime, np.nan)))
+    sampled_indices = np.asarray(sampled_time["worker_index"])
+    timeline = []
+    for worker_index in np.unique(worker_indices):
+        before = np.asarray(sampled_time["before_sample"])[sampled_indices == worker_index]
+        after = np.asarray(sampled_time["after_sample"])[sampled_indices == worker_index]
+        # The samples after the last result of each worker, e.g. the termination, never finished.
+        n_evals = min(before.size, int(np.sum(worker_indices == worker_index)))
+        before, after = before[:n_evals], after[:n_evals]
+        ends = cumtime[worker_indices == worker_index][:n_evals]
+        actual_ends = actual_cumtime[worker_indices == worker_index][:n_evals]
+        prev_ends = np.concatenate([[0.0], ends[:-1]])
+        timeline.append(
+            WorkerSpans(
+                worker_index=int(worker_index),
+                starts=np.stack([prev_ends, np.maximum(prev_ends, before), after], axis=-1),
+                ends=np.stack([np.maximum(prev_ends, before), after, ends], axis=-1),
+                actual_starts=np.concatenate([[0.0], actual_ends[:-1]]),
+                actual_ends=actual_ends,
+            )
+        )
+
+    return timeline
+
+
+def compute_stats(timeline: list[WorkerSpans]) -> TimelineStats:
+    makespan = max(float(spans.ends[-1, -1]) for spans in timeline)
+    durations = np.concatenate([spans.ends - spans.starts for spans in timeline], axis=0).sum(axis=0)
+    # The workers are idle whenever they do not evaluate, i.e. while blocked, while sampling and after finishing.
+    n_workers = len(timeline)
+    return TimelineStats(
+        n_workers=n_workers,
+        makespan=makespan,
+        idle_fraction=1.0 - durations[SPAN_NAMES.index("eval")] / max(n_workers * makespan, 1e-12),
+        sampler_blocking=float(durations[SPAN_NAMES.index("blocked")]),
+        sampling=float(durations[SPAN_NAMES.index("sample")]),
+    )
+
+
+def to_chrome_trace(timeline: list[WorkerSpans], name: str) -> dict:
+    # The trace event format of chrome://tracing and Perfetto, where ts and dur are in microseconds.
+    events = [
+        dict(name="process_name", ph="M", pid=SIMULATED_PID, args=dict(name=f"{name} (simulated)")),
+        dict(name="process_name", ph="M", pid=ACTUAL_PID, args=dict(name=f"{name} (actual)")),
+    ]
+    for spans in timeline:
+        tid = spans.worker_index
+        for pid in [SIMULATED_PID, ACTUAL_PID]:
+            events.append(dict(name="thread_name", ph="M", pid=pid, tid=tid, args=dict(name=f"worker {tid}")))
+
+        for i in range(spans.starts.shape[0]):
+            for j, span_name in enumerate(SPAN_NAMES):
+                dur = spans.ends[i, j] - spans.starts[i, j]
+                if dur <= 0.0:
+                    continue
+
+                ts = 1e6 * spans.starts[i, j]
+                events.append(dict(name=span_name, ph="X", pid=SIMULATED_PID, tid=tid, ts=ts, dur=1e6 * dur))
+
+            if not np.isnan(spans.actual_ends[i]):
+                # The actual time includes the sampling, the query and the wait for the other workers.
+                ts, dur = 1e6 * spans.actual_starts[i], 1e6 * (spans.actual_ends[i] - spans.actual_starts[i])
+                args = dict(simulated_runtime=float(spans.ends[i, -1] - spans.starts[i, -1]))
+                events.append(dict(name="cycle", ph="X", pid=ACTUAL_PID, tid=tid, ts=ts, dur=dur, args=args))
+
+    return dict(traceEvents=events, displayTimeUnit="ms")
+
+
+def export_trace(timeline: list[WorkerSpans], dir_path: str, out_dir: str) -> str:
+    save_dir_name = parse_save_dir_name(dir_path).save_dir_name
+    path = os.path.join(out_dir, f"{save_dir_name.replace('/', '_')}.json")
+    os.makedirs(out_dir, exist_ok=True)
+    with open(path, mode="w") as f:
+        json.dump(to_chrome_trace(timeline, name=save_dir_name), f)
+
+    return path
+
+
+def print_summary(prefix: str, group_by: list[str]) -> None:
+    groups: dict[tuple, list[TimelineStats]] = defaultdict(list)
+    for count, (dir_path, file_names) in enumerate(walk_run_dirs(prefix), start=1):
+        if count % 1000 == 0:
+            print(f"Read {count} directories")
+
+        key = parse_save_dir_name(dir_path)
+        groups[tuple(getattr(key, k) for k in group_by)].append(compute_stats(build_timeline(dir_path)))
+
+    width = max([len(", ".join(map(str, group))) for group in groups] + [len(", ".join(group_by))])
+    print(f"{', '.join(group_by):<{width}} | {'n_runs':>6} | {'idle':>6} | {'blocked':>7} | {'sampling':>8}")
+    for group in sorted(groups):
+        stats = groups[group]
+        idle = np.mean([s.idle_fraction for s in stats])
+        blocked = np.mean([s.blocking_fraction for s in stats])
+        # The share of the sampling in the worker time, which is the same denominator as idle and blocked.
+        sampling = np.mean([s.sampling / max(s.n_workers * s.makespan, 1e-12) for s in stats])
+        cells = [f"{len(stats):>6}", f"{100 * idle:>5.1f}%", f"{100 * blocked:>6.1f}%", f"{100 * sampling:>7.1f}%"]
+        print(f"{', '.join(map(str, group)):<{width}} | " + " | ".join(cells))
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("command", type=str, choices=["trace", "summary"])
+    parser.add_argument("--dir_paths", type=str, nargs="+", default=[], help="The run directories for trace")
+    parser.add_argument("--out_dir", type=str, default="mfhpo-simulator-traces")
+    parser.add_argument("--prefix", type=str, default=INFO_DIR)
+    parser.add_argument(
+        "--group_by",
+        type=str,
+        nargs="+",
+        default=["opt_name", "n_workers"],
+        choices=["opt_name", "bench_name", "n_workers"],
+    )
+    args = parser.parse_args()
+
+    if args.command == "trace":
+        for dir_path in args.dir_paths:
+            timeline = build_timeline(dir_path)
+            stats = compute_stats(timeline)
+            print(
+                f"Saved {export_trace(timeline, dir_path, args.out_dir)}: idle={100 * stats.idle_fraction:.1f}%, "
+                f"sampler blocking={stats.sampler_blocking:.1f} seconds ({100 * stats.blocking_fraction:.1f}%)"
+            )
+    else:
+        print_summary(args.prefix, args.group_by)
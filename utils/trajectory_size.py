@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import time
+from argparse import ArgumentParser
+
+import numpy as np
+
+from src.info_tree import INFO_DIR, walk_run_dirs
+from src.trajectory_io import TARGETS, TRAJECTORY_FN, encode_dir, load_target
+
+import ujson as json
+
+
+def measure(dir_path: str, work_dir: str) -> dict[str, float]:
+    # Work on a copy so that the campaign directory is never modified.
+    for target in TARGETS:
+        shutil.copy(os.path.join(dir_path, f"{target}.json"), work_dir)
+
+    json_size = sum(os.path.getsize(os.path.join(work_dir, f"{target}.json")) for target in TARGETS)
+    start = time.perf_counter()
+    for target in TARGETS:
+        with open(os.path.join(work_dir, f"{target}.json"), mode="r") as f:
+            data = json.load(f)
+        data = {k: np.asarray(v) for k, v in data.items()}
+    json_time = time.perf_counter() - start
+
+    encode_dir(work_dir)
+    binary_size = os.path.getsize(os.path.join(work_dir, TRAJECTORY_FN))
+    start = time.perf_counter()
+    for target in TARGETS:
+        load_target(work_dir, target, as_array=True)
+    binary_time = time.perf_counter() - start
+    os.remove(os.path.join(work_dir, TRAJECTORY_FN))
+    return dict(json_size=json_size, binary_size=binary_size, json_time=json_time, binary_time=binary_time)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--prefix", type=str, default=INFO_DIR)
+    parser.add_argument("--n_dirs", type=int, default=1000)
+    args = parser.parse_args()
+
+    total = dict(json_size=0.0, binary_size=0.0, json_time=0.0, binary_time=0.0)
+    n_dirs = 0
+    with tempfile.TemporaryDirectory() as work_dir:
+        for dir_path, file_names in walk_run_dirs(args.prefix):
+            if "results.json" not in file_names or "sampled_time.json" not in file_names:
+                continue
+
+            for k, v in measure(dir_path, work_dir).items():
+                total[k] += v
+            n_dirs += 1
+            if n_dirs == args.n_dirs:
+                break
+
+    print(f"Measured {n_dirs} directories")
+    print(f"json  : {total['json_size'] / 1e6:.2f} MB, {total['json_time']:.2f} seconds")
+    print(f"binary: {total['binary_size'] / 1e6:.2f} MB, {total['binary_time']:.2f} seconds")
+    print(f"size ratio: {total['binary_size'] / total['json_size']:.3f}")
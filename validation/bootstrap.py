@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+
+N_RESAMPLES = 2000
+CONFIDENCE = 0.95
+
+
+@dataclass(frozen=True)
+class BootstrapSums:
+    numer: np.ndarray  # (n_cells, n_resamples)
+    denom: np.ndarray
+
+    def ratio_ci(self, confidence: float = CONFIDENCE) -> tuple[np.ndarray, np.ndarray]:
+        # The percentile interval of the ratio of the sums, i.e. the ratio of the means over the seeds.
+        q = 100 * np.array([(1 - confidence) / 2, (1 + confidence) / 2])
+        lower, upper = np.percentile(self.numer / self.denom, q, axis=-1)
+        return lower, upper
+
+
+def bootstrap_sums(
+    numer: np.ndarray, denom: np.ndarray, n_resamples: int = N_RESAMPLES, seed: int = 0, chunk_size: int = 64
+) -> BootstrapSums:
+    # numer and denom are (n_cells, max_n_seeds) with NaN after the available seeds of each cell.
+    # The seeds are resampled independently for each cell, and numer and denom share the resampled seeds.
+    n_cells, max_n_seeds = numer.shape
+    n_seeds = np.sum(~np.isnan(numer), axis=-1)
+    # Left-align the available seeds so that the resampled indices are simply below n_seeds.
+    order = np.argsort(np.isnan(numer), axis=-1, kind="stable")
+    numer, denom = np.take_along_axis(numer, order, axis=-1), np.take_along_axis(denom, order, axis=-1)
+    rng = np.random.RandomState(seed)
+    numer_sums, denom_sums = np.empty((n_cells, n_resamples)), np.empty((n_cells, n_resamples))
+    # The chunks bound the memory of the (chunk_size, n_resamples, max_n_seeds) resampled indices.
+    for start in range(0, n_cells, chunk_size):
+        end = min(start + chunk_size, n_cells)
+        n = n_seeds[start:end, None, None]
+        indices = (rng.random_sample((end - start, n_resamples, max_n_seeds)) * n).astype(np.int64)
+        # Each resample draws n_seeds values of its cell, so the draws beyond n_seeds are masked.
+        mask = np.arange(max_n_seeds) < n
+        rows = np.arange(end - start)[:, None, None]
+        numer_sums[start:end] = np.sum(np.where(mask, numer[start:end][rows, indices], 0.0), axis=-1)
+        denom_sums[start:end] = np.sum(np.where(mask, denom[start:end][rows, indices], 0.0), axis=-1)
+
+    return BootstrapSums(numer=numer_sums, denom=denom_sums)
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import multiprocessing
+import os
+from argparse import ArgumentParser
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+
+import matplotlib.pyplot as plt
+
+from validation import constants, rank_test, viz_avg_rank, viz_perf_over_time
+from validation.constants import DATASET_NAMES
+from validation.perf_cache import PerfCache, get_bench_keys, load_perf_cache
+from validation.rank_test import MAX_POWER_FACTOR, N_WORKERS_LIST, RankTestResult, rank_test_with_n_workers
+
+
+MANIFEST_PATH = "figs/figures-manifest.json"
+FIGURE_NAMES = ["perf_over_time", "avg_rank", "rank_test"]
+
+
+@dataclass(frozen=True)
+class FigureJob:
+    path: str
+    digest: str  # the hash of the input arrays and of the plotting code
+    plot: Callable[[], None]
+
+
+# The jobs and the data they read are module globals, so that the forked workers inherit them copy-on-write.
+_JOBS: list[FigureJob] = []
+
+
+def _digest(arrays: list[np.ndarray], modules: list) -> str:
+    sha = hashlib.sha1()
+    for module in [constants, *modules]:
+        with open(module.__file__, mode="rb") as f:
+            sha.update(f.read())
+
+    for array in arrays:
+        sha.update(np.ascontiguousarray(array).tobytes())
+
+    return sha.hexdigest()
+
+
+def _bench_slice(cache: PerfCache, bench_name: str, dataset_names: list[str | None]) -> list[np.ndarray]:
+    bench_keys = get_bench_keys()
+    indices = [bench_keys.index((bench_name, dataset_name)) for dataset_name in dataset_names]
+    return [cache.time_steps[indices], cache.perfs[indices]]
+
+
+def get_perf_over_time_jobs(cache: PerfCache) -> list[FigureJob]:
+    def _job(bench_name: str, dataset_id: int | None, **kwargs) -> FigureJob:
+        dataset_name = None if dataset_id is None else DATASET_NAMES[bench_name][dataset_id]
+        name = bench_name if dataset_name is None else f"{bench_name}-{dataset_name}"
+        return FigureJob(
+            path=f"figs/perf-over-time/{name}.pdf",
+            digest=_digest(_bench_slice(cache, bench_name, [dataset_name]), [viz_perf_over_time]),
+            plot=lambda: viz_perf_over_time.plot_perf_over_time(
+                cache=cache, bench_name=bench_name, dataset_id=dataset_id, **kwargs
+            ),
+        )
+
+    jobs = [_job("branin", None, ylim=(0.01, 100)), _job("hartmann3d", None), _job("hartmann6d", None)]
+    for bench_name, dataset_names in DATASET_NAMES.items():
+        multiplier = 100.0 if bench_name in ["lc", "hpobench"] else 1.0
+        jobs.extend(_job(bench_name, dataset_id, multiplier=multiplier) for dataset_id in range(len(dataset_names)))
+
+    return jobs
+
+
+def get_avg_rank_jobs(cache: PerfCache) -> list[FigureJob]:
+    return [
+        FigureJob(
+            path=f"figs/avg-rank/{bench_name}.pdf",
+            digest=_digest(_bench_slice(cache, bench_name, DATASET_NAMES[bench_name]), [viz_avg_rank]),
+            plot=lambda bench_name=bench_name: viz_avg_rank.plot_average_rank(cache=cache, bench_name=bench_name),
+        )
+        for bench_name in ["hpobench", "hpolib", "jahs", "lc"]
+    ]
+
+
+def get_rank_test_jobs(cache: PerfCache) -> list[FigureJob]:
+    # The statistics are cheap compared to the figures, so they are computed before forking and shared.
+    jobs = []
+    for with_smac in [True, False]:
+        rank_results: dict[int, RankTestResult] = {
+            n_workers: rank_test_with_n_workers(cache=cache, n_workers=n_workers, with_smac=with_smac)
+            for n_workers in N_WORKERS_LIST
+        }
+        sub_dir = "with-smac" if with_smac else "without-smac"
+        for budget_index in range(MAX_POWER_FACTOR + 1):
+            arrays = [r.ranks[budget_index] for r in rank_results.values()]
+            arrays += [r.p_values[budget_index] for r in rank_results.values()]
+            jobs.append(
+                FigureJob(
+                    path=f"figs/rank-test/{sub_dir}/1-by-{1 << (MAX_POWER_FACTOR - budget_index)}.pdf",
+                    digest=_digest(arrays, [rank_test]),
+                    plot=lambda rank_results=rank_results, budget_index=budget_index, with_smac=with_smac: (
+                        rank_test.plot_critical_difference(rank_results, budget_index=budget_index, with_smac=with_smac)
+                    ),
+                )
+            )
+
+    return jobs
+
+
+def _run_job(index: int) -> tuple[int, str | None]:
+    job = _JOBS[index]
+    try:
+        job.plot()
+    except Exception as e:
+        return index, f"{type(e).__name__}: {e}"
+    finally:
+        plt.close("all")
+
+    return index, None
+
+
+def _load_manifest(path: str) -> dict[str, str]:
+    if not os.path.exists(path):
+        return {}
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_manifest(manifest: dict[str, str], path: str) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, mode="w") as f:
+        json.dump(manifest, f, indent=4)
+
+    os.replace(tmp_path, path)
+
+
+def build_figures(figure_names: list[str], n_procs: int, only_changed: bool) -> None:
+    cache = load_perf_cache()
+    get_jobs = dict(perf_over_time=get_perf_over_time_jobs, avg_rank=get_avg_rank_jobs, rank_test=get_rank_test_jobs)
+    jobs = [job for figure_name in figure_names for job in get_jobs[figure_name](cache)]
+    manifest = _load_manifest(MANIFEST_PATH)
+    if only_changed:
+        n_jobs = len(jobs)
+        jobs = [job for job in jobs if manifest.get(job.path) != job.digest or not os.path.exists(job.path)]
+        print(f"{n_jobs - len(jobs)} figures are up to date")
+
+    for job in jobs:
+        os.makedirs(os.path.dirname(job.path), exist_ok=True)
+        # A figure that fails or is interrupted must be rebuilt next time.
+        manifest.pop(job.path, None)
+
+    _JOBS[:] = jobs
+    os.makedirs(os.path.dirname(MANIFEST_PATH), exist_ok=True)
+    print(f"Build {len(jobs)} figures with {n_procs} processes")
+    with multiprocessing.get_context("fork").Pool(n_procs) as pool:
+        for count, (index, error) in enumerate(pool.imap_unordered(_run_job, range(len(jobs))), start=1):
+            job = jobs[index]
+            if error is None:
+                manifest[job.path] = job.digest
+                print(f"[{count}/{len(jobs)}] Saved {job.path}")
+            else:
+                print(f"[{count}/{len(jobs)}] Failed {job.path}: {error}")
+
+    _save_manifest(manifest, MANIFEST_PATH)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--figure_names", type=str, nargs="+", default=FIGURE_NAMES, choices=FIGURE_NAMES)
+    parser.add_argument("--n_procs", type=int, default=os.cpu_count())
+    parser.add_argument("--only_changed", action="store_true", help="Skip the figures whose inputs did not change")
+    args = parser.parse_args()
+    build_figures(args.figure_names, n_procs=args.n_procs, only_changed=args.only_changed)
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import heapq
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class OracleResult:
+    order: np.ndarray  # the indices of the configs in the order of completion
+    cumtimes: np.ndarray  # the completion time of each config in order
+    size_traj: list[int]  # the number of observations at each ask
+
+
+def sampling_time(n_observations: int, unittime: float) -> float:
+    # The sampler latency of the validation optimizers, which grows linearly with the number of observations.
+    return (n_observations + 1) * unittime
+
+
+def run_oracle(
+    runtimes: list[float], n_workers: int, n_evals: int | None = None, unittime: float = 0.0
+) -> OracleResult:
+    # A discrete-event replay of the naive parallel run with a virtual clock instead of real sleeps.
+    # The main process waits for a free worker, collects every evaluation completed by then, samples a config
+    # and submits it, so the sampler always sees all the finished results as in validation/test-cases.json.
+    n_evals = len(runtimes) if n_evals is None else n_evals
+    now, n_submits = 0.0, 0
+    running: list[tuple[float, int]] = []
+    order: list[int] = []
+    cumtimes: list[float] = []
+    size_traj: list[int] = []
+    while len(order) < n_evals:
+        if n_submits == n_evals or len(running) >= n_workers:
+            now = max(now, running[0][0])
+        while len(running) > 0 and running[0][0] <= now:
+            finish, index = heapq.heappop(running)
+            order.append(index)
+            cumtimes.append(finish)
+
+        if n_submits < n_evals:
+            size_traj.append(len(order))
+            now += sampling_time(len(order), unittime)
+            heapq.heappush(running, (now + runtimes[n_submits], n_submits))
+            n_submits += 1
+
+    return OracleResult(order=np.asarray(order), cumtimes=np.asarray(cumtimes), size_traj=size_traj)
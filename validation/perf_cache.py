@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from argparse import ArgumentParser
+from dataclasses import dataclass
+
+from benchmark_simulator.utils import get_performance_over_time
+
+import numpy as np
+
+from src.info_tree import INFO_DIR, RunKey, parse_save_dir_name, walk_run_dirs
+from src.results_store import STORE_PATH, ResultsStore, collect_results, load_results_store
+from src.trajectory_io import result_file_path
+
+from validation.constants import DATASET_NAMES, OPT_DICT
+
+
+CACHE_PATH = "mfhpo-simulator-perf-cache.npz"
+# Every figure script uses the incumbent trajectories on 100 log-scale time steps of each (opt, P, dataset).
+STEP = 100
+N_WORKERS_LIST = [1, 2, 4, 8]
+N_SEEDS = 30
+OPT_NAMES = list(OPT_DICT)
+
+
+def get_bench_keys() -> list[tuple[str, str | None]]:
+    bench_keys: list[tuple[str, str | None]] = [("branin", None), ("hartmann3d", None), ("hartmann6d", None)]
+    for bench_name, dataset_names in DATASET_NAMES.items():
+        bench_keys.extend((bench_name, dataset_name) for dataset_name in dataset_names)
+
+    return bench_keys
+
+
+def _fingerprint(prefix: str) -> str:
+    # The result files are hashed even if the store exists, because the store misses the results since its ingestion.
+    sha = hashlib.sha1()
+    for dir_path, _ in sorted(walk_run_dirs(prefix)):
+        sha.update(f"{dir_path}:{os.stat(result_file_path(dir_path)).st_mtime_ns}\n".encode())
+
+    return sha.hexdigest()
+
+
+@dataclass(frozen=True)
+class PerfCache:
+    fingerprint: str
+    time_steps: np.ndarray  # (n_bench_keys, n_opts, n_workers, step)
+    perfs: np.ndarray  # (n_bench_keys, n_opts, n_workers, n_seeds, step), NaN for the missing cells
+
+    def _index(self, key: RunKey) -> tuple[int, int, int]:
+        bench_index = get_bench_keys().index((key.bench_name, key.dataset_name))
+        return bench_index, OPT_NAMES.index(key.opt_name), N_WORKERS_LIST.index(key.n_workers)
+
+    def get(self, key: RunKey) -> tuple[np.ndarray, np.ndarray]:
+        index = self._index(key)
+        if np.isnan(self.time_steps[index][0]):
+            raise KeyError(f"{key.save_dir_name} is missing in {CACHE_PATH}")
+
+        return self.time_steps[index], self.perfs[index]
+
+    def get_from_paths(self, paths: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        # paths are the seeds 0, ..., N_SEEDS - 1 of a (opt, P, dataset) as in validation.constants.get_all_path_list.
+        return self.get(parse_save_dir_name(paths[0]))
+
+    def save(self, path: str = CACHE_PATH) -> None:
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, fingerprint=self.fingerprint, time_steps=self.time_steps, perfs=self.perfs)
+        os.replace(tmp_path, path)
+
+
+def build_perf_cache(store: ResultsStore, fingerprint: str) -> PerfCache:
+    bench_keys = get_bench_keys()
+    shape = (len(bench_keys), len(OPT_NAMES), len(N_WORKERS_LIST))
+    time_steps = np.full((*shape, STEP), np.nan)
+    perfs = np.full((*shape, N_SEEDS, STEP), np.nan)
+    for i, (bench_name, dataset_name) in enumerate(bench_keys):
+        print(f"Build the trajectories of {bench_name} {'' if dataset_name is None else dataset_name}")
+        for j, opt_name in enumerate(OPT_NAMES):
+            for k, n_workers in enumerate(N_WORKERS_LIST):
+                keys = [RunKey(opt_name, bench_name, dataset_name, n_workers, seed) for seed in range(N_SEEDS)]
+                if any(key not in store for key in keys):
+                    continue
+
+                runs = [store.get(key) for key in keys]
+                time_steps[i, j, k], perfs[i, j, k] = get_performance_over_time(
+                    cumtimes=[r["cumtime"] for r in runs], perf_vals=[r["loss"] for r in runs], step=STEP, log=True
+                )
+
+    return PerfCache(fingerprint=fingerprint, time_steps=time_steps, perfs=perfs)
+
+
+def _is_outdated(old_store: ResultsStore, store: ResultsStore) -> bool:
+    if len(old_store) != len(store):
+        return True
+
+    return any(key not in old_store or old_store.mtime_ns(key) != store.mtime_ns(key) for key in store.keys())
+
+
+def load_perf_cache(path: str = CACHE_PATH, store_path: str = STORE_PATH, prefix: str = INFO_DIR) -> PerfCache:
+    fingerprint = _fingerprint(prefix)
+    if os.path.exists(path):
+        with np.load(path) as data:
+            if str(data["fingerprint"]) == fingerprint:
+                return PerfCache(fingerprint=fingerprint, time_steps=data["time_steps"], perfs=data["perfs"])
+
+        print(f"{path} is outdated, so rebuild it")
+
+    # The stored results are reused only if their result files did not change since the ingestion.
+    old_store = load_results_store(store_path) if os.path.exists(store_path) else None
+    store = collect_results(prefix=prefix, old_store=old_store)
+    if old_store is not None and _is_outdated(old_store, store):
+        print(f"{store_path} is older than {prefix}, so run `python -m src.results_store` to update it")
+
+    cache = build_perf_cache(store, fingerprint=fingerprint)
+    cache.save(path)
+    return cache
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--path", type=str, default=CACHE_PATH)
+    parser.add_argument("--store_path", type=str, default=STORE_PATH)
+    parser.add_argument("--prefix", type=str, default=INFO_DIR)
+    args = parser.parse_args()
+    cache = load_perf_cache(args.path, store_path=args.store_path, prefix=args.prefix)
+    n_cells = int(np.sum(~np.isnan(cache.time_steps[..., 0])))
+    print(f"{args.path} has {n_cells} cells of (dataset, opt, P) with the shape of {cache.perfs.shape}")
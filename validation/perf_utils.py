@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import numpy as np
+
+from scipy.stats import rankdata, t
+
+from validation.perf_cache import PerfCache
+
+
+# The functions below follow benchmark_simulator.utils, but slice the trajectories from PerfCache
+# instead of opening results.json in every path.
+def get_performance_over_time_from_paths(cache: PerfCache, paths: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    return cache.get_from_paths(paths)
+
+
+def get_performance_over_time_with_same_time_scale(
+    cache: PerfCache,
+    all_path_list: list[list[list[str]]],
+    step_avg_rank: int = 200,
+    min_time_step_ratio: float = 1e-5,
+) -> tuple[np.ndarray, np.ndarray]:
+    _results = []
+    for path_list in all_path_list:
+        dt_list, perf_list = [], []
+        for paths in path_list:
+            dt, perfs = get_performance_over_time_from_paths(cache=cache, paths=paths)
+            dt_list.append([0.0] + dt.tolist() + [np.inf])
+            meds = np.median(perfs, axis=0).tolist()
+            perf_list.append([np.inf] + meds + [meds[-1]])
+
+        dt_array, perf_array = map(np.asarray, [dt_list, perf_list])
+        t_max = np.max(dt_array[:, -2])
+        dt_for_this_setup = np.exp(np.linspace(np.log(t_max * min_time_step_ratio), np.log(t_max), step_avg_rank))
+        _results.append(
+            np.array([perfs[np.searchsorted(dt, dt_for_this_setup) - 1] for dt, perfs in zip(dt_array, perf_array)])
+        )
+
+    frac = np.exp(np.linspace(np.log(min_time_step_ratio), np.log(1.0), step_avg_rank))
+    return np.asarray(_results), frac
+
+
+def get_average_rank(results: np.ndarray) -> np.ndarray:
+    # results is the first return value of get_performance_over_time_with_same_time_scale.
+    return np.mean(rankdata(results, axis=1), axis=0)
+
+
+def posthoc_conover_friedman(samples: np.ndarray) -> np.ndarray:
+    # The same p-values as scikit_posthocs.posthoc_conover_friedman without p_adjust, but vectorized over
+    # the leading axes of samples, e.g. the budget fractions, whose last 2 axes are (n_blocks, n_groups).
+    n, k = samples.shape[-2:]
+    ranks = rankdata(samples, axis=-1)
+    rank_sums = ranks.sum(axis=-2)
+    s2 = (np.sum(ranks**2, axis=(-2, -1)) - k * n * (k + 1.0) ** 2 / 4.0) / (k - 1.0)
+    t2 = np.sum((rank_sums - n * (k + 1.0) / 2.0) ** 2, axis=-1) / s2
+    df = n * k - k - n + 1.0
+    scale = np.sqrt(s2 * 2.0 * n * (k - 1.0) / df * (1.0 - t2 / (n * (k - 1.0))))
+    differences = np.abs(rank_sums[..., :, np.newaxis] - rank_sums[..., np.newaxis, :])
+    p_values = 2.0 * t.sf(differences / scale[..., np.newaxis, np.newaxis], df=df)
+    p_values[..., np.arange(k), np.arange(k)] = 1.0
+    return p_values
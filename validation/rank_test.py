@@ -1,25 +1,37 @@
 from __future__ import annotations
 
 import os
+from dataclasses import dataclass
 
-from benchmark_simulator.utils import (
+from validation.constants import get_all_path_list, OPT_DICT
+from validation.perf_cache import PerfCache, load_perf_cache
+from validation.perf_utils import (
     get_average_rank,
     get_performance_over_time_with_same_time_scale,
+    posthoc_conover_friedman,
 )
 
-from validation.constants import get_all_path_list, OPT_DICT
-
 import matplotlib.pyplot as plt
 
 import numpy as np
 
+import pandas as pd
+
 import scikit_posthocs as sp
 
 
 MAX_POWER_FACTOR = 10
+N_WORKERS_LIST = [1, 2, 4, 8]
 
 
-def rank_test_with_n_workers(ax: plt.Axes, n_workers: int, budget_index: int, with_smac: bool) -> None:
+@dataclass(frozen=True)
+class RankTestResult:
+    ranks: np.ndarray  # (n_budgets, n_opts)
+    p_values: np.ndarray  # (n_budgets, n_opts, n_opts)
+
+
+def rank_test_with_n_workers(cache: PerfCache, n_workers: int, with_smac: bool) -> RankTestResult:
+    # The trajectories and the post-hoc tests for every budget fraction at once.
     budget_prop = [1.0 / (1 << i) for i in reversed(range(MAX_POWER_FACTOR + 1))]
     bench_names = ["hpolib", "hpobench", "jahs", "lc", "branin", "hartmann3d", "hartmann6d"]
     all_path_list = []
@@ -34,28 +46,16 @@ def rank_test_with_n_workers(ax: plt.Axes, n_workers: int, budget_index: int, wi
 
         all_path_list.extend(paths)
 
-    results, frac = get_performance_over_time_with_same_time_scale(all_path_list=all_path_list)
-    avg_rank, _ = get_average_rank(all_path_list=all_path_list)
+    results, frac = get_performance_over_time_with_same_time_scale(cache=cache, all_path_list=all_path_list)
     indices = np.searchsorted(frac, budget_prop)
-    budget, idx = budget_prop[budget_index], indices[budget_index]
-    print(f"Plot for {budget=} with {n_workers=}")
-    samples, ranks = results[..., idx], avg_rank[..., idx]
-    test_results = sp.posthoc_conover_friedman(samples)
-    sp.critical_difference_diagram(
-        ranks={opt_name: r for opt_name, r in zip(OPT_DICT.values(), ranks)},
-        sig_matrix=test_results,
-        ax=ax,
-        label_fmt_left="{label} [{rank:.2f}]  ",
-        label_fmt_right="  [{rank:.2f}] {label}",
-        text_h_margin=0.3,
-        label_props={"color": "black", "fontweight": "bold"},
-        crossbar_props={"color": "red", "marker": "o"},
-        marker_props={"marker": "*", "s": 150, "color": "y", "edgecolor": "k"},
-        elbow_props={"color": "gray"},
-    )
+    # (n_datasets, n_opts, n_budgets) -> (n_budgets, n_datasets, n_opts)
+    samples = np.moveaxis(results[..., indices], -1, 0)
+    return RankTestResult(ranks=get_average_rank(results)[:, indices].T, p_values=posthoc_conover_friedman(samples))
 
 
-def plot_critical_difference(budget_index: int, with_smac: bool = True) -> None:
+def plot_critical_difference(
+    rank_results: dict[int, RankTestResult], budget_index: int, with_smac: bool = True
+) -> None:
     fig, axes = plt.subplots(
         nrows=2,
         ncols=2,
@@ -64,22 +64,42 @@ def plot_critical_difference(budget_index: int, with_smac: bool = True) -> None:
         figsize=(18, 7),
         gridspec_kw=dict(wspace=0.8, hspace=0.8),
     )
-    for i, n_workers in enumerate([1, 2, 4, 8]):
+    for i, n_workers in enumerate(N_WORKERS_LIST):
         r, c = i // 2, i % 2
         ax = axes[r][c]
         ax.set_title(f"$P = {n_workers}$")
-        rank_test_with_n_workers(ax=ax, n_workers=n_workers, budget_index=budget_index, with_smac=with_smac)
+        print(f"Plot for budget=1/{1 << (MAX_POWER_FACTOR - budget_index)} with {n_workers=}")
+        ranks = rank_results[n_workers].ranks[budget_index]
+        opt_names = list(OPT_DICT.values())[: ranks.size]
+        sp.critical_difference_diagram(
+            ranks={opt_name: r for opt_name, r in zip(opt_names, ranks)},
+            sig_matrix=pd.DataFrame(rank_results[n_workers].p_values[budget_index], index=opt_names, columns=opt_names),
+            ax=ax,
+            label_fmt_left="{label} [{rank:.2f}]  ",
+            label_fmt_right="  [{rank:.2f}] {label}",
+            text_h_margin=0.3,
+            label_props={"color": "black", "fontweight": "bold"},
+            crossbar_props={"color": "red", "marker": "o"},
+            marker_props={"marker": "*", "s": 150, "color": "y", "edgecolor": "k"},
+            elbow_props={"color": "gray"},
+        )
 
     factor = 1 << (MAX_POWER_FACTOR - budget_index)
     if with_smac:
         plt.savefig(f"figs/rank-test/with-smac/1-by-{factor}.pdf", bbox_inches="tight")
     else:
         plt.savefig(f"figs/rank-test/without-smac/1-by-{factor}.pdf", bbox_inches="tight")
+    plt.close(fig)
 
 
 if __name__ == "__main__":
     os.makedirs("figs/rank-test/with-smac", exist_ok=True)
     os.makedirs("figs/rank-test/without-smac", exist_ok=True)
-    for budget_index in range(MAX_POWER_FACTOR + 1):
-        plot_critical_difference(budget_index=budget_index, with_smac=True)
-        plot_critical_difference(budget_index=budget_index, with_smac=False)
+    cache = load_perf_cache()
+    for with_smac in [True, False]:
+        rank_results = {
+            n_workers: rank_test_with_n_workers(cache=cache, n_workers=n_workers, with_smac=with_smac)
+            for n_workers in N_WORKERS_LIST
+        }
+        for budget_index in range(MAX_POWER_FACTOR + 1):
+            plot_critical_difference(rank_results, budget_index=budget_index, with_smac=with_smac)
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
-import os
+import time
+from typing import Any
 
-import ujson as json
+import numpy as np
 
+from src.info_tree import RunKey
+from src.run_summary import collect_summaries
+
+from validation.bootstrap import BootstrapSums, N_RESAMPLES, bootstrap_sums
 from validation.constants import DATASET_NAMES, OPT_DICT
 
 
@@ -12,38 +17,65 @@ BENCH_DICT = dict(
 )
 
 
-def collect_data() -> tuple[dict[str, float], dict[str, float]]:
+def collect_seed_times(
+    summaries: dict[RunKey, dict[str, Any]]
+) -> tuple[dict[str, list[float]], dict[str, list[float]]]:
     # opt x dataset
-    sim_times = {}
-    act_times = {}
-    counter = 0
-    for root, dir_names, file_names in os.walk("mfhpo-simulator-info/"):
-        if len(file_names) == 0:
-            continue
-
-        counter += 1
-        if counter % 3000 == 0:
-            print(f"Checked {counter}/45480 files")
-
-        data = json.load(open(os.path.join(root, "results.json")))
-        _, opt_name, cond, _ = root.split("/")
-        subcond = cond.split("_")
-        if len(subcond) == 2:
-            target_name = f"{opt_name}:{subcond[0][6:]}:{subcond[1][-1]}"
+    sim_seed_times = {}
+    act_seed_times = {}
+    for key, data in summaries.items():
+        opt_name, n_workers = key.opt_name, key.n_workers
+        if key.dataset_name is None:
+            target_name = f"{opt_name}:{key.bench_name}:{n_workers}"
         else:
-            bench_name = subcond[0][6:]
-            dataset_name = subcond[1][8:]
-            n_workers = subcond[2][-1]
-            target_name = f"{opt_name}:{bench_name}:{dataset_name}:{n_workers}"
+            target_name = f"{opt_name}:{key.bench_name}:{key.dataset_name}:{n_workers}"
+
+        assert data["cumtime"] < 1e9  # sanity check
+        if opt_name != "hebo" or n_workers == 1:
+            assert data["actual_cumtime"] < data["cumtime"], key.save_dir_name  # sanity check
+
+        sim_seed_times.setdefault(target_name, []).append(data["cumtime"])
+        act_seed_times.setdefault(target_name, []).append(data["actual_cumtime"])
 
-        assert data["cumtime"][-1] < 1e9  # sanity check
-        if opt_name != "hebo" or cond[-1] == "1":
-            assert data["actual_cumtime"][-1] < data["cumtime"][-1], root  # sanity check
+    return sim_seed_times, act_seed_times
 
-        sim_times[target_name] = sim_times.get(target_name, 0.0) + data["cumtime"][-1]
-        act_times[target_name] = act_times.get(target_name, 0.0) + data["actual_cumtime"][-1]
 
-    return sim_times, act_times
+def collect_data(summaries: dict[RunKey, dict[str, Any]]) -> tuple[dict[str, float], dict[str, float]]:
+    sim_seed_times, act_seed_times = collect_seed_times(summaries)
+    return {k: sum(v) for k, v in sim_seed_times.items()}, {k: sum(v) for k, v in act_seed_times.items()}
+
+
+def compute_speedup_cis(
+    sim_seed_times: dict[str, list[float]], act_seed_times: dict[str, list[float]]
+) -> tuple[dict[str, tuple[float, float]], dict[int, tuple[float, float]]]:
+    # The bootstrap CIs of sim_times[key] / act_times[key] for every key at once and of the totals of each P.
+    start = time.time()
+    keys = list(sim_seed_times.keys())
+    max_n_seeds = max(len(v) for v in sim_seed_times.values())
+    sim, act = np.full((len(keys), max_n_seeds), np.nan), np.full((len(keys), max_n_seeds), np.nan)
+    for i, key in enumerate(keys):
+        sim[i, : len(sim_seed_times[key])] = sim_seed_times[key]
+        act[i, : len(act_seed_times[key])] = act_seed_times[key]
+
+    sums = bootstrap_sums(sim, act)
+    lower, upper = sums.ratio_ci()
+    cis = {key: (lo, hi) for key, lo, hi in zip(keys, lower.tolist(), upper.tolist())}
+    # The seeds of each cell are resampled independently, so the resampled totals are the sums over the cells.
+    n_workers_list = np.array([int(key.split(":")[-1]) for key in keys])
+    total_cis = {}
+    for n_workers in [1, 2, 4, 8]:
+        mask = n_workers_list == n_workers
+        total = BootstrapSums(numer=sums.numer[mask].sum(axis=0), denom=sums.denom[mask].sum(axis=0))
+        lo, hi = total.ratio_ci()
+        total_cis[n_workers] = (float(lo), float(hi))
+
+    print(f"Bootstrapped {len(keys)} cells with {N_RESAMPLES} resamples in {time.time() - start:.1f} seconds")
+    return cis, total_cis
+
+
+def _format_ci(ci: tuple[float, float]) -> str:
+    lo, hi = ("e+".join(f"{v:.1e}".split("e+0")) for v in ci)
+    return "\\,{\\scriptsize[" + lo + ", " + hi + "]}"
 
 
 def generate_table(data_part: str, opt_name: str, bench_name: str) -> str:
@@ -82,6 +114,7 @@ def get_data_part(
     act_times: dict[str, float],
     suffixes: list[str],
     id_start: int = 1,
+    cis: dict[str, tuple[float, float]] | None = None,
 ) -> str:
     rows = []
     for i, suffix in enumerate(suffixes, start=id_start):
@@ -94,6 +127,8 @@ def get_data_part(
             ratio = "--" if not_exist else "e+".join(f'{sim_times[key]/act_times[key]:.1e}'.split("e+0"))
             if not not_exist and sim_times[key] / act_times[key] < 1.0:
                 ratio = "\\textbf{" + ratio + "}"
+            if not not_exist and cis is not None:
+                ratio += _format_ci(cis[key])
 
             row += f"&{at}&{st}&{ratio}" if not_exist else f"&{at}/&{st}/&{ratio}"
         row += "\\\\"
@@ -107,7 +142,9 @@ def compute_overall_reduction(sim_times: dict[str, float], act_times: dict[str,
     print(f"{sim_total=:.3e}, {act_total=:.3e}, {(sim_total/act_total)=:.3e}")
 
 
-def data_part_for_main(sim_times: dict[str, float], act_times: dict[str, float]) -> str:
+def data_part_for_main(
+    sim_times: dict[str, float], act_times: dict[str, float], cis: dict[int, tuple[float, float]] | None = None
+) -> str:
     sim_total = {i: 0.0 for i in [1, 2, 4, 8]}
     act_total = {i: 0.0 for i in [1, 2, 4, 8]}
     for k in sim_times:
@@ -119,13 +156,19 @@ def data_part_for_main(sim_times: dict[str, float], act_times: dict[str, float])
     for n_workers in [1, 2, 4, 8]:
         ratio = sim_total[n_workers] / act_total[n_workers]
         row += f"&{act_total[n_workers]:.1e}/&{sim_total[n_workers]:.1e}/&{ratio:.1e}"
+        if cis is not None:
+            lo, hi = cis[n_workers]
+            row += f"\\,{{\\scriptsize[{lo:.1e}, {hi:.1e}]}}"
     row += "\\\\"
     return row
 
 
 if __name__ == "__main__":
-    sim_times, act_times = collect_data()
-    kwargs = dict(sim_times=sim_times, act_times=act_times)
+    sim_seed_times, act_seed_times = collect_seed_times(collect_summaries())
+    sim_times = {k: sum(v) for k, v in sim_seed_times.items()}
+    act_times = {k: sum(v) for k, v in act_seed_times.items()}
+    cis, total_cis = compute_speedup_cis(sim_seed_times, act_seed_times)
+    kwargs = dict(sim_times=sim_times, act_times=act_times, cis=cis)
     suffixes = ["branin", "hartmann3d", "hartmann6d"]
     for opt_name in OPT_DICT:
         data_part = get_data_part(suffixes=suffixes, opt_name=opt_name, **kwargs)
@@ -144,6 +187,6 @@ if __name__ == "__main__":
             print(generate_table(data_part=data_part, opt_name=opt_name, bench_name=bench_name))
             print()
 
-    data_part = data_part_for_main(sim_times=sim_times, act_times=act_times)
+    data_part = data_part_for_main(sim_times=sim_times, act_times=act_times, cis=total_cis)
     print(generate_table(data_part=data_part, opt_name=opt_name, bench_name=bench_name))
     compute_overall_reduction(sim_times=sim_times, act_times=act_times)
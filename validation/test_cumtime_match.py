@@ -9,6 +9,12 @@ from benchmark_simulator import ObjectiveFuncWrapper
 
 import numpy as np
 
+from validation.oracle import run_oracle
+
+
+# The overhead of each ask beyond its sleep is about 3 ms, and this allows a few times of it.
+SAMPLING_JITTER = 0.02
+
 
 def dummy_func(eval_config: dict[str, int], *args, **kwargs) -> dict[str, float]:
     return dict(loss=0.0, runtime=eval_config["x"])
@@ -22,6 +28,7 @@ class Optimizer:
         unittime: float = 10.0,
     ):
         test_case = json.load(open("validation/test-cases.json"))[test_case_key]
+        self._oracle = run_oracle(test_case["runtime"], n_workers=n_workers, unittime=unittime)
         self._runtimes = test_case["runtime"][::-1]
         self._answer = np.array(test_case["answer"])
         self._n_workers = n_workers
@@ -37,8 +44,8 @@ class Optimizer:
         else:
             return 10**5
 
-    def _pop_completed(self, futures) -> None:
-        completed, _ = wait(futures.keys(), return_when=FIRST_COMPLETED)
+    def _pop_completed(self, futures, block: bool = True) -> None:
+        completed, _ = wait(futures.keys(), timeout=None if block else 0, return_when=FIRST_COMPLETED)
         for future in completed:
             try:
                 future.result()
@@ -58,6 +65,8 @@ class Optimizer:
                     self._pop_completed(futures)
 
                 if counts < self._n_evals:
+                    # The sampler sees every evaluation finished by now, as in validation/oracle.py.
+                    self._pop_completed(futures, block=False)
                     x = self.ask()
                     futures[executor.submit(func, dict(x=x))] = None
                     time.sleep(1e-3)
@@ -80,6 +89,10 @@ class CheapOpt:
     def answer(self) -> np.ndarray:
         return self._opt._answer
 
+    @property
+    def oracle(self) -> np.ndarray:
+        return self._opt._oracle.cumtimes[: self.n_evals]
+
     def run(self, func) -> None:
         self._opt.run(func)
 
@@ -100,10 +113,25 @@ class ExpensiveOpt:
     def answer(self) -> np.ndarray:
         return self._opt._answer
 
+    @property
+    def oracle(self) -> np.ndarray:
+        return self._opt._oracle.cumtimes[: self.n_evals]
+
     def run(self, func) -> None:
         self._opt.run(func)
 
 
+def compare(opt: CheapOpt | ExpensiveOpt, wrapper: ObjectiveFuncWrapper) -> None:
+    # The simulator measures the sampling time in the actual time, so each ask adds its overhead beyond the sleep.
+    simulated = np.asarray(wrapper.get_results()["cumtime"][: opt.n_evals])
+    assert np.allclose(opt.oracle, opt.answer), f"test-cases.json disagrees with the oracle: {opt.oracle.tolist()}"
+    atol = SAMPLING_JITTER * opt.n_actual_evals
+    print(f"{wrapper.dir_name}: max error from the oracle is {np.max(np.abs(simulated - opt.oracle)):.3f} seconds")
+    assert np.allclose(simulated, opt.oracle, rtol=0.0, atol=atol), (
+        f"The simulator deviates from the oracle by more than {atol:.2f} seconds: {simulated.tolist()}"
+    )
+
+
 if __name__ == "__main__":
     opt = CheapOpt()
     wrapper = ObjectiveFuncWrapper(
@@ -115,6 +143,7 @@ if __name__ == "__main__":
         tmp_dir="validation-results",
     )
     opt.run(wrapper)
+    compare(opt, wrapper)
 
     opt = ExpensiveOpt(test_case_key="basic")
     wrapper = ObjectiveFuncWrapper(
@@ -126,6 +155,7 @@ if __name__ == "__main__":
         tmp_dir="validation-results",
     )
     opt.run(wrapper)
+    compare(opt, wrapper)
 
     opt = ExpensiveOpt(test_case_key="no-overlap")
     wrapper = ObjectiveFuncWrapper(
@@ -137,3 +167,4 @@ if __name__ == "__main__":
         tmp_dir="validation-results",
     )
     opt.run(wrapper)
+    compare(opt, wrapper)
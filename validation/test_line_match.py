@@ -13,10 +13,13 @@ import ConfigSpace as CS
 
 import numpy as np
 
+from validation.oracle import run_oracle
+
 
 parser = ArgumentParser()
 parser.add_argument("--seed", type=int, default=10)
 parser.add_argument("--runtime_factor", type=float, default=100.0)
+parser.add_argument("--real_sleep", action="store_true", help="Sleep for the runtimes in the naive run")
 args = parser.parse_args()
 
 FIDEL_KEY = "z0"
@@ -26,6 +29,7 @@ N_WORKERS = 4
 N_EVALS = 100
 SEED = args.seed
 RUNTIME_FACTOR = args.runtime_factor
+REAL_SLEEP = args.real_sleep
 WRAPPER_KWARGS = dict(
     fidel_keys=["z0"],
     n_workers=N_WORKERS,
@@ -128,7 +132,19 @@ def run_with_wrapper(
     return np.array(results["loss"][:N_EVALS]), np.array(results["cumtime"][:N_EVALS]), actual_cumtime
 
 
+def run_with_oracle(bench: MFHartmann, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    # The configs are given to multiprocessing.Pool at once, i.e. no sampling time, so only the runtimes matter.
+    opt = get_random_opt(wrapper=None, bench=bench, seed=seed)
+    results = [bench(eval_config=config, fidels={FIDEL_KEY: fidel}) for config, fidel in zip(opt._configs, opt._fidels)]
+    oracle = run_oracle([r[RUNTIME_KEY] for r in results], n_workers=N_WORKERS)
+    loss_vals = np.array([r[OBJ_KEY] for r in results])
+    return loss_vals[oracle.order][:N_EVALS], oracle.cumtimes[:N_EVALS]
+
+
 def run_without_wrapper(bench: MFHartmann, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    if not REAL_SLEEP:
+        return run_with_oracle(bench, seed=seed)
+
     wrapper = MyObjectiveFuncSleep(func=bench)
     start = time.time()
     results = get_random_opt(wrapper=wrapper, bench=bench, seed=seed).optimize()
@@ -3,12 +3,15 @@ from __future__ import annotations
 import json
 import shutil
 import time
+from argparse import ArgumentParser
 from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 
 from benchmark_simulator import ObjectiveFuncWrapper
 
 import numpy as np
 
+from validation.oracle import run_oracle
+
 
 def dummy_func(eval_config: dict[str, int], *args, **kwargs) -> dict[str, float]:
     return dict(loss=time.time(), runtime=eval_config["x"])
@@ -90,8 +93,15 @@ class FixedRandomOpt:
         indices = np.array([r[0] for r in self._observations])
         return indices[order], cumtimes[order]
 
+    def run_oracle(self) -> tuple[np.ndarray, np.ndarray]:
+        # The same answer as run(dummy_func_with_sleep) on a virtual clock, which takes seconds instead of minutes.
+        n_evals = self._n_actual_evals if self._with_wrapper else self._n_evals
+        oracle = run_oracle(self._runtimes[::-1], n_workers=self._n_workers, n_evals=n_evals, unittime=self._unittime)
+        self.size_traj = oracle.size_traj
+        return oracle.order, oracle.cumtimes
+
 
-def experiment(unittime: float = 0.0, avg_time: float = 5.0):
+def experiment(unittime: float = 0.0, avg_time: float = 5.0, real_sleep: bool = False):
     results = {}
     size_traj = {}
     cumtimes = {}
@@ -109,7 +119,7 @@ def experiment(unittime: float = 0.0, avg_time: float = 5.0):
         cumtimes[dist] = {}
         kwargs = dict(seed=0, dist=dist, dist_kwargs=dist_kwargs, multiplier=multiplier, unittime=unittime)
         opt = FixedRandomOpt(**kwargs)
-        answer, cumtime = opt.run(dummy_func_with_sleep)
+        answer, cumtime = opt.run(dummy_func_with_sleep) if real_sleep else opt.run_oracle()
         results[dist]["answer"] = answer.tolist()
         size_traj[dist]["answer"] = opt.size_traj
         cumtimes[dist]["answer"] = cumtime.tolist()
@@ -149,6 +159,10 @@ def experiment(unittime: float = 0.0, avg_time: float = 5.0):
 
 
 if __name__ == "__main__":
-    experiment()
-    experiment(unittime=0.05)
-    experiment(unittime=0.005)
+    parser = ArgumentParser()
+    parser.add_argument("--real_sleep", action="store_true", help="Sleep for the runtimes in the answer run")
+    args = parser.parse_args()
+
+    experiment(real_sleep=args.real_sleep)
+    experiment(unittime=0.05, real_sleep=args.real_sleep)
+    experiment(unittime=0.005, real_sleep=args.real_sleep)
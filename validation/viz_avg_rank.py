@@ -1,15 +1,15 @@
 from __future__ import annotations
 
-from benchmark_simulator.utils import get_average_rank
-
 import os
 
 import matplotlib.pyplot as plt
 
 from validation.constants import COLOR_DICT, LS_DICT, OPT_DICT, get_all_path_list
+from validation.perf_cache import PerfCache, load_perf_cache
+from validation.perf_utils import get_average_rank, get_performance_over_time_with_same_time_scale
 
 
-def plot_average_rank(bench_name: str):
+def plot_average_rank(cache: PerfCache, bench_name: str):
     fig, axes = plt.subplots(
         nrows=2,
         ncols=2,
@@ -21,7 +21,10 @@ def plot_average_rank(bench_name: str):
     for i, n_workers in enumerate([1, 2, 4, 8]):
         ax = axes[i // 2][i % 2]
         ax.set_title(f"$P = {n_workers}$")
-        avg_rank, dt = get_average_rank(all_path_list=get_all_path_list(bench_name=bench_name, n_workers=n_workers))
+        results, dt = get_performance_over_time_with_same_time_scale(
+            cache=cache, all_path_list=get_all_path_list(bench_name=bench_name, n_workers=n_workers)
+        )
+        avg_rank = get_average_rank(results)
         lines, labels = [], []
         for opt_name, r in zip(OPT_DICT, avg_rank):
             if opt_name == "smac" and bench_name in ["lc", "jahs"]:
@@ -51,6 +54,7 @@ def plot_average_rank(bench_name: str):
 
 if __name__ == "__main__":
     os.makedirs("figs/avg-rank", exist_ok=True)
+    cache = load_perf_cache()
     for bench_name in ["hpobench", "hpolib", "jahs", "lc"]:
         print(bench_name)
-        plot_average_rank(bench_name=bench_name)
+        plot_average_rank(cache=cache, bench_name=bench_name)
@@ -2,16 +2,19 @@ from __future__ import annotations
 
 import os
 
-from benchmark_simulator.utils import get_performance_over_time_from_paths, get_mean_and_standard_error
+from benchmark_simulator.utils import get_mean_and_standard_error
 
 import numpy as np
 
 import matplotlib.pyplot as plt
 
 from validation.constants import COLOR_DICT, DATASET_NAMES, LS_DICT, OPT_DICT
+from validation.perf_cache import PerfCache, load_perf_cache
+from validation.perf_utils import get_performance_over_time_from_paths
 
 
 def plot_perf_over_time(
+    cache: PerfCache,
     bench_name: str,
     dataset_id: int | None = None,
     ylim: tuple[float, float] | None = None,
@@ -43,8 +46,8 @@ def plot_perf_over_time(
                 continue
 
             dt, perfs = get_performance_over_time_from_paths(
+                cache=cache,
                 paths=[f"mfhpo-simulator-info/{opt}/{prefix}_nworkers={n_workers}/{seed}" for seed in range(30)],
-                step=100,
             )
             if opt == "random" and n_workers == 1:
                 xlim = (0.05 * np.min(dt), np.max(dt))
@@ -85,12 +88,13 @@ def plot_perf_over_time(
 
 if __name__ == "__main__":
     os.makedirs("figs/perf-over-time/", exist_ok=True)
-    plot_perf_over_time(bench_name="branin", ylim=(0.01, 100))
-    plot_perf_over_time(bench_name="hartmann3d")
-    plot_perf_over_time(bench_name="hartmann6d")
+    cache = load_perf_cache()
+    plot_perf_over_time(cache=cache, bench_name="branin", ylim=(0.01, 100))
+    plot_perf_over_time(cache=cache, bench_name="hartmann3d")
+    plot_perf_over_time(cache=cache, bench_name="hartmann6d")
 
     for bench_name, dataset_names in DATASET_NAMES.items():
         for dataset_id in range(len(dataset_names)):
             print(bench_name, dataset_names[dataset_id])
             multiplier = 100.0 if bench_name in ["lc", "hpobench"] else 1.0
-            plot_perf_over_time(bench_name=bench_name, dataset_id=dataset_id, multiplier=multiplier)
+            plot_perf_over_time(cache=cache, bench_name=bench_name, dataset_id=dataset_id, multiplier=multiplier)